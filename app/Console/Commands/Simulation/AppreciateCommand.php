@@ -12,7 +12,8 @@ class AppreciateCommand extends Command
                             {coordinates-file : Path to coordinates JSON}
                             {--output= : Output JSON path (optional)}
                             {--threshold= : Fill threshold (default: from config)}
-                            {--no-align : Skip fiducial alignment}';
+                            {--no-align : Skip fiducial alignment}
+                            {--socket= : Unix socket of a running appreciate_worker.py (skips spawning Python)}';
 
     protected $description = 'Run OMR appreciation on ballot image using Python script';
 
@@ -36,6 +37,16 @@ public function handle(): int
             return 1;
         }
 
+        // Send the job to a running worker if one was given
+        if ($socket = $this->option('socket')) {
+            $result = $this->appreciateOnWorker($socket, $ballotImage, $coordsFile, (float) $threshold, (bool) $noAlign);
+            if ($result === null) {
+                return 1;
+            }
+
+            return $this->report($result, $output);
+        }
+
         // Locate appreciate.py script
         $appreciateScript = base_path('packages/omr-appreciation/omr-python/appreciate.py');
         if (!File::exists($appreciateScript)) {
@@ -76,6 +87,49 @@ public function handle(): int
             return 1;
         }
 
+        return $this->report($result, $output);
+    }
+
+    /**
+     * Send one job to appreciate_worker.py over its Unix socket
+     */
+    protected function appreciateOnWorker(string $socket, string $ballotImage, string $coordsFile, float $threshold, bool $noAlign): ?array
+    {
+        $connection = @stream_socket_client("unix://{$socket}", $errno, $errstr, 5);
+        if (!$connection) {
+            $this->error("Could not connect to appreciation worker at {$socket}: {$errstr}");
+            return null;
+        }
+
+        fwrite($connection, json_encode([
+            'image' => realpath($ballotImage),
+            'template' => realpath($coordsFile),
+            'threshold' => $threshold,
+            'no_align' => $noAlign,
+        ]) . "\n");
+
+        $reply = fgets($connection);
+        fclose($connection);
+
+        $result = $reply === false ? null : json_decode($reply, true);
+        if (!is_array($result)) {
+            $this->error("Appreciation worker returned invalid JSON");
+            return null;
+        }
+
+        if (isset($result['error'])) {
+            $this->error($result['error']);
+            return null;
+        }
+
+        return $result;
+    }
+
+    /**
+     * Save and summarize appreciation results
+     */
+    protected function report(array $result, ?string $output): int
+    {
         // Save to file if output specified
         if ($output) {
             $outputDir = dirname($output);
@@ -29,6 +29,20 @@ class ThresholdTuningCommand extends Command
      */
     protected $description = 'Generate ballots with varying fill intensities to tune OMR thresholds';
 
+    /**
+     * Long-lived appreciate_worker.py process shared by every intensity
+     *
+     * @var resource|null
+     */
+    protected $worker = null;
+
+    /**
+     * Worker stdin/stdout pipes
+     *
+     * @var array
+     */
+    protected array $workerPipes = [];
+
     /**
      * Execute the console command.
      */
@@ -124,6 +138,9 @@ public function handle(QuestionnaireLoader $questionnaireLoader): int
         $this->info("\n[4/5] Generating filled ballots at different intensities...");
         $results = [];
         
+        // One appreciation worker for all intensities (avoids a Python/OpenCV boot per ballot)
+        $this->startWorker("{$runDir}/appreciation_worker.log");
+        
         foreach ($intensities as $intensity) {
             $intensityLabel = sprintf('%.0f', $intensity * 100);
             $this->info("\n  Testing intensity: {$intensityLabel}%");
@@ -167,6 +184,8 @@ public function handle(QuestionnaireLoader $questionnaireLoader): int
             ];
         }
         
+        $this->stopWorker();
+        
         // Step 5: Generate summary report
         $this->info("\n[5/5] Generating summary report...");
         $this->generateReport($results, $runDir, $threshold, $bubbles);
@@ -207,10 +226,15 @@ protected function determineProfile(?string $configDir): string
      */
     protected function runAppreciation(string $imagePath, string $templatePath, float $threshold, string $outputDir): ?array
     {
-        $pythonScript = base_path('packages/omr-appreciation/omr-python/appreciate.py');
         $resultsPath = "{$outputDir}/appreciation_results.json";
         $errorLog = "{$outputDir}/appreciation_errors.log";
         
+        if ($this->worker) {
+            return $this->runAppreciationOnWorker($imagePath, $templatePath, $threshold, $resultsPath, $errorLog);
+        }
+        
+        $pythonScript = base_path('packages/omr-appreciation/omr-python/appreciate.py');
+        
         $command = sprintf(
             'python3 %s %s %s --threshold %.2f > %s 2> %s',
             escapeshellarg($pythonScript),
@@ -237,6 +261,90 @@ protected function runAppreciation(string $imagePath, string $templatePath, floa
         return $results;
     }
     
+    /**
+     * Send an appreciation job to the running worker and save its reply
+     *
+     * If the worker has died, it is stopped and the job is retried with a
+     * per-ballot appreciate.py run (as are all later ballots).
+     */
+    protected function runAppreciationOnWorker(string $imagePath, string $templatePath, float $threshold, string $resultsPath, string $errorLog): ?array
+    {
+        $job = json_encode([
+            'image' => $imagePath,
+            'template' => $templatePath,
+            'threshold' => round($threshold, 2),
+        ]);
+        
+        $written = @fwrite($this->workerPipes[0], $job . "\n");
+        @fflush($this->workerPipes[0]);
+        
+        $reply = $written === false ? false : fgets($this->workerPipes[1]);
+        if ($reply === false) {
+            $this->warn("    Appreciation worker exited unexpectedly, running appreciate.py per ballot");
+            $this->stopWorker();
+            return $this->runAppreciation($imagePath, $templatePath, $threshold, dirname($resultsPath));
+        }
+        
+        $results = json_decode($reply, true);
+        if (json_last_error() !== JSON_ERROR_NONE) {
+            File::append($errorLog, "JSON parse error: " . json_last_error_msg() . "\n");
+            return null;
+        }
+        
+        if (isset($results['error'])) {
+            File::append($errorLog, $results['error'] . "\n");
+            return null;
+        }
+        
+        File::put($resultsPath, json_encode($results, JSON_PRETTY_PRINT));
+        
+        return $results;
+    }
+    
+    /**
+     * Start appreciate_worker.py (falls back to per-ballot runs if it can't start)
+     */
+    protected function startWorker(string $logPath): void
+    {
+        $workerScript = base_path('packages/omr-appreciation/omr-python/appreciate_worker.py');
+        
+        $process = proc_open(
+            ['python3', $workerScript],
+            [
+                0 => ['pipe', 'r'],
+                1 => ['pipe', 'w'],
+                2 => ['file', $logPath, 'a'],
+            ],
+            $pipes
+        );
+        
+        if (!is_resource($process)) {
+            $this->warn("Could not start appreciation worker, running appreciate.py per ballot");
+            return;
+        }
+        
+        $this->worker = $process;
+        $this->workerPipes = $pipes;
+    }
+    
+    /**
+     * Close the worker's stdin and wait for it to exit
+     */
+    protected function stopWorker(): void
+    {
+        if (!$this->worker) {
+            return;
+        }
+        
+        foreach ($this->workerPipes as $pipe) {
+            fclose($pipe);
+        }
+        proc_close($this->worker);
+        
+        $this->worker = null;
+        $this->workerPipes = [];
+    }
+    
     /**
      * Analyze appreciation results
      */
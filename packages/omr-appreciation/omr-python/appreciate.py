@@ -3,16 +3,26 @@
 
 Usage:
     python appreciate.py <image_path> <template_path> [--threshold THRESHOLD]
+    python appreciate.py --batch <dir|glob|manifest> <template_path> [--output-dir DIR] [--workers N]
 """
 
 import sys
+import os
+import glob
+import json
 import argparse
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import redirect_stdout
 import cv2
+from typing import Dict, List, Optional, Tuple
 from utils import load_template, output_json
-from image_aligner import detect_fiducials, align_image
+from image_aligner import detect_fiducials, align_image, warm_up_fiducial_detectors
 from mark_detector import detect_marks
-from barcode_decoder import decode_barcode
-from bubble_metadata import load_bubble_metadata
+from barcode_decoder import decode_barcode, get_barcode_service, get_route_stats
+from bubble_metadata import BubbleMetadata
+from threshold_config import MarkThresholds
+from image_context import ImageContext, as_context, to_gray
+from template_compiler import compile_zones, load_zone_table
 
 
 def generate_ballot_cast_format(document_id: str, results: list) -> str:
@@ -51,151 +61,148 @@ def generate_ballot_cast_format(document_id: str, results: list) -> str:
     return f"{document_id}|{ballot_votes}"
 
 
-def main():
-    """Main entry point for OMR appreciation."""
-    parser = argparse.ArgumentParser(
-        description='Appreciate OMR marks on scanned ballot images'
-    )
-    parser.add_argument('image', help='Path to scanned ballot image')
-    parser.add_argument('template', help='Path to template JSON file')
-    parser.add_argument('--threshold', '-t', type=float, default=0.3,
-                       help='Fill threshold (0.0 to 1.0, default: 0.3)')
-    parser.add_argument('--no-align', action='store_true',
-                       help='Skip fiducial alignment (for perfect test images)')
-    parser.add_argument('--config-path', type=str, default=None,
-                       help='Path to election config directory (for bubble metadata lookup)')
-    
-    args = parser.parse_args()
-    
-    image_path = args.image
-    template_path = args.template
-    threshold = args.threshold
-    
-    # Load template
-    try:
-        template = load_template(template_path)
-    except Exception as e:
-        print(f"Error loading template: {e}", file=sys.stderr)
-        sys.exit(1)
+class AppreciationError(Exception):
+    """Raised when a ballot image cannot be appreciated."""
+
+
+def build_zones(template: dict, bubble_metadata: Optional[BubbleMetadata] = None) -> List[Dict]:
+    """Build the zones list for mark detection from a template.
     
-    # Load bubble metadata if config path provided
-    bubble_metadata = load_bubble_metadata(args.config_path)
+    Args:
+        template: Template dictionary ('zones' array or 'bubble' dict format)
+        bubble_metadata: Optional metadata for simple bubble IDs
+        
+    Returns:
+        List of zone dicts with id, contest, code and pixel ROI coordinates
+    """
+    return compile_zones(template, bubble_metadata).zones()
+
+
+# Threads for stages that can overlap within one ballot (barcode vs. marks).
+# OpenCV and the native barcode decoders release the GIL, so a small pool is enough.
+_stage_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _submit_stage(fn, *args) -> Future:
+    """Run a pipeline stage on the shared stage pool.
     
-    # Load image
+    OMR_STAGE_THREADS=0 runs stages inline (sequential pipeline).
+    """
+    global _stage_pool
+    workers = int(os.environ.get('OMR_STAGE_THREADS', '2'))
+    if workers <= 0:
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    if _stage_pool is None:
+        _stage_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='omr-stage')
+    return _stage_pool.submit(fn, *args)
+
+
+def _decode_document_barcode(image: ImageContext, template: dict) -> Optional[Dict]:
+    """Decode the ballot footer barcode; failures are warnings, not errors."""
+    barcode_coords = template.get('barcode', {}).get('document_barcode', {})
+    if not barcode_coords:
+        return None
     try:
-        image = cv2.imread(image_path)
-        if image is None:
-            raise ValueError(f"Could not load image: {image_path}")
+        mm_to_pixels = 300 / 25.4  # 11.811 pixels per mm
+        return decode_barcode(
+            image,  # Use original image (barcode is not affected by alignment)
+            barcode_coords,
+            mm_to_px_ratio=mm_to_pixels,
+            metadata_fallback=barcode_coords.get('data'),
+            template_id=template.get('template_id')
+        )
     except Exception as e:
-        print(f"Error loading image: {e}", file=sys.stderr)
-        sys.exit(1)
+        print(f"Warning: Barcode decode failed: {e}", file=sys.stderr)
+        # Continue without barcode - not critical for mark detection
+        return None
+
+
+def appreciate_image(image, template: dict, threshold: float = 0.3, no_align: bool = False,
+                     bubble_metadata: Optional[BubbleMetadata] = None,
+                     zones: Optional[List[Dict]] = None,
+                     thresholds: Optional[MarkThresholds] = None,
+                     engine: Optional[str] = None, mask: Optional[str] = None) -> Dict:
+    """Run the full appreciation pipeline on a decoded ballot image.
     
-    # Align image based on fiducials (unless disabled)
-    inv_matrix = None  # No transformation needed if alignment is skipped
-    quality_metrics = None
-    fiducial_coords = None
+    This is the pipeline behind main(), exposed so long-lived callers
+    (appreciate_worker.py) can reuse parsed templates and zones between ballots.
     
-    if args.no_align:
-        # Skip alignment for perfect test images
-        aligned_image = image
-    else:
-        # Detect fiducials
-        fiducials = detect_fiducials(image, template)
-        if fiducials is None:
-            print("Error: Could not detect 4 fiducial markers", file=sys.stderr)
-            sys.exit(1)
+    Args:
+        image: Ballot image (BGR or grayscale array) or ImageContext
+        template: Parsed template dictionary
+        threshold: Fill threshold (0.0 to 1.0)
+        no_align: Skip fiducial alignment (for perfect test images)
+        bubble_metadata: Optional metadata for simple bubble IDs
+        zones: Precomputed zones from build_zones() (built from template if None)
+        thresholds: Compiled classification thresholds (defaults to the loaded config)
+        engine: Mark detection engine (see detect_marks; defaults to OMR_MARK_ENGINE)
+        mask: Bubble mask shape (see detect_marks; defaults to OMR_BUBBLE_MASK)
         
-        # Store fiducial coordinates for output
-        fiducial_coords = {
-            'tl': {'x': int(fiducials[0][0]), 'y': int(fiducials[0][1])},
-            'tr': {'x': int(fiducials[1][0]), 'y': int(fiducials[1][1])},
-            'bl': {'x': int(fiducials[2][0]), 'y': int(fiducials[2][1])},
-            'br': {'x': int(fiducials[3][0]), 'y': int(fiducials[3][1])},
-        }
+    Returns:
+        Output document (same structure appreciate.py prints)
         
-        # Align image (returns original image + inverse matrix for coordinate transform)
-        try:
-            aligned_image, quality_metrics, inv_matrix = align_image(image, fiducials, template)
-        except Exception as e:
-            print(f"Error aligning image: {e}", file=sys.stderr)
-            sys.exit(1)
+    Raises:
+        AppreciationError: If fiducials, alignment or mark detection fail
+    """
+    # One grayscale conversion shared by fiducials, marks and barcode
+    image = as_context(image)
+    # Convert once on this thread before the stages fan out, so the barcode
+    # stage reuses the cached plane instead of racing to build its own
+    to_gray(image)
     
-    # Decode barcode (QR code, Code128, etc.) from ballot footer
-    barcode_result = None
-    barcode_coords = template.get('barcode', {}).get('document_barcode', {})
-    if barcode_coords:
-        try:
-            mm_to_pixels = 300 / 25.4  # 11.811 pixels per mm
-            metadata_fallback = template.get('barcode', {}).get('document_barcode', {}).get('data')
-            barcode_result = decode_barcode(
-                image,  # Use original image (barcode is not affected by alignment)
-                barcode_coords,
-                mm_to_px_ratio=mm_to_pixels,
-                metadata_fallback=metadata_fallback
-            )
-        except Exception as e:
-            print(f"Warning: Barcode decode failed: {e}", file=sys.stderr)
-            # Continue without barcode - not critical for mark detection
+    # Decode barcode (QR code, Code128, etc.) from the ballot footer while
+    # fiducials, alignment and mark detection run on this thread
+    barcode_future = _submit_stage(_decode_document_barcode, image, template)
     
-    # Detect marks
     try:
-        # Handle both 'zones' (array) and 'bubble' (dict) formats
-        zones = template.get('zones', [])
-        if not zones:
-            # Convert bubble dict to zones array
-            # Coordinates in JSON are in millimeters, convert to pixels at 300 DPI
-            mm_to_pixels = 300 / 25.4  # 11.811 pixels per mm
+        # Align image based on fiducials (unless disabled)
+        inv_matrix = None  # No transformation needed if alignment is skipped
+        quality_metrics = None
+        fiducial_coords = None
+        
+        if no_align:
+            # Skip alignment for perfect test images
+            aligned_image = image
+        else:
+            # Detect fiducials
+            fiducials = detect_fiducials(image, template)
+            if fiducials is None:
+                raise AppreciationError("Could not detect 4 fiducial markers")
+            
+            # Store fiducial coordinates for output (sub-pixel centers; align_image
+            # gets the unrounded values)
+            fiducial_coords = {
+                corner: {'x': round(float(x), 2), 'y': round(float(y), 2)}
+                for corner, (x, y) in zip(('tl', 'tr', 'bl', 'br'), fiducials)
+            }
             
-            bubble_dict = template.get('bubble', {})
-            zones = []
-            for bubble_id, bubble_data in bubble_dict.items():
-                # Determine contest and code (supports both simple and verbose IDs)
-                if bubble_metadata and bubble_metadata.available:
-                    meta = bubble_metadata.get(bubble_id)
-                    if meta:
-                        # Use metadata (simple ID format)
-                        contest = meta['position_code']
-                        code = meta['candidate_code']
-                    else:
-                        # Metadata available but bubble not found - parse as fallback
-                        parts = bubble_id.rsplit('_', 1)
-                        contest = parts[0] if len(parts) > 1 else ''
-                        code = parts[1] if len(parts) > 1 else bubble_id
-                else:
-                    # No metadata - use legacy parsing (verbose ID format)
-                    parts = bubble_id.rsplit('_', 1)
-                    contest = parts[0] if len(parts) > 1 else ''
-                    code = parts[1] if len(parts) > 1 else bubble_id
-                
-                # Convert from mm to pixels
-                # Prefer center coordinates if available, otherwise use top-left
-                center_x_mm = bubble_data.get('center_x', bubble_data.get('x', 0))
-                center_y_mm = bubble_data.get('center_y', bubble_data.get('y', 0))
-                diameter_mm = bubble_data.get('diameter', bubble_data.get('width', 5))
-                
-                # Convert to pixels
-                center_x_px = center_x_mm * mm_to_pixels
-                center_y_px = center_y_mm * mm_to_pixels
-                diameter_px = diameter_mm * mm_to_pixels
-                
-                # Convert center coordinates to top-left for ROI extraction
-                x_px = center_x_px - (diameter_px / 2)
-                y_px = center_y_px - (diameter_px / 2)
-                
-                zones.append({
-                    'id': bubble_id,
-                    'contest': contest,
-                    'code': code,
-                    'x': int(x_px),
-                    'y': int(y_px),
-                    'width': int(diameter_px),
-                    'height': int(diameter_px)
-                })
+            # Align image (returns original image + inverse matrix for coordinate transform)
+            try:
+                aligned_image, quality_metrics, inv_matrix = align_image(image, fiducials, template)
+            except Exception as e:
+                raise AppreciationError(f"Alignment failed: {e}") from e
         
-        results = detect_marks(aligned_image, zones, threshold=threshold, inv_matrix=inv_matrix)
-    except Exception as e:
-        print(f"Error detecting marks: {e}", file=sys.stderr)
-        sys.exit(1)
+        # Detect marks
+        try:
+            if zones is None:
+                zones = build_zones(template, bubble_metadata)
+            
+            results = detect_marks(aligned_image, zones, threshold=threshold, inv_matrix=inv_matrix,
+                                   thresholds=thresholds, engine=engine, mask=mask)
+        except Exception as e:
+            raise AppreciationError(f"Mark detection failed: {e}") from e
+        
+        barcode_result = barcode_future.result()
+    finally:
+        # If a stage above raised, do not orphan the barcode stage: drop it if
+        # it has not started yet, otherwise wait for it to finish
+        if not barcode_future.cancel():
+            wait([barcode_future])
     
     # Prepare output
     document_id = barcode_result['document_id'] if barcode_result and barcode_result['decoded'] else template.get('document_id', '')
@@ -260,6 +267,254 @@ def main():
                 }
             }
     
+    return output
+
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp')
+
+# Shared per-process batch state, set once by _init_batch_worker()
+_batch_context: Dict = {}
+
+
+def resolve_batch_images(source: str) -> List[str]:
+    """Resolve a batch source to a sorted list of image paths.
+    
+    Args:
+        source: Directory of images, glob pattern, or manifest file
+                (one image path per line, relative to the manifest; '#' comments allowed)
+        
+    Returns:
+        List of image paths
+    """
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(source, name) for name in os.listdir(source)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+    
+    if os.path.isfile(source) and not source.lower().endswith(IMAGE_EXTENSIONS):
+        base_dir = os.path.dirname(os.path.abspath(source))
+        images = []
+        with open(source) as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    images.append(line if os.path.isabs(line) else os.path.join(base_dir, line))
+        return images
+    
+    return sorted(glob.glob(source))
+
+
+def batch_output_names(images: List[str]) -> Dict[str, str]:
+    """Map each batch image to its result file name, relative to the output directory.
+    
+    Names mirror each image's path below the images' common directory with the
+    extension swapped for .json, so same-named images from different folders
+    do not overwrite each other. Images that still collide (scan.png and
+    scan.jpg side by side) keep their extension: scan.png.json.
+    
+    Args:
+        images: Image paths from resolve_batch_images()
+        
+    Returns:
+        Dictionary of image path to relative result path
+    """
+    if not images:
+        return {}
+    absolute = {path: os.path.abspath(path) for path in images}
+    base = os.path.commonpath([os.path.dirname(path) for path in absolute.values()])
+    relative = {path: os.path.relpath(abs_path, base) for path, abs_path in absolute.items()}
+    
+    names = {path: os.path.splitext(rel)[0] + '.json' for path, rel in relative.items()}
+    owners: Dict[str, set] = {}
+    for path, name in names.items():
+        owners.setdefault(name, set()).add(absolute[path])
+    return {
+        path: name if len(owners[name]) == 1 else relative[path] + '.json'
+        for path, name in names.items()
+    }
+
+
+def _init_batch_worker(template: dict, zones: List[Dict], threshold: float, no_align: bool,
+                       engine: Optional[str] = None) -> None:
+    """Receive the parsed template and zones once per worker process."""
+    # One OpenCV thread per process; the pool already uses every core
+    cv2.setNumThreads(1)
+    warm_up_fiducial_detectors()
+    get_barcode_service().warm_up()
+    _batch_context.update(template=template, zones=zones, threshold=threshold, no_align=no_align,
+                          engine=engine)
+
+
+def _appreciate_batch_item(image_path: str) -> Tuple[str, Optional[Dict], Optional[str]]:
+    """Appreciate one batch image using the shared per-process context.
+    
+    Returns:
+        Tuple of (image_path, output, error) - exactly one of output/error is set
+    """
+    # Pipeline modules print diagnostics to stdout; keep them off the result stream
+    with redirect_stdout(sys.stderr):
+        image = ImageContext.load(image_path)
+        if image is None:
+            return image_path, None, f"Could not load image: {image_path}"
+        
+        try:
+            output = appreciate_image(
+                image,
+                _batch_context['template'],
+                threshold=_batch_context['threshold'],
+                no_align=_batch_context['no_align'],
+                zones=_batch_context['zones'],
+                engine=_batch_context['engine']
+            )
+        except AppreciationError as e:
+            return image_path, None, str(e)
+        except Exception as e:
+            return image_path, None, f"Unexpected error: {e}"
+        finally:
+            # Pool workers never run atexit handlers, so merge decoder stats per image
+            get_route_stats().flush()
+    
+    return image_path, output, None
+
+
+def run_batch(images: List[str], template: dict, zones: List[Dict], threshold: float = 0.3,
+              no_align: bool = False, workers: Optional[int] = None,
+              output_dir: Optional[str] = None, engine: Optional[str] = None) -> int:
+    """Appreciate many ballot images sharing one template across a process pool.
+    
+    Results are written as one JSON file per image (<output_dir>/<name>, see
+    batch_output_names()) or, without output_dir, as a JSON-lines stream on
+    stdout with an added 'image' key.
+    
+    Args:
+        images: Image paths to appreciate
+        template: Parsed template dictionary (shared by every image)
+        zones: Zones from build_zones() (shared by every image)
+        threshold: Fill threshold
+        no_align: Skip fiducial alignment
+        workers: Number of worker processes (default: CPU count)
+        output_dir: Directory for per-image result files
+        engine: Mark detection engine
+        
+    Returns:
+        Number of images that failed
+    """
+    workers = workers or os.cpu_count() or 1
+    output_names = {}
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        output_names = batch_output_names(images)
+    
+    init_args = (template, zones, threshold, no_align, engine)
+    if workers == 1:
+        _init_batch_worker(*init_args)
+        outcomes = map(_appreciate_batch_item, images)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                                       initargs=init_args)
+        chunksize = max(1, len(images) // (workers * 4))
+        outcomes = executor.map(_appreciate_batch_item, images, chunksize=chunksize)
+    
+    failed = 0
+    try:
+        for image_path, output, error in outcomes:
+            if error:
+                failed += 1
+                print(f"Error: {image_path}: {error}", file=sys.stderr)
+            
+            if output_dir:
+                if output is not None:
+                    output_path = os.path.join(output_dir, output_names[image_path])
+                    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                    with open(output_path, 'w') as f:
+                        json.dump(output, f, indent=2)
+            else:
+                record = {'image': image_path, 'error': error} if error else {'image': image_path, **output}
+                sys.stdout.write(json.dumps(record) + '\n')
+                sys.stdout.flush()
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    
+    print(f"Batch complete: {len(images) - failed}/{len(images)} images appreciated", file=sys.stderr)
+    return failed
+
+
+def main():
+    """Main entry point for OMR appreciation."""
+    parser = argparse.ArgumentParser(
+        description='Appreciate OMR marks on scanned ballot images'
+    )
+    parser.add_argument('image', help='Path to scanned ballot image (with --batch: directory, glob or manifest)')
+    parser.add_argument('template', help='Path to template JSON file')
+    parser.add_argument('--threshold', '-t', type=float, default=0.3,
+                       help='Fill threshold (0.0 to 1.0, default: 0.3)')
+    parser.add_argument('--no-align', action='store_true',
+                       help='Skip fiducial alignment (for perfect test images)')
+    parser.add_argument('--config-path', type=str, default=None,
+                       help='Path to election config directory (for bubble metadata lookup)')
+    parser.add_argument('--engine', choices=['vectorized', 'rectified', 'integral', 'per_zone'],
+                       default=None,
+                       help='Mark detection engine (default: OMR_MARK_ENGINE or vectorized)')
+    parser.add_argument('--batch', action='store_true',
+                       help='Appreciate every image from a directory, glob or manifest sharing this template')
+    parser.add_argument('--output-dir', type=str, default=None,
+                       help='Batch mode: write one result JSON per image here (default: JSON lines on stdout)')
+    parser.add_argument('--workers', '-j', type=int, default=None,
+                       help='Batch mode: number of worker processes (default: CPU count)')
+    
+    args = parser.parse_args()
+    
+    image_path = args.image
+    template_path = args.template
+    threshold = args.threshold
+    
+    # Load template
+    try:
+        template = load_template(template_path)
+    except Exception as e:
+        print(f"Error loading template: {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    # Compiled zones (cached on disk, keyed by template + config content)
+    zones = load_zone_table(template_path, args.config_path, template=template).zones()
+    
+    if args.batch:
+        images = resolve_batch_images(image_path)
+        if not images:
+            print(f"Error: No images found for batch source: {image_path}", file=sys.stderr)
+            sys.exit(1)
+        
+        # Workers receive the zones with the template at startup
+        failed = run_batch(images, template, zones, threshold=threshold, no_align=args.no_align,
+                           workers=args.workers, output_dir=args.output_dir, engine=args.engine)
+        sys.exit(1 if failed else 0)
+    
+    # Load image
+    try:
+        # Grayscale is all the pipeline needs
+        image = ImageContext.load(image_path)
+        if image is None:
+            raise ValueError(f"Could not load image: {image_path}")
+    except Exception as e:
+        print(f"Error loading image: {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    try:
+        output = appreciate_image(
+            image,
+            template,
+            threshold=threshold,
+            no_align=args.no_align,
+            zones=zones,
+            engine=args.engine
+        )
+    except AppreciationError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    
     # Output JSON
     output_json(output)
 
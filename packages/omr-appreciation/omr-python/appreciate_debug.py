@@ -36,6 +36,7 @@ def main():
     # Draw fiducials on original image (for debugging)
     debug_image = image.copy()
     for i, (x, y) in enumerate(fiducials):
+        x, y = int(round(x)), int(round(y))  # sub-pixel centers; drawing needs ints
         cv2.circle(debug_image, (x, y), 10, (0, 255, 0), 3)
         cv2.putText(debug_image, f"F{i}", (x+15, y), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
     
@@ -20,6 +20,9 @@ import math
 import sys
 import subprocess
 import os
+import queue
+import threading
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Dict, Any, Optional, List
 from collections import deque, defaultdict
@@ -28,11 +31,14 @@ import cv2
 import numpy as np
 
 # Import core OMR modules
-from image_aligner import detect_fiducials, align_image
-from mark_detector import detect_marks
-from barcode_decoder import decode_barcode
-from utils import load_template
+from image_aligner import FiducialTracker, detect_fiducials, align_image, warm_up_fiducial_detectors
+from image_context import ImageContext
+from mark_detector import detect_marks, transform_zone_coords
+from barcode_decoder import BarcodeSession
+from utils import load_template, write_json_atomic
 from bubble_metadata import load_bubble_metadata, BubbleMetadata
+from template_compiler import compile_zones, load_zone_table
+from cast_spool import CastSpool
 
 
 class VoteAccumulator:
@@ -41,19 +47,74 @@ class VoteAccumulator:
     
     Only marks a vote as "filled" when it's detected consistently
     for a minimum number of frames (e.g., 8 out of last 10 frames).
+    
+    Detections live in a fixed (window_size, n_bubbles) ring buffer indexed
+    by a stable per-bubble column, with running per-bubble counts, so each
+    frame is a few vectorized updates and memory does not grow with the
+    session. With ema_alpha set, votes follow an exponential moving average
+    of fill_ratio instead, with hysteresis: a bubble turns filled when the
+    average reaches fill_on and clears only when it drops to fill_off.
     """
     
-    def __init__(self, window_size: int = 10, threshold: int = 8):
+    def __init__(self, window_size: int = 10, threshold: int = 8, bubble_ids: Optional[List[str]] = None,
+                 ema_alpha: Optional[float] = None, fill_on: float = 0.35, fill_off: float = 0.25):
         """
         Args:
             window_size: Number of frames to track
             threshold: Minimum detections needed to confirm vote
+            bubble_ids: Bubbles to allocate columns for up front (others are added on first sight)
+            ema_alpha: Weight of the newest fill_ratio in the moving average (None: count detections)
+            fill_on: Moving average at which a bubble becomes filled
+            fill_off: Moving average at which a filled bubble clears
         """
         self.window_size = window_size
         self.threshold = threshold
-        self.history: Dict[str, deque] = defaultdict(lambda: deque(maxlen=window_size))
+        self.ema_alpha = ema_alpha
+        self.fill_on = fill_on
+        self.fill_off = fill_off
+        self.index: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._filled = np.zeros((window_size, 0), dtype=bool)
+        self._seen = np.zeros(0, dtype=np.int64)
+        self._counts = np.zeros(0, dtype=np.int32)
+        self._ema = np.zeros(0, dtype=np.float32)
+        self._stable = np.zeros(0, dtype=bool)
         self.stable_votes: Dict[str, bool] = {}
         self.vote_change_callbacks: List[callable] = []
+        if bubble_ids:
+            self._columns(bubble_ids)
+    
+    def _columns(self, bubble_ids) -> np.ndarray:
+        """Column of each bubble, allocating new ones as needed."""
+        for bubble_id in bubble_ids:
+            if bubble_id not in self.index:
+                self.index[bubble_id] = len(self._ids)
+                self._ids.append(bubble_id)
+        
+        n = len(self._ids)
+        capacity = self._seen.shape[0]
+        if n > capacity:
+            # Grow geometrically so late-appearing bubbles stay cheap
+            grow = max(n, capacity * 2) - capacity
+            self._filled = np.pad(self._filled, ((0, 0), (0, grow)))
+            self._seen = np.pad(self._seen, (0, grow))
+            self._counts = np.pad(self._counts, (0, grow))
+            self._ema = np.pad(self._ema, (0, grow))
+            self._stable = np.pad(self._stable, (0, grow))
+        return np.fromiter((self.index[b] for b in bubble_ids), dtype=np.intp, count=len(bubble_ids))
+    
+    @property
+    def history(self) -> Dict[str, List[bool]]:
+        """Recent detections per bubble seen since the last reset, oldest first."""
+        history = {}
+        for bubble_id, col in self.index.items():
+            seen = int(self._seen[col])
+            if seen == 0:
+                continue
+            n = min(seen, self.window_size)
+            rows = np.arange(seen - n, seen) % self.window_size
+            history[bubble_id] = self._filled[rows, col].tolist()
+        return history
     
     def update(self, frame_results: Dict[str, Dict]) -> Dict[str, bool]:
         """
@@ -62,37 +123,60 @@ class VoteAccumulator:
         Returns:
             Dict mapping bubble_id -> stable filled status
         """
-        # Update history for each bubble
-        for bubble_id, result in frame_results.items():
-            filled = result.get('filled', False)
-            self.history[bubble_id].append(filled)
+        if not frame_results:
+            return self.stable_votes
         
-        # Update stable votes
-        prev_stable = self.stable_votes.copy()
+        cols = self._columns(list(frame_results))
+        results = frame_results.values()
+        filled = np.fromiter((bool(r.get('filled', False)) for r in results), dtype=bool, count=len(cols))
         
-        for bubble_id, detections in self.history.items():
-            if len(detections) >= self.threshold:
-                count = sum(detections)
-                is_stable = count >= self.threshold
-                
-                # Check for state change
-                prev_state = self.stable_votes.get(bubble_id, False)
-                if is_stable != prev_state:
-                    self.stable_votes[bubble_id] = is_stable
-                    
-                    # Trigger callbacks
-                    for callback in self.vote_change_callbacks:
-                        callback(bubble_id, is_stable)
+        # Write this frame into each bubble's ring slot, keeping counts in step
+        rows = self._seen[cols] % self.window_size
+        self._counts[cols] += filled.astype(np.int32) - self._filled[rows, cols]
+        self._filled[rows, cols] = filled
+        self._seen[cols] += 1
+        
+        if self.ema_alpha is None:
+            eligible = np.minimum(self._seen[cols], self.window_size) >= self.threshold
+            is_stable = self._counts[cols] >= self.threshold
+        else:
+            fill = np.fromiter((r.get('fill_ratio', 1.0 if r.get('filled') else 0.0) for r in results),
+                               dtype=np.float32, count=len(cols))
+            ema = self._ema[cols] + self.ema_alpha * (fill - self._ema[cols])
+            self._ema[cols] = ema
+            eligible = np.ones(len(cols), dtype=bool)
+            is_stable = np.where(self._stable[cols], ema > self.fill_off, ema >= self.fill_on)
+        
+        # Apply and announce state changes
+        changed = eligible & (is_stable != self._stable[cols])
+        for col, state in zip(cols[changed], is_stable[changed]):
+            bubble_id = self._ids[col]
+            self._stable[col] = state
+            self.stable_votes[bubble_id] = bool(state)
+            
+            # Trigger callbacks
+            for callback in self.vote_change_callbacks:
+                callback(bubble_id, bool(state))
         
         return self.stable_votes
     
+    def fill_average(self, bubble_id: str) -> Optional[float]:
+        """Moving average of fill_ratio (None unless ema_alpha is set)."""
+        if self.ema_alpha is None or bubble_id not in self.index:
+            return None
+        return float(self._ema[self.index[bubble_id]])
+    
     def get_stable_votes(self) -> Dict[str, bool]:
         """Get current stable vote states."""
         return self.stable_votes.copy()
     
     def reset(self):
-        """Clear all history and stable votes."""
-        self.history.clear()
+        """Clear all history and stable votes (bubble columns are kept)."""
+        self._filled[:] = False
+        self._seen[:] = 0
+        self._counts[:] = 0
+        self._ema[:] = 0
+        self._stable[:] = False
         self.stable_votes.clear()
     
     def on_vote_change(self, callback: callable):
@@ -100,14 +184,194 @@ class VoteAccumulator:
         self.vote_change_callbacks.append(callback)
 
 
+class BubblePositionIndex:
+    """
+    Bubble ID -> (position code, candidate code), resolved once per bubble.
+    
+    Supports both simple bubble IDs (via metadata) and verbose IDs
+    (POSITION_CODE, split at the first underscore). Bubbles passed up front
+    are resolved immediately; others on first lookup.
+    """
+    
+    def __init__(self, bubble_metadata: Optional[BubbleMetadata] = None, bubble_ids: Optional[List[str]] = None):
+        self.bubble_metadata = bubble_metadata if bubble_metadata and bubble_metadata.available else None
+        self._index: Dict[str, tuple] = {}
+        for bubble_id in bubble_ids or []:
+            self.lookup(bubble_id)
+    
+    def lookup(self, bubble_id: str) -> tuple:
+        """
+        Returns:
+            (position_code, candidate_code); candidate_code is None for IDs
+            without metadata or an underscore
+        """
+        entry = self._index.get(bubble_id)
+        if entry is None:
+            meta = self.bubble_metadata.get(bubble_id) if self.bubble_metadata else None
+            if meta:
+                entry = (meta['position_code'], meta['candidate_code'])
+            else:
+                parts = bubble_id.split('_', 1)
+                entry = (parts[0], parts[1] if len(parts) == 2 else None)
+            self._index[bubble_id] = entry
+        return entry
+    
+    def position(self, bubble_id: str) -> str:
+        return self.lookup(bubble_id)[0]
+
+
+# cv2.imwrite parameter that takes --capture-quality, per capture format
+CAPTURE_QUALITY_PARAMS = {
+    'png': cv2.IMWRITE_PNG_COMPRESSION,
+    'jpg': cv2.IMWRITE_JPEG_QUALITY,
+    'webp': cv2.IMWRITE_WEBP_QUALITY,
+}
+
+
+class SessionWriter(threading.Thread):
+    """
+    Background disk writer for live sessions.
+    
+    Metadata and text writes are coalesced per file and debounced: only the
+    newest payload is written, at most debounce seconds after the first
+    pending request, via a temp file + rename. Captured frames are encoded and
+    written in order on this thread, so the render loop never waits on disk;
+    if the disk falls behind, the oldest pending frame is dropped once
+    max_pending_frames are queued.
+    """
+    
+    def __init__(self, debounce: float = 0.5, image_format: str = 'png', quality: Optional[int] = None,
+                 max_pending_frames: int = 32):
+        """
+        Args:
+            debounce: Seconds to wait for further updates before writing metadata
+            image_format: Capture format ('png', 'jpg' or 'webp')
+            quality: PNG compression (0-9) or JPEG/WebP quality (0-100); None for OpenCV defaults
+            max_pending_frames: Captures kept in the queue before the oldest is dropped
+        """
+        super().__init__(name='omr-session-writer', daemon=True)
+        if image_format not in CAPTURE_QUALITY_PARAMS:
+            raise ValueError(f"Unsupported capture format: {image_format}")
+        self.debounce = debounce
+        self.image_format = image_format
+        self.quality = quality
+        self.errors = 0
+        self.dropped_frames = 0
+        self._cond = threading.Condition()
+        self._metadata: Dict[Path, list] = {}  # path -> [due time, payload dict or bytes]
+        self._frames: deque = deque(maxlen=max(1, max_pending_frames))  # (path, frame)
+        self._busy = False
+        self._closed = False
+    
+    def save_metadata(self, path: Path, payload: Dict, immediate: bool = False):
+        """Queue a JSON write, replacing any pending payload for the same file."""
+        # Snapshot the written fields now: callers keep mutating their dicts (e.g. live
+        # votes) while this thread serializes. One level is enough for session metadata.
+        payload = {key: value.copy() if isinstance(value, (dict, list)) else value
+                   for key, value in payload.items()}
+        self._queue_metadata(path, payload, immediate)
+    
+    def save_frame(self, path: Path, frame: np.ndarray):
+        """Queue a frame capture (the caller must not modify frame afterwards)."""
+        with self._cond:
+            if len(self._frames) == self._frames.maxlen:
+                dropped, _ = self._frames[0]
+                self.dropped_frames += 1
+                print(f'Warning: Capture queue full, dropping {dropped}', file=sys.stderr)
+            self._frames.append((path, frame))
+            self._cond.notify()
+    
+    def save_text(self, path: Path, text: str):
+        """Queue a text file write (never dropped, unlike frames)."""
+        self._queue_metadata(path, text.encode(), immediate=True)
+    
+    def _queue_metadata(self, path: Path, payload, immediate: bool):
+        with self._cond:
+            due = time.monotonic() + (0.0 if immediate else self.debounce)
+            pending = self._metadata.get(path)
+            if pending:
+                # Keep the earlier deadline so a stream of updates still gets written
+                due = min(due, pending[0])
+            self._metadata[path] = [due, payload]
+            self._cond.notify()
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Write everything pending now; True once the queue is drained."""
+        with self._cond:
+            for entry in self._metadata.values():
+                entry[0] = 0.0
+            self._cond.notify()
+            return self._cond.wait_for(lambda: not (self._metadata or self._frames or self._busy), timeout)
+    
+    def close(self, timeout: Optional[float] = 5.0):
+        """Flush pending writes and stop the thread."""
+        if self.is_alive():
+            self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self.is_alive():
+            self.join(timeout)
+    
+    def encode(self, frame: np.ndarray) -> bytes:
+        params = [CAPTURE_QUALITY_PARAMS[self.image_format], self.quality] if self.quality is not None else []
+        ok, buffer = cv2.imencode(f'.{self.image_format}', frame, params)
+        if not ok:
+            raise ValueError(f"Could not encode frame as {self.image_format}")
+        return buffer.tobytes()
+    
+    def run(self):
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    due = [path for path, (when, _) in self._metadata.items() if when <= now]
+                    if self._frames or due or self._closed:
+                        break
+                    wait = min((when for when, _ in self._metadata.values()), default=now + 1.0) - now
+                    self._cond.wait(timeout=wait)
+                if self._closed and not self._frames and not self._metadata:
+                    return
+                jobs = [(path, self._metadata.pop(path)[1]) for path in due]
+                if self._closed:
+                    jobs += [(path, entry[1]) for path, entry in self._metadata.items()]
+                    self._metadata.clear()
+                jobs += list(self._frames)
+                self._frames.clear()
+                self._busy = True
+            
+            for path, item in jobs:
+                try:
+                    if isinstance(item, dict):
+                        write_json_atomic(str(path), item, indent=2)
+                    else:
+                        data = self.encode(item) if isinstance(item, np.ndarray) else item
+                        with open(path, 'wb') as f:
+                            f.write(data)
+                except (OSError, ValueError) as e:
+                    self.errors += 1
+                    print(f'Warning: Could not write {path}: {e}', file=sys.stderr)
+            
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+
 class BallotSession:
     """
     Track ballot processing session from detection to finalization.
     """
     
-    def __init__(self, document_id: str, session_dir: Path):
+    def __init__(self, document_id: str, session_dir: Path, writer: Optional[SessionWriter] = None):
+        """
+        Args:
+            document_id: Ballot document ID
+            session_dir: Parent directory for session folders
+            writer: Background writer for metadata and captures (None: write synchronously)
+        """
         self.document_id = document_id
         self.session_dir = session_dir
+        self.writer = writer
         self.session_id = datetime.now().strftime('%Y%m%d_%H%M%S')
         self.start_time = datetime.now()
         self.votes: Dict[str, bool] = {}
@@ -123,8 +387,14 @@ class BallotSession:
         self._save_metadata()
     
     def update_votes(self, stable_votes: Dict[str, bool]):
-        """Update current vote state."""
-        self.votes = stable_votes.copy()
+        """
+        Update current vote state.
+        
+        Keeps a reference to stable_votes (e.g. the accumulator's live dict)
+        rather than copying it every frame; metadata saves copy it when they
+        are queued.
+        """
+        self.votes = stable_votes
         self.frames_processed += 1
     
     def add_validation_error(self, position_code: str, message: str, vote_count: int, max_selections: int):
@@ -136,6 +406,7 @@ class BallotSession:
             'vote_count': vote_count,
             'max_selections': max_selections
         })
+        self._save_metadata()
     
     def freeze(self):
         """Freeze session (pause processing)."""
@@ -147,37 +418,33 @@ class BallotSession:
         self.status = 'active'
         self._save_metadata()
     
-    def finalize(self, bubble_metadata: Optional[BubbleMetadata] = None) -> str:
+    def finalize(self, bubble_metadata: Optional[BubbleMetadata] = None,
+                 positions: Optional[BubblePositionIndex] = None) -> str:
         """
         Finalize session and generate ballot string for Laravel.
         
         Supports both simple and verbose bubble ID formats.
         
+        Args:
+            bubble_metadata: Metadata for simple bubble IDs
+            positions: Prebuilt bubble -> position index (takes precedence over bubble_metadata)
+        
         Returns:
             Compact ballot string: "BAL-001|POSITION1:CODE1,CODE2;POSITION2:CODE3"
         """
         self.status = 'finalized'
-        self._save_metadata()
+        self._save_metadata(immediate=True)
+        
+        if positions is None:
+            positions = BubblePositionIndex(bubble_metadata)
         
         # Group votes by position
         position_votes: Dict[str, List[str]] = defaultdict(list)
         
         for bubble_id, filled in self.votes.items():
             if filled:
-                # Try metadata lookup first
-                if bubble_metadata and bubble_metadata.available:
-                    meta = bubble_metadata.get(bubble_id)
-                    if meta:
-                        position = meta['position_code']
-                        code = meta['candidate_code']
-                        position_votes[position].append(code)
-                        continue
-                
-                # Fall back to parsing for verbose IDs
-                parts = bubble_id.split('_', 1)
-                if len(parts) == 2:
-                    position = parts[0]
-                    code = parts[1]
+                position, code = positions.lookup(bubble_id)
+                if code is not None:
                     position_votes[position].append(code)
         
         # Build compact string
@@ -190,31 +457,42 @@ class BallotSession:
         
         # Save ballot string
         ballot_file = self.session_path / 'ballot.txt'
-        ballot_file.write_text(ballot_string)
+        if self.writer is not None:
+            self.writer.save_text(ballot_file, ballot_string)
+        else:
+            ballot_file.write_text(ballot_string)
         
         return ballot_string
     
     def save_frame(self, frame: np.ndarray, label: str = 'capture'):
-        """Save annotated frame to session directory."""
+        """Save annotated frame to session directory (encoded off-thread with a writer)."""
         timestamp = datetime.now().strftime('%H%M%S')
-        filename = f"{label}_{timestamp}.png"
+        extension = self.writer.image_format if self.writer is not None else 'png'
+        filename = f"{label}_{timestamp}.{extension}"
         filepath = self.session_path / filename
-        cv2.imwrite(str(filepath), frame)
+        if self.writer is not None:
+            self.writer.save_frame(filepath, frame)
+        else:
+            cv2.imwrite(str(filepath), frame)
         return filepath
     
-    def _save_metadata(self):
-        """Save session metadata to JSON."""
+    def _save_metadata(self, immediate: bool = False):
+        """Save session metadata to JSON (debounced with a writer unless immediate)."""
         metadata = {
             'session_id': self.session_id,
             'document_id': self.document_id,
             'start_time': self.start_time.isoformat(),
             'status': self.status,
             'frames_processed': self.frames_processed,
-            'votes': {k: v for k, v in self.votes.items() if v},
-            'validation_errors': self.validation_errors
+            # dict() copies in one step, so a concurrent update cannot break the iteration
+            'votes': {k: v for k, v in dict(self.votes).items() if v},
+            'validation_errors': list(self.validation_errors)
         }
         
         metadata_file = self.session_path / 'session.json'
+        if self.writer is not None:
+            self.writer.save_metadata(metadata_file, metadata, immediate)
+            return
         with open(metadata_file, 'w') as f:
             json.dump(metadata, f, indent=2)
     
@@ -236,6 +514,7 @@ class BallotSession:
         session.frames_processed = data['frames_processed']
         session.votes = data['votes']
         session.validation_errors = data['validation_errors']
+        session.writer = None
         
         return session
 
@@ -312,11 +591,18 @@ class AudioFeedback:
 class ContestValidator:
     """
     Validate vote selections against contest rules (max_selections).
+    
+    Per-position vote counts are kept incrementally: feed vote changes to
+    on_vote_change() (e.g. as a VoteAccumulator callback) and read results,
+    so each frame costs O(changed bubbles). validate() recounts a full vote
+    dict from scratch.
     """
     
-    def __init__(self, questionnaire_data: Optional[Dict], bubble_metadata: Optional[BubbleMetadata] = None):
+    def __init__(self, questionnaire_data: Optional[Dict], bubble_metadata: Optional[BubbleMetadata] = None,
+                 positions: Optional[BubblePositionIndex] = None):
         self.rules: Dict[str, int] = {}  # position_code -> max_selections
         self.bubble_metadata = bubble_metadata
+        self.positions = positions or BubblePositionIndex(bubble_metadata)
         
         if questionnaire_data and 'positions' in questionnaire_data:
             for position in questionnaire_data['positions']:
@@ -324,6 +610,48 @@ class ContestValidator:
                 max_sel = position.get('max_selections', 1)
                 if code:
                     self.rules[code] = max_sel
+        
+        self.results: Dict[str, Dict] = {}
+        self._filled: set = set()
+        self._new_overvotes: List[str] = []
+    
+    def reset(self):
+        """Clear all counts (new ballot)."""
+        self.results = {}
+        self._filled.clear()
+        self._new_overvotes.clear()
+    
+    def on_vote_change(self, bubble_id: str, is_filled: bool):
+        """Apply one stable vote change to its position's count."""
+        if is_filled == (bubble_id in self._filled):
+            return
+        if is_filled:
+            self._filled.add(bubble_id)
+        else:
+            self._filled.discard(bubble_id)
+        
+        position = self.positions.position(bubble_id)
+        previous = self.results.get(position)
+        count = (previous['count'] if previous else 0) + (1 if is_filled else -1)
+        if count == 0:
+            del self.results[position]
+            return
+        
+        max_sel = self.rules.get(position, 1)
+        overvote = count > max_sel
+        self.results[position] = {
+            'valid': not overvote,
+            'count': count,
+            'max': max_sel,
+            'overvote': overvote
+        }
+        if overvote and is_filled:
+            self._new_overvotes.append(position)
+    
+    def pop_new_overvotes(self) -> List[str]:
+        """Positions that went over their limit (or further over) since the last call."""
+        positions, self._new_overvotes = self._new_overvotes, []
+        return positions
     
     def validate(self, votes: Dict[str, bool]) -> Dict[str, Dict]:
         """
@@ -340,43 +668,16 @@ class ContestValidator:
                 'overvote': bool
             }
         """
-        # Group votes by position
-        position_counts: Dict[str, int] = defaultdict(int)
-        
+        self.reset()
         for bubble_id, filled in votes.items():
             if filled:
-                # Try metadata lookup first
-                if self.bubble_metadata and self.bubble_metadata.available:
-                    meta = self.bubble_metadata.get(bubble_id)
-                    if meta:
-                        position = meta['position_code']
-                        position_counts[position] += 1
-                        continue
-                
-                # Fall back to parsing for verbose IDs
-                parts = bubble_id.split('_', 1)
-                if len(parts) >= 1:
-                    position = parts[0]
-                    position_counts[position] += 1
-        
-        # Validate each position
-        results = {}
-        for position, count in position_counts.items():
-            max_sel = self.rules.get(position, 1)
-            overvote = count > max_sel
-            
-            results[position] = {
-                'valid': not overvote,
-                'count': count,
-                'max': max_sel,
-                'overvote': overvote
-            }
-        
-        return results
+                self.on_vote_change(bubble_id, True)
+        self._new_overvotes.clear()
+        return self.results
     
-    def get_overvotes(self, votes: Dict[str, bool]) -> List[str]:
-        """Get list of positions with overvotes."""
-        validation = self.validate(votes)
+    def get_overvotes(self, votes: Optional[Dict[str, bool]] = None) -> List[str]:
+        """Get list of positions with overvotes (current counts if votes is None)."""
+        validation = self.validate(votes) if votes is not None else self.results
         return [pos for pos, result in validation.items() if result['overvote']]
 
 
@@ -419,12 +720,26 @@ Examples:
                    help='Vote accumulator window size (default: 10 frames)')
     ap.add_argument('--accumulator-threshold', type=int, default=8,
                    help='Vote accumulator threshold (default: 8 detections)')
+    ap.add_argument('--accumulator-ema', type=float, default=None, metavar='ALPHA',
+                   help='Stabilize votes on a moving average of fill ratio with this weight (e.g. 0.3)')
+    ap.add_argument('--accumulator-hysteresis', type=float, default=0.05,
+                   help='With --accumulator-ema: fill ratio margin around --threshold (default: 0.05)')
     ap.add_argument('--session-dir', type=str, default='storage/app/live-sessions',
                    help='Directory for session storage (default: storage/app/live-sessions)')
     ap.add_argument('--validate-contests', action='store_true',
                    help='Enable multi-contest validation (overvote detection)')
     ap.add_argument('--config-path', type=str, default=None,
                    help='Path to election config directory (for bubble metadata lookup)')
+    ap.add_argument('--cast-spool', type=str, default='storage/app/cast-spool',
+                   help='Directory of the durable spool of finalized ballots (default: storage/app/cast-spool)')
+    ap.add_argument('--capture-format', choices=sorted(CAPTURE_QUALITY_PARAMS), default='png',
+                   help='Image format for saved frames (default: png)')
+    ap.add_argument('--capture-quality', type=int, default=None,
+                   help='PNG compression 0-9, or JPEG/WebP quality 0-100 (default: OpenCV default)')
+    ap.add_argument('--no-tracking', action='store_true',
+                   help='Run full fiducial detection on every frame instead of optical-flow tracking')
+    ap.add_argument('--reanchor-interval', type=int, default=30,
+                   help='Frames between full fiducial detections while tracking (default: 30)')
     
     return ap.parse_args()
 
@@ -565,45 +880,18 @@ def convert_bubbles_to_zones(
     
     Supports both simple IDs (via metadata) and verbose IDs (via parsing).
     """
-    zones = []
-    for bubble_id, bubble in bubbles.items():
-        center_x_px = bubble['center_x'] * mm_to_px
-        center_y_px = bubble['center_y'] * mm_to_px
-        diameter_px = bubble['diameter'] * mm_to_px
-        radius_px = diameter_px / 2
-        
-        # Determine contest and code
-        if bubble_metadata and bubble_metadata.available:
-            meta = bubble_metadata.get(bubble_id)
-            if meta:
-                # Use metadata (simple ID format)
-                contest = meta['position_code']
-                code = meta['candidate_code']
-            else:
-                # Metadata available but bubble not found - parse as fallback
-                contest = bubble_id.rsplit('_', 1)[0] if '_' in bubble_id else ''
-                code = bubble_id.rsplit('_', 1)[1] if '_' in bubble_id else bubble_id
-        else:
-            # No metadata - use legacy parsing (verbose ID format)
-            contest = bubble_id.rsplit('_', 1)[0] if '_' in bubble_id else ''
-            code = bubble_id.rsplit('_', 1)[1] if '_' in bubble_id else bubble_id
-        
-        zones.append({
-            'id': bubble_id,
-            'contest': contest,
-            'code': code,
-            'x': int(center_x_px - radius_px),
-            'y': int(center_y_px - radius_px),
-            'width': int(diameter_px),
-            'height': int(diameter_px)
-        })
-    return zones
+    return compile_zones({'bubble': bubbles}, bubble_metadata, dpi=mm_to_px * 25.4).zones()
 
 
 def draw_overlay(frame, fiducials, results, barcode_result=None, quality=None, 
                 angle_deg=None, fps=None, questionnaire_data=None, 
-                validation_results=None, session=None, is_frozen=False, bubble_metadata=None):
-    """Draw AR overlay with fiducials, bubbles, barcode info, quality, and validation warnings."""
+                validation_results=None, session=None, is_frozen=False, bubble_metadata=None,
+                capture_fps=None, process_fps=None):
+    """Draw AR overlay with fiducials, bubbles, barcode info, quality, and validation warnings.
+    
+    The HUD shows camera capture FPS and pipeline processing FPS separately
+    (fps is the single-rate display used before the pipeline was threaded).
+    """
     mm_to_px = 11.811
     
     # Draw fiducials (if detected)
@@ -708,6 +996,14 @@ def draw_overlay(frame, fiducials, results, barcode_result=None, quality=None,
         cv2.putText(frame, f'FPS: {fps:.1f}', (20, y), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1, cv2.LINE_AA)
         y += 24
+    if capture_fps is not None:
+        cv2.putText(frame, f'Capture FPS: {capture_fps:.1f}', (20, y), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1, cv2.LINE_AA)
+        y += 24
+    if process_fps is not None:
+        cv2.putText(frame, f'Process FPS: {process_fps:.1f}', (20, y), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1, cv2.LINE_AA)
+        y += 24
     
     # Validation warnings (bottom-left corner)
     if validation_results:
@@ -783,6 +1079,210 @@ def compute_angle(fiducials):
     return angle
 
 
+FIDUCIAL_CORNERS = ('tl', 'tr', 'bl', 'br')
+
+
+def fiducials_to_corners(fiducials) -> Dict[str, np.ndarray]:
+    """Map detect_fiducials() output [tl, tr, bl, br] to named corner points."""
+    if not fiducials:
+        return {}
+    return {name: np.asarray(point, dtype=np.float32) for name, point in zip(FIDUCIAL_CORNERS, fiducials)}
+
+
+def marks_by_bubble(results: List[Dict], zones: List[Dict],
+                    inv_matrix: Optional[np.ndarray]) -> Dict[str, Dict]:
+    """Key detect_marks() results by bubble id, adding frame-space centers for the overlay."""
+    coords = np.array([[z['x'], z['y'], z['width'], z['height']] for z in zones], dtype=np.int64).reshape(-1, 4)
+    if inv_matrix is not None:
+        coords = transform_zone_coords(coords, inv_matrix)
+    
+    by_bubble = {}
+    for result, (x, y, w, h) in zip(results, coords.tolist()):
+        by_bubble[result['id']] = dict(result, center_x=x + w / 2, center_y=y + h / 2, radius=max(w, h) / 2)
+    return by_bubble
+
+
+class RateMeter:
+    """Smoothed events-per-second for the HUD (one writer thread)."""
+    
+    def __init__(self, smoothing: float = 0.9):
+        self.smoothing = smoothing
+        self.rate: Optional[float] = None
+        self._last: Optional[float] = None
+    
+    def tick(self):
+        now = time.perf_counter()
+        if self._last is not None and now > self._last:
+            instant = 1.0 / (now - self._last)
+            self.rate = instant if self.rate is None else \
+                self.smoothing * self.rate + (1 - self.smoothing) * instant
+        self._last = now
+
+
+def _put_latest(slot: queue.Queue, item):
+    """Put into a size-1 queue, replacing whatever stale item it holds."""
+    while True:
+        try:
+            slot.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                slot.get_nowait()
+            except queue.Empty:
+                pass
+
+
+class FrameGrabber(threading.Thread):
+    """
+    Capture stage: reads the camera as fast as it delivers and keeps only
+    the newest frame, so processing and display never work on a backlog.
+    """
+    
+    def __init__(self, cap):
+        super().__init__(name='omr-capture', daemon=True)
+        self.cap = cap
+        self.fps = RateMeter()
+        self.failed = False
+        self.stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._latest = None
+        self._frame_id = 0
+        self._to_process: queue.Queue = queue.Queue(maxsize=1)
+        self.new_frame = threading.Event()
+    
+    def run(self):
+        while not self.stop_event.is_set():
+            ok, frame = self.cap.read()
+            if not ok:
+                self.failed = True
+                break
+            self.fps.tick()
+            with self._lock:
+                self._frame_id += 1
+                self._latest = (self._frame_id, frame)
+            _put_latest(self._to_process, (self._frame_id, frame))
+            self.new_frame.set()
+    
+    def latest(self):
+        """Newest (frame_id, frame), or None before the first frame."""
+        with self._lock:
+            return self._latest
+    
+    def next_for_processing(self, timeout: float = 0.1):
+        """Newest frame not yet handed to the processor (stale ones are dropped)."""
+        try:
+            return self._to_process.get(timeout=timeout)
+        except queue.Empty:
+            return None
+    
+    def stop(self):
+        self.stop_event.set()
+
+
+@dataclass
+class ProcessedFrame:
+    """Pipeline output for one captured frame."""
+    frame_id: int
+    fiducials: Dict[str, np.ndarray] = field(default_factory=dict)
+    results: Dict[str, Dict] = field(default_factory=dict)
+    barcode_result: Optional[Dict] = None
+    quality: Optional[Dict] = None
+    angle: Optional[float] = None
+    frame: Optional[np.ndarray] = None
+
+
+class FrameProcessor(threading.Thread):
+    """
+    Processing stage: runs fiducials, alignment, marks and barcode on the
+    newest captured frame and publishes the most recent result. Session,
+    accumulator and validation state stay on the render thread.
+    """
+    
+    def __init__(self, grabber: FrameGrabber, template: Dict, zones: List[Dict],
+                 threshold: float, barcode_config: Optional[Dict], mm_to_px: float,
+                 tracker: Optional[FiducialTracker] = None, mask: Optional[str] = None):
+        super().__init__(name='omr-process', daemon=True)
+        self.grabber = grabber
+        self.template = template
+        self.zones = zones
+        self.threshold = threshold
+        self.mask = mask  # None: OMR_BUBBLE_MASK (see get_bubble_mask)
+        self.barcode_config = barcode_config
+        self.mm_to_px = mm_to_px
+        self.tracker = tracker
+        # Full decodes only until a visual read, then a cheap same-ballot check
+        self.barcode = None
+        if barcode_config:
+            self.barcode = BarcodeSession(
+                barcode_config,
+                mm_to_px_ratio=mm_to_px,
+                metadata_fallback=template.get('document_id'),
+                template_id=template.get('template_id')
+            )
+        self.fps = RateMeter()
+        self.paused = threading.Event()
+        self._results: queue.Queue = queue.Queue(maxsize=1)
+    
+    def run(self):
+        while not self.grabber.stop_event.is_set():
+            item = self.grabber.next_for_processing()
+            if item is None or self.paused.is_set():
+                continue
+            frame_id, frame = item
+            try:
+                processed = self.process(frame_id, frame)
+            except Exception as e:
+                print(f'Warning: Processing error: {e}', file=sys.stderr)
+                processed = ProcessedFrame(frame_id)
+            self.fps.tick()
+            _put_latest(self._results, processed)
+    
+    def process(self, frame_id: int, frame: np.ndarray) -> ProcessedFrame:
+        # One grayscale conversion per frame, shared by all stages
+        ctx = ImageContext(frame)
+        
+        # Track fiducials from the previous frame (full detection on loss/re-anchor)
+        if self.tracker is not None:
+            fiducials = self.tracker.update(ctx)
+        else:
+            fiducials = detect_fiducials(ctx, self.template)
+        if fiducials is None or len(fiducials) < 4:
+            # Page lost: the next ballot in view may be a different one
+            if self.barcode is not None:
+                self.barcode.reset()
+            return ProcessedFrame(frame_id)
+        
+        # Align image using core module (returns the frame unchanged + inverse matrix)
+        _, quality, inv_matrix = align_image(ctx, fiducials, self.template)
+        corners = fiducials_to_corners(fiducials)
+        
+        # Detect marks using core module
+        marks = detect_marks(ctx, self.zones, threshold=self.threshold, inv_matrix=inv_matrix,
+                             mask=self.mask)
+        
+        # Decode barcode using core module (if configured)
+        barcode_result = None
+        if self.barcode is not None:
+            barcode_result = self.barcode.decode(ctx, inv_matrix)
+        
+        return ProcessedFrame(
+            frame_id=frame_id,
+            fiducials=corners,
+            results=marks_by_bubble(marks, self.zones, inv_matrix),
+            barcode_result=barcode_result,
+            quality=quality,
+            angle=compute_angle(corners),
+            frame=frame
+        )
+    
+    def latest_result(self) -> Optional[ProcessedFrame]:
+        """Newest unseen result, or None if nothing new was processed."""
+        try:
+            return self._results.get_nowait()
+        except queue.Empty:
+            return None
+
+
 def main():
     args = parse_args()
     
@@ -810,7 +1310,10 @@ def main():
         print('ℹ️  No bubble metadata loaded (using legacy parsing)')
     
     # Convert bubbles to zones for mark detector
-    zones = convert_bubbles_to_zones(template['bubble'], bubble_metadata=bubble_metadata)
+    if args.template:
+        zones = load_zone_table(args.template, args.config_path, template=template).zones()
+    else:
+        zones = convert_bubbles_to_zones(template['bubble'], bubble_metadata=bubble_metadata)
     print(f'✓ Loaded {len(zones)} bubbles')
     
     # Load questionnaire data for candidate names and validation
@@ -836,19 +1339,34 @@ def main():
     
     print(f'✓ Camera {args.camera} opened')
     
+    # Build fiducial detectors before the first frame
+    frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or 640, int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or 480)
+    warm_up_fiducial_detectors(frame_size=frame_size)
+    
     # Initialize Phase 4 components
     accumulator = VoteAccumulator(
         window_size=args.accumulator_window,
-        threshold=args.accumulator_threshold
+        threshold=args.accumulator_threshold,
+        bubble_ids=[zone['id'] for zone in zones],
+        ema_alpha=args.accumulator_ema,
+        fill_on=args.threshold + args.accumulator_hysteresis,
+        fill_off=args.threshold - args.accumulator_hysteresis
     )
-    print(f'✓ Vote accumulator initialized ({args.accumulator_threshold}/{args.accumulator_window} frames)')
+    if args.accumulator_ema is not None:
+        print(f'✓ Vote accumulator initialized (fill EMA {args.accumulator_ema}, '
+              f'on {accumulator.fill_on:.2f} / off {accumulator.fill_off:.2f})')
+    else:
+        print(f'✓ Vote accumulator initialized ({args.accumulator_threshold}/{args.accumulator_window} frames)')
     
     audio = AudioFeedback(enabled=not args.no_audio)
     if audio.enabled:
         print('✓ Audio feedback enabled')
     
-    validator = ContestValidator(questionnaire_data, bubble_metadata) if args.validate_contests else None
+    # Bubble -> position resolved once, shared by validation and finalize
+    positions = BubblePositionIndex(bubble_metadata, [zone['id'] for zone in zones])
+    validator = ContestValidator(questionnaire_data, bubble_metadata, positions) if args.validate_contests else None
     if validator:
+        accumulator.on_vote_change(validator.on_vote_change)
         print(f'✓ Contest validator initialized ({len(validator.rules)} positions)')
     
     session_dir = Path(args.session_dir)
@@ -856,6 +1374,17 @@ def main():
     session: Optional[BallotSession] = None
     print(f'✓ Session directory: {session_dir}')
     
+    # Session JSON and captures are written off the render thread
+    writer = SessionWriter(image_format=args.capture_format, quality=args.capture_quality)
+    writer.start()
+    
+    # Finalized ballots are spooled to disk and cast to Laravel in batches
+    project_root = Path(__file__).resolve().parent.parent.parent.parent
+    spool = CastSpool(Path(args.cast_spool), cwd=str(project_root))
+    spool.start()
+    if spool.pending():
+        print(f'✓ Cast spool: {spool.pending()} ballot(s) left from a previous run')
+    
     # Setup vote change callbacks for audio feedback
     def on_vote_change(bubble_id: str, is_filled: bool):
         if is_filled:
@@ -873,129 +1402,115 @@ def main():
     print('  F     - Finalize ballot (cast to Laravel)')
     print('\nStarting live appreciation...\n')
     
+    # Pipeline: capture thread -> processing thread -> render loop (this thread)
+    grabber = FrameGrabber(cap)
+    processor = FrameProcessor(
+        grabber, template, zones, args.threshold,
+        barcode_config=None if args.no_barcode else barcode_config,
+        mm_to_px=mm_to_px,
+        tracker=None if args.no_tracking else FiducialTracker(template, reanchor_interval=args.reanchor_interval)
+    )
+    grabber.start()
+    processor.start()
+    
     # State
-    prev_t = time.time()
-    fps = None
     show_warp = args.show_warp
     is_frozen = False
     frozen_frame = None
     last_document_id = None
+    current = ProcessedFrame(0)
+    validation_results = None
     
-    while True:
+    while not grabber.failed:
         # Use frozen frame if available
         if is_frozen and frozen_frame is not None:
             frame = frozen_frame.copy()
         else:
-            ok, frame = cap.read()
-            if not ok:
-                print('✗ Failed to read frame', file=sys.stderr)
-                break
-        
-        # Initialize results
-        results = {}
-        barcode_result = None
-        quality = None
-        angle = None
-        validation_results = None
+            # Render at camera rate rather than spinning on the same frame
+            grabber.new_frame.wait(timeout=0.05)
+            grabber.new_frame.clear()
+            latest = grabber.latest()
+            if latest is None:
+                if cv2.waitKey(5) & 0xFF == 27:
+                    break
+                continue
+            # Draw on a copy; the processor may still be reading this frame
+            frame = latest[1].copy()
         
-        # Skip processing if frozen
-        if not is_frozen:
-            # Detect fiducials using core module
-            fiducials = detect_fiducials(frame, template)
+        # Apply a newly processed result to the session state
+        processed = processor.latest_result() if not is_frozen else None
+        if processed is not None:
+            current = processed
+            validation_results = None
+            results = current.results
+            barcode_result = current.barcode_result
             
-            # If we have enough fiducials, do alignment and detection
-            if fiducials and sum(1 for v in fiducials.values() if v is not None) >= 4:
-                try:
-                    # Align image using core module
-                    aligned, quality, inv_matrix = align_image(frame, fiducials, template)
-                    
-                    # Compute angle
-                    angle = compute_angle(fiducials)
-                    
-                    # Detect marks using core module
-                    results = detect_marks(aligned, zones, threshold=args.threshold, inv_matrix=inv_matrix)
-                    
-                    # Decode barcode using core module (if not disabled)
-                    if not args.no_barcode and barcode_config:
-                        barcode_result = decode_barcode(
-                            frame,
-                            barcode_config,
-                            mm_to_px_ratio=mm_to_px,
-                            metadata_fallback=template.get('document_id')
-                        )
-                    
-                    # Check for new ballot
-                    if barcode_result and barcode_result.get('decoded'):
-                        document_id = barcode_result.get('document_id')
-                        if document_id != last_document_id:
-                            # New ballot detected
-                            last_document_id = document_id
-                            audio.ballot_detected()
-                            
-                            # Create new session
-                            if session:
-                                session._save_metadata()  # Save previous session
-                            session = BallotSession(document_id, session_dir)
-                            accumulator.reset()
-                            print(f'\n✓ New ballot session: {document_id}')
-                    
-                    # Update vote accumulator
-                    stable_votes = accumulator.update(results)
-                    
-                    # Update results to show stable votes only
-                    for bubble_id, result in results.items():
-                        result['filled'] = stable_votes.get(bubble_id, False)
-                    
-                    # Update session
-                    if session:
-                        session.update_votes(stable_votes)
-                    
-                    # Validate contests
-                    if validator:
-                        validation_results = validator.validate(stable_votes)
+            if results:
+                # Check for new ballot
+                if barcode_result and barcode_result.get('decoded'):
+                    document_id = barcode_result.get('document_id')
+                    if document_id != last_document_id:
+                        # New ballot detected
+                        last_document_id = document_id
+                        audio.ballot_detected()
                         
-                        # Check for overvotes and trigger audio warning
-                        overvotes = [pos for pos, res in validation_results.items() if res['overvote']]
-                        if overvotes and session:
-                            for position in overvotes:
-                                res = validation_results[position]
-                                session.add_validation_error(
-                                    position,
-                                    'Overvote detected',
-                                    res['count'],
-                                    res['max']
-                                )
-                            audio.overvote_warning()
+                        # Create new session
+                        if session:
+                            session._save_metadata()  # Save previous session
+                        session = BallotSession(document_id, session_dir, writer)
+                        accumulator.reset()
+                        if validator:
+                            validator.reset()
+                        print(f'\n✓ New ballot session: {document_id}')
+                
+                # Update vote accumulator
+                stable_votes = accumulator.update(results)
+                
+                # Update results to show stable votes only
+                for bubble_id, result in results.items():
+                    result['filled'] = stable_votes.get(bubble_id, False)
+                
+                # Update session
+                if session:
+                    session.update_votes(stable_votes)
+                
+                # Validate contests (counts follow the accumulator's vote changes)
+                if validator:
+                    validation_results = validator.results
                     
-                    # Show warped view if enabled
-                    if show_warp:
-                        cv2.imshow('Warped Page (debug)', aligned)
-                        
-                except Exception as e:
-                    print(f'Warning: Processing error: {e}', file=sys.stderr)
-            else:
-                # No fiducials detected - maintain last state
-                fiducials = {}
-        else:
-            # Frozen - maintain last state
-            fiducials = {}
-        
-        # Draw overlay
-        draw_overlay(
-            frame, fiducials, results, barcode_result, quality, angle,
-            fps=None if args.no_fps else fps,
-            questionnaire_data=questionnaire_data,
-            validation_results=validation_results,
-            session=session,
-            is_frozen=is_frozen,
-            bubble_metadata=bubble_metadata
-        )
+                    # Warn once per new overvote rather than on every frame
+                    overvotes = validator.pop_new_overvotes()
+                    if overvotes and session:
+                        for position in overvotes:
+                            res = validation_results[position]
+                            session.add_validation_error(
+                                position,
+                                'Overvote detected',
+                                res['count'],
+                                res['max']
+                            )
+                        audio.overvote_warning()
+                
+                # Show warped view if enabled (alignment does not warp; this is the processed frame)
+                if show_warp and current.frame is not None:
+                    cv2.imshow('Warped Page (debug)', current.frame)
         
-        # Update FPS
-        now = time.time()
-        dt = now - prev_t
-        fps = (1.0 / dt) if dt > 0 else fps
-        prev_t = now
+        # Draw the most recent result onto the most recent frame
+        if is_frozen:
+            draw_overlay(frame, {}, {}, is_frozen=True, session=session,
+                         capture_fps=None, process_fps=None)
+        else:
+            draw_overlay(
+                frame, current.fiducials, current.results, current.barcode_result,
+                current.quality, current.angle,
+                capture_fps=None if args.no_fps else grabber.fps.rate,
+                process_fps=None if args.no_fps else processor.fps.rate,
+                questionnaire_data=questionnaire_data,
+                validation_results=validation_results,
+                session=session,
+                is_frozen=is_frozen,
+                bubble_metadata=bubble_metadata
+            )
         
         # Display
         cv2.imshow('Live AR Ballot Appreciation', frame)
@@ -1011,12 +1526,15 @@ def main():
         elif key == ord(' '):  # SPACE - Freeze/unfreeze
             is_frozen = not is_frozen
             if is_frozen:
+                processor.paused.set()
                 frozen_frame = frame.copy()
                 if session:
                     session.freeze()
                 print('  ⏸ FROZEN')
             else:
+                processor.paused.clear()
                 frozen_frame = None
+                current = ProcessedFrame(0)
                 if session:
                     session.unfreeze()
                 print('  ▶ RESUMED')
@@ -1027,42 +1545,44 @@ def main():
             else:
                 # Save to temp location
                 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                filepath = session_dir / f'capture_{timestamp}.png'
-                cv2.imwrite(str(filepath), frame)
+                filepath = session_dir / f'capture_{timestamp}.{writer.image_format}'
+                writer.save_frame(filepath, frame)
                 print(f'  💾 Saved: {filepath}')
         elif key == ord('f') or key == ord('F'):  # Finalize ballot
             if session and session.status == 'active':
-                ballot_string = session.finalize(bubble_metadata)
+                ballot_string = session.finalize(bubble_metadata, positions)
                 print(f'\n✓ Ballot finalized: {ballot_string}')
                 
-                # Call Laravel artisan command
+                # Queue for Laravel; the spool casts in the background
                 try:
-                    script_dir = Path(__file__).parent
-                    project_root = script_dir.parent.parent.parent
-                    result = subprocess.run(
-                        ['php', 'artisan', 'election:cast-ballot', ballot_string],
-                        cwd=str(project_root),
-                        capture_output=True,
-                        text=True,
-                        timeout=10
-                    )
-                    
-                    if result.returncode == 0:
-                        print('✓ Cast to Laravel successfully')
-                        audio.processing_complete()
-                    else:
-                        print(f'✗ Laravel cast failed: {result.stderr}')
-                except Exception as e:
-                    print(f'✗ Laravel integration error: {e}')
+                    spool.submit(ballot_string)
+                    print(f'✓ Queued for Laravel ({spool.pending()} pending)')
+                    audio.processing_complete()
+                except OSError as e:
+                    print(f'✗ Could not spool ballot: {e}')
                 
                 # Reset for next ballot
                 session = None
                 accumulator.reset()
+                if validator:
+                    validator.reset()
                 last_document_id = None
             else:
                 print('  ⚠ No active session to finalize')
     
+    if grabber.failed:
+        print('✗ Failed to read frame', file=sys.stderr)
+    
     # Cleanup
+    grabber.stop()
+    grabber.join(timeout=1.0)
+    processor.join(timeout=5.0)
+    if session:
+        session._save_metadata()
+    writer.close()
+    remaining = spool.close()
+    if remaining:
+        print(f'⚠ {remaining} ballot(s) still spooled in {args.cast_spool} (cast later with cast_spool.py)')
     cap.release()
     cv2.destroyAllWindows()
     print('\n✓ Appreciation session ended')
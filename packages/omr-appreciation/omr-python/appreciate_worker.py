@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""Persistent OMR appreciation worker.
+
+Runs the appreciate.py pipeline in a long-lived process so the interpreter,
+OpenCV/NumPy imports, parsed templates and threshold config stay warm
+between ballots. Jobs arrive as JSON lines, either on stdin or over a Unix
+socket, and each reply is the same output document appreciate.py prints.
+
+Usage:
+    python appreciate_worker.py                          # JSON lines on stdin/stdout
+    python appreciate_worker.py --socket /tmp/omr.sock   # Unix socket daemon
+
+Job format (one JSON object per line):
+    {"image": "ballot.png", "template": "coordinates.json",
+     "threshold": 0.3, "no_align": false, "config_path": null}
+
+Optional "id" is echoed back as "job_id". Failed jobs reply with
+{"error": "..."} instead of the output document.
+"""
+
+import sys
+import os
+import json
+import socketserver
+import argparse
+from collections import OrderedDict
+from contextlib import redirect_stdout
+from typing import Dict, Optional, Tuple, Any
+
+from utils import load_template
+from bubble_metadata import load_bubble_metadata, BubbleMetadata
+from appreciate import appreciate_image, AppreciationError
+from template_compiler import CONFIG_FILES, load_zone_table
+from image_aligner import warm_up_fiducial_detectors
+from image_context import ImageContext
+from barcode_decoder import get_barcode_service
+
+
+def _config_mtimes(config_path: Optional[str]) -> Tuple[Optional[float], ...]:
+    """mtime of each election config file (None for a missing file)."""
+    if not config_path:
+        return ()
+    mtimes = []
+    for name in CONFIG_FILES:
+        try:
+            mtimes.append(os.path.getmtime(os.path.join(config_path, name)))
+        except OSError:
+            mtimes.append(None)
+    return tuple(mtimes)
+
+
+class AppreciationWorker:
+    """
+    Appreciate ballots one job at a time, caching everything that is shared
+    between ballots of the same template.
+
+    Cached templates, bubble metadata and zones are rebuilt when the mtime of
+    any file they were built from changes, and each cache keeps only the
+    cache_size most recently used entries.
+    """
+
+    def __init__(self, default_threshold: float = 0.3, default_config_path: Optional[str] = None,
+                 cache_size: int = 16):
+        """
+        Args:
+            default_threshold: Fill threshold for jobs that don't specify one
+            default_config_path: Election config directory for jobs that don't specify one
+            cache_size: Entries kept per cache (templates, metadata, zones)
+        """
+        self.default_threshold = default_threshold
+        self.default_config_path = default_config_path
+        self.cache_size = max(1, cache_size)
+        self._templates: 'OrderedDict[str, Tuple[float, Dict]]' = OrderedDict()
+        self._metadata: 'OrderedDict[Optional[str], Tuple[tuple, BubbleMetadata]]' = OrderedDict()
+        self._zones: 'OrderedDict[Tuple[str, Optional[str]], Tuple[tuple, list]]' = OrderedDict()
+        self.jobs_processed = 0
+
+    def _cached(self, cache: OrderedDict, key, stamp, build):
+        """Return cache[key] if built at the same stamp, else build it, evicting the LRU entry."""
+        cached = cache.get(key)
+        if cached is None or cached[0] != stamp:
+            cached = (stamp, build())
+            cache[key] = cached
+        cache.move_to_end(key)
+        while len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return cached[1]
+
+    def get_template(self, template_path: str) -> Dict:
+        """Load template, reusing the parsed copy while the file is unchanged."""
+        return self._cached(self._templates, template_path, os.path.getmtime(template_path),
+                            lambda: load_template(template_path))
+
+    def get_bubble_metadata(self, config_path: Optional[str]) -> BubbleMetadata:
+        """Load bubble metadata, reusing it while the config files are unchanged."""
+        return self._cached(self._metadata, config_path, _config_mtimes(config_path),
+                            lambda: load_bubble_metadata(config_path))
+
+    def get_zones(self, template_path: str, config_path: Optional[str]) -> list:
+        """Build zones, reusing them while the template and config files are unchanged."""
+        template = self.get_template(template_path)
+        stamp = (os.path.getmtime(template_path), _config_mtimes(config_path))
+        return self._cached(
+            self._zones, (template_path, config_path), stamp,
+            lambda: load_zone_table(template_path, config_path, template=template).zones()
+        )
+
+    def handle(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Appreciate a single job.
+
+        Returns:
+            Output document, or {'error': message} if the job failed
+        """
+        image_path = job.get('image')
+        template_path = job.get('template')
+        if not image_path or not template_path:
+            return {'error': "Job requires 'image' and 'template'"}
+
+        config_path = job.get('config_path', self.default_config_path)
+        threshold = job.get('threshold')
+        threshold = self.default_threshold if threshold is None else float(threshold)
+
+        try:
+            template = self.get_template(template_path)
+            zones = self.get_zones(template_path, config_path)
+        except Exception as e:
+            return {'error': f"Error loading template: {e}"}
+
+        image = ImageContext.load(image_path)
+        if image is None:
+            return {'error': f"Error loading image: Could not load image: {image_path}"}
+
+        try:
+            output = appreciate_image(
+                image,
+                template,
+                threshold=threshold,
+                no_align=bool(job.get('no_align', False)),
+                bubble_metadata=self.get_bubble_metadata(config_path),
+                zones=zones
+            )
+        except AppreciationError as e:
+            return {'error': f"Error: {e}"}
+
+        self.jobs_processed += 1
+        return output
+
+    def handle_line(self, line: str) -> Optional[str]:
+        """
+        Process one JSON line and return the JSON reply line.
+
+        Returns None for blank lines.
+        """
+        line = line.strip()
+        if not line:
+            return None
+
+        try:
+            job = json.loads(line)
+            if not isinstance(job, dict):
+                raise ValueError('job must be a JSON object')
+        except ValueError as e:
+            return json.dumps({'error': f"Invalid job: {e}"})
+
+        # Pipeline modules print diagnostics to stdout; keep them off the reply stream
+        with redirect_stdout(sys.stderr):
+            try:
+                reply = self.handle(job)
+            except Exception as e:
+                reply = {'error': f"Unexpected error: {e}"}
+
+        if 'id' in job:
+            reply['job_id'] = job['id']
+
+        return json.dumps(reply)
+
+
+def serve_stdio(worker: AppreciationWorker) -> None:
+    """Read jobs from stdin and write one reply line per job to stdout."""
+    for line in sys.stdin:
+        reply = worker.handle_line(line)
+        if reply is not None:
+            sys.stdout.write(reply + '\n')
+            sys.stdout.flush()
+
+
+class _JobHandler(socketserver.StreamRequestHandler):
+    """Handle JSON-line jobs on one socket connection."""
+
+    def handle(self):
+        for raw in self.rfile:
+            reply = self.server.worker.handle_line(raw.decode('utf-8'))
+            if reply is not None:
+                self.wfile.write((reply + '\n').encode('utf-8'))
+                self.wfile.flush()
+
+
+def serve_socket(worker: AppreciationWorker, socket_path: str) -> None:
+    """Serve jobs over a Unix socket until interrupted."""
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    with socketserver.UnixStreamServer(socket_path, _JobHandler) as server:
+        server.worker = worker
+        print(f"Appreciation worker listening on {socket_path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+
+def main():
+    """Main entry point for the appreciation worker."""
+    parser = argparse.ArgumentParser(
+        description='Long-lived OMR appreciation worker (JSON lines over stdin or a Unix socket)'
+    )
+    parser.add_argument('--socket', type=str, default=None,
+                       help='Listen on this Unix socket path instead of stdin/stdout')
+    parser.add_argument('--threshold', '-t', type=float, default=0.3,
+                       help='Default fill threshold for jobs without one (default: 0.3)')
+    parser.add_argument('--config-path', type=str, default=None,
+                       help='Default election config directory for jobs without one')
+
+    args = parser.parse_args()
+
+    worker = AppreciationWorker(
+        default_threshold=args.threshold,
+        default_config_path=args.config_path
+    )
+    warm_up_fiducial_detectors()
+    get_barcode_service().warm_up()
+
+    if args.socket:
+        serve_socket(worker, args.socket)
+    else:
+        serve_stdio(worker)
+
+
+if __name__ == '__main__':
+    main()
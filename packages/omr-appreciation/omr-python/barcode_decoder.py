@@ -5,6 +5,12 @@ Barcode Decoder Module
 Extracts and decodes barcodes (Code128, QR, etc.) from ballot images using
 coordinates from the template. Supports multiple decoders with fallback strategy.
 
+Decoder backends live in a per-process BarcodeDecoderService, so the pyzxing
+reader and scratch directory are set up once rather than per ballot. PDF417 is
+decoded in memory by zxing-cpp (a requirements.txt dependency) without starting
+a JVM; pyzxing and the zxing CLI still start a process per decode and are only
+fallbacks for environments without zxing-cpp.
+
 Usage:
     from barcode_decoder import decode_barcode
     
@@ -17,27 +23,37 @@ import numpy as np
 import subprocess
 import tempfile
 import os
-from typing import Dict, Optional, Tuple
+import json
+import sys
+import atexit
+import shutil
+import threading
+import importlib.util
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple, Union
 
+from image_context import ImageContext
+from utils import get_cache_dir, write_json_atomic
 
-def extract_barcode_roi(
-    image: np.ndarray, 
-    barcode_coords: Dict, 
-    mm_to_px_ratio: float = 11.811,
-    padding: int = 50
-) -> Tuple[np.ndarray, Dict]:
+try:
+    import fcntl
+except ImportError:  # Windows: stats merges are then only safe within one process
+    fcntl = None
+
+
+def barcode_template_rect(barcode_coords: Dict, mm_to_px_ratio: float = 11.811,
+                          padding: int = 50) -> Tuple[int, int, int, int]:
     """
-    Extract barcode region of interest from image using coordinates.
+    Barcode search region in template pixels, before any clipping to an image.
     
     Args:
-        image: Input image (BGR format from cv2.imread)
         barcode_coords: Dictionary with 'x', 'y', and 'type' from coordinates.json
         mm_to_px_ratio: Conversion ratio (default: 300 DPI = 11.811 px/mm)
         padding: Extra pixels around barcode region for better detection
         
     Returns:
-        Tuple of (roi_image, roi_rect_dict)
-        roi_rect_dict contains {x, y, width, height} in pixels
+        Tuple of (x, y, width, height); x/y may be negative and the region
+        may extend past any particular image
     """
     # Convert mm to pixels
     x_px = int(barcode_coords['x'] * mm_to_px_ratio)
@@ -60,12 +76,39 @@ def extract_barcode_roi(
         width_px = int(100 * mm_to_px_ratio)
         height_px = int(30 * mm_to_px_ratio)
     
-    # Apply padding and bounds checking
+    return x_px - padding, y_px - padding, width_px + 2 * padding, height_px + 2 * padding
+
+
+def extract_barcode_roi(
+    image: Union[np.ndarray, ImageContext], 
+    barcode_coords: Dict, 
+    mm_to_px_ratio: float = 11.811,
+    padding: int = 50
+) -> Tuple[np.ndarray, Dict]:
+    """
+    Extract barcode region of interest from image using coordinates.
+    
+    Args:
+        image: Input image (BGR format from cv2.imread), or ImageContext
+               (its grayscale plane is cropped; preprocess_roi needs no color)
+        barcode_coords: Dictionary with 'x', 'y', and 'type' from coordinates.json
+        mm_to_px_ratio: Conversion ratio (default: 300 DPI = 11.811 px/mm)
+        padding: Extra pixels around barcode region for better detection
+        
+    Returns:
+        Tuple of (roi_image, roi_rect_dict)
+        roi_rect_dict contains {x, y, width, height} in pixels
+    """
+    if isinstance(image, ImageContext):
+        image = image.gray
+    
+    # Bounds checking
+    x, y, width, height = barcode_template_rect(barcode_coords, mm_to_px_ratio, padding)
     h, w = image.shape[:2]
-    x1 = max(0, x_px - padding)
-    y1 = max(0, y_px - padding)
-    x2 = min(w, x_px + width_px + padding)
-    y2 = min(h, y_px + height_px + padding)
+    x1 = min(max(0, x), w)
+    y1 = min(max(0, y), h)
+    x2 = max(min(w, x + width), x1)
+    y2 = max(min(h, y + height), y1)
     
     roi = image[y1:y2, x1:x2]
     
@@ -117,37 +160,128 @@ def preprocess_roi(roi: np.ndarray, apply_clahe: bool = True, apply_sharpen: boo
     return gray
 
 
-def decode_pdf417_pyzxing(roi: np.ndarray) -> Optional[Dict]:
+_UNSET = object()
+
+
+class BarcodeDecoderService:
     """
-    Decode PDF417 barcode using pyzxing library (ZXing wrapper).
+    Long-lived barcode decoding backends.
     
-    Args:
-        roi: Preprocessed ROI image (BGR or grayscale)
-        
-    Returns:
-        Dictionary with decode result or None if not found:
-        {
-            'data': str,
-            'type': str,
-            'rect': None,
-            'confidence': float
-        }
+    One instance per process (see get_barcode_service()) keeps the pyzxing
+    BarCodeReader (which locates/downloads the ZXing jar on construction),
+    the zxing-cpp module and a scratch directory for file-based decoders
+    alive across ballots and frames.
     """
-    try:
-        from pyzxing import BarCodeReader
-        
-        # Save ROI to temporary file (pyzxing requires file path)
-        with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
-            tmp_path = tmp.name
-            cv2.imwrite(tmp_path, roi)
+    
+    def __init__(self):
+        self._zxingcpp = _UNSET
+        self._pyzxing_reader = _UNSET
+        self._scratch_dir: Optional[str] = None
+        self._available: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+    
+    def _get_zxingcpp(self):
+        """zxing-cpp module, or None if not installed (import attempted once)."""
+        if self._zxingcpp is _UNSET:
+            try:
+                import zxingcpp
+                self._zxingcpp = zxingcpp
+            except ImportError:
+                self._zxingcpp = None
+        return self._zxingcpp
+    
+    def _get_pyzxing_reader(self):
+        """Shared pyzxing BarCodeReader, or None if pyzxing is not installed."""
+        with self._lock:
+            if self._pyzxing_reader is _UNSET:
+                try:
+                    from pyzxing import BarCodeReader
+                    self._pyzxing_reader = BarCodeReader()
+                except ImportError:
+                    self._pyzxing_reader = None
+        return self._pyzxing_reader
+    
+    def _write_scratch(self, roi: np.ndarray) -> str:
+        """Write ROI to a per-thread PNG in the service's scratch directory."""
+        with self._lock:
+            if self._scratch_dir is None:
+                self._scratch_dir = tempfile.mkdtemp(prefix='omr-barcode-')
+                atexit.register(self.close)
+        path = os.path.join(self._scratch_dir, f'roi-{threading.get_ident()}.png')
+        cv2.imwrite(path, roi)
+        return path
+    
+    def is_available(self, decoder: str) -> bool:
+        """Whether a decoder's library/binary is installed (checked once per decoder)."""
+        with self._lock:
+            if decoder not in self._available:
+                if decoder == 'pyzbar':
+                    self._available[decoder] = importlib.util.find_spec('pyzbar') is not None
+                elif decoder == 'zxing_cli':
+                    self._available[decoder] = shutil.which('zxing') is not None
+                elif decoder == 'pyzxing':
+                    self._available[decoder] = importlib.util.find_spec('pyzxing') is not None
+                elif decoder == 'zxingcpp':
+                    self._available[decoder] = importlib.util.find_spec('zxingcpp') is not None
+                else:
+                    self._available[decoder] = True
+        return self._available[decoder]
+    
+    def warm_up(self) -> None:
+        """Import/construct the available backends ahead of the first ballot."""
+        self._get_zxingcpp()
+        self._get_pyzxing_reader()
+    
+    def close(self) -> None:
+        """Remove the scratch directory."""
+        if self._scratch_dir is not None:
+            shutil.rmtree(self._scratch_dir, ignore_errors=True)
+            self._scratch_dir = None
+    
+    def decode_zxingcpp(self, roi: np.ndarray) -> Optional[Dict]:
+        """Decode any supported symbology in memory with zxing-cpp (no JVM, no temp file)."""
+        zxingcpp = self._get_zxingcpp()
+        if zxingcpp is None:
+            return None
         
         try:
-            # Decode with pyzxing
-            reader = BarCodeReader()
-            results = reader.decode(tmp_path)
+            barcodes = zxingcpp.read_barcodes(np.ascontiguousarray(roi))
+        except Exception as e:
+            print(f"zxing-cpp decode error: {e}", file=sys.stderr)
+            return None
+        
+        for barcode in barcodes:
+            if not barcode.text:
+                continue
             
-            # Clean up temp file
-            os.unlink(tmp_path)
+            position = barcode.position
+            xs = [p.x for p in (position.top_left, position.top_right, position.bottom_left, position.bottom_right)]
+            ys = [p.y for p in (position.top_left, position.top_right, position.bottom_left, position.bottom_right)]
+            barcode_format = getattr(barcode.format, 'name', str(barcode.format)).split('.')[-1]
+            
+            return {
+                'data': barcode.text.strip(),
+                'type': barcode_format.upper(),
+                'rect': {
+                    'x': min(xs),
+                    'y': min(ys),
+                    'width': max(xs) - min(xs),
+                    'height': max(ys) - min(ys)
+                },
+                'confidence': 1.0
+            }
+        
+        return None
+    
+    def decode_pyzxing(self, roi: np.ndarray) -> Optional[Dict]:
+        """Decode PDF417 with the shared pyzxing reader."""
+        reader = self._get_pyzxing_reader()
+        if reader is None:
+            return None
+        
+        try:
+            # pyzxing requires a file path
+            results = reader.decode(self._write_scratch(roi))
             
             # Look for PDF417 results
             for result in results:
@@ -165,19 +299,87 @@ def decode_pdf417_pyzxing(roi: np.ndarray) -> Optional[Dict]:
                     }
             
             return None
-        finally:
-            # Ensure temp file cleanup even if decode fails
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
         
-    except ImportError:
-        # pyzxing not available
-        return None
-    except Exception as e:
-        # Decode failed
-        import sys
-        print(f"pyzxing decode error: {e}", file=sys.stderr)
-        return None
+        except Exception as e:
+            # Decode failed
+            print(f"pyzxing decode error: {e}", file=sys.stderr)
+            return None
+    
+    def decode_zxing_cli(self, roi: np.ndarray) -> Optional[Dict]:
+        """Decode PDF417 with the ZXing CLI."""
+        try:
+            # Run ZXing CLI
+            result = subprocess.run(
+                ['zxing', '--multi', self._write_scratch(roi)],
+                capture_output=True,
+                text=True,
+                timeout=5
+            )
+            
+            if result.returncode == 0:
+                # Parse output: "file:path: PDF417: DATA"
+                for line in result.stdout.strip().splitlines():
+                    if 'PDF417' in line:
+                        parts = line.split(':', maxsplit=2)
+                        if len(parts) >= 3:
+                            data = parts[2].strip()
+                            return {
+                                'data': data,
+                                'type': 'PDF417',
+                                'rect': None,  # ZXing CLI doesn't provide rect
+                                'confidence': 0.9  # Slightly lower than pyzbar
+                            }
+            
+            return None
+        
+        except (FileNotFoundError, subprocess.TimeoutExpired, Exception):
+            # ZXing not available or failed
+            return None
+
+
+_barcode_service: Optional[BarcodeDecoderService] = None
+
+
+def get_barcode_service() -> BarcodeDecoderService:
+    """Get or create the process-wide BarcodeDecoderService."""
+    global _barcode_service
+    if _barcode_service is None:
+        _barcode_service = BarcodeDecoderService()
+    return _barcode_service
+
+
+def decode_zxingcpp(roi: np.ndarray) -> Optional[Dict]:
+    """
+    Decode a barcode in memory with zxing-cpp (PDF417, QR, Code128, ...).
+    
+    Args:
+        roi: Preprocessed ROI image (grayscale)
+        
+    Returns:
+        Dictionary with decode result or None if not found / not installed
+    """
+    return get_barcode_service().decode_zxingcpp(roi)
+
+
+def decode_pdf417_pyzxing(roi: np.ndarray) -> Optional[Dict]:
+    """
+    Decode PDF417 barcode using pyzxing library (ZXing wrapper).
+    
+    The BarCodeReader is shared across calls via get_barcode_service().
+    
+    Args:
+        roi: Preprocessed ROI image (BGR or grayscale)
+        
+    Returns:
+        Dictionary with decode result or None if not found:
+        {
+            'data': str,
+            'type': str,
+            'rect': None,
+            'confidence': float
+        }
+    """
+    return get_barcode_service().decode_pyzxing(roi)
 
 
 def decode_pdf417_pyzbar(roi: np.ndarray) -> Optional[Dict]:
@@ -240,70 +442,180 @@ def decode_pdf417_zxing(roi: np.ndarray) -> Optional[Dict]:
     Returns:
         Dictionary with decode result or None if not found
     """
-    try:
-        # Save ROI to temporary file
-        with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
-            tmp_path = tmp.name
-            cv2.imwrite(tmp_path, roi)
-        
-        # Run ZXing CLI
-        result = subprocess.run(
-            ['zxing', '--multi', tmp_path],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        
-        # Clean up temp file
-        os.unlink(tmp_path)
-        
-        if result.returncode == 0:
-            # Parse output: "file:path: PDF417: DATA"
-            for line in result.stdout.strip().splitlines():
-                if 'PDF417' in line:
-                    parts = line.split(':', maxsplit=2)
-                    if len(parts) >= 3:
-                        data = parts[2].strip()
-                        return {
-                            'data': data,
-                            'type': 'PDF417',
-                            'rect': None,  # ZXing CLI doesn't provide rect
-                            'confidence': 0.9  # Slightly lower than pyzbar
-                        }
+    return get_barcode_service().decode_zxing_cli(roi)
+
+
+# Decoder name -> decode function(roi) -> Optional[Dict]
+DECODERS = {
+    'pyzbar': decode_pdf417_pyzbar,
+    'zxingcpp': decode_zxingcpp,
+    'pyzxing': decode_pdf417_pyzxing,
+    'zxing_cli': decode_pdf417_zxing,
+}
+
+# Symbology (template document_barcode.type) -> decoders able to read it, in
+# default order, and ROI preprocessing variants to try with each decoder.
+# pyzbar cannot read PDF417 and the ZXing paths here only report PDF417.
+BARCODE_ROUTES = {
+    'PDF417': {'decoders': ['zxingcpp', 'pyzxing', 'zxing_cli'], 'variants': ['enhanced', 'raw']},
+    'QRCODE': {'decoders': ['pyzbar', 'zxingcpp'], 'variants': ['enhanced', 'raw']},
+    'CODE128': {'decoders': ['pyzbar', 'zxingcpp'], 'variants': ['enhanced', 'raw']},
+    'DEFAULT': {'decoders': ['pyzbar', 'zxingcpp', 'pyzxing', 'zxing_cli'], 'variants': ['enhanced']},
+}
+
+ROI_VARIANTS = {
+    'enhanced': lambda roi: preprocess_roi(roi),
+    'raw': lambda roi: preprocess_roi(roi, apply_clahe=False, apply_sharpen=False),
+}
+
+
+def normalize_symbology(barcode_type: Optional[str]) -> str:
+    """Normalize a template barcode type ('qr', 'QR_CODE', 'pdf-417') to a BARCODE_ROUTES key."""
+    key = (barcode_type or '').upper().replace('_', '').replace('-', '').replace(' ', '')
+    if key in ('QR', 'QRCODE'):
+        return 'QRCODE'
+    return key if key in BARCODE_ROUTES else 'DEFAULT'
+
+
+class BarcodeRouteStats:
+    """
+    Per-template decoder hit counts, persisted as JSON.
+    
+    Counts are kept per '<template_id>:<symbology>' key; order() puts the
+    decoder with the best hit rate first. Increments are buffered and merged
+    into the file on flush under an exclusive lock on '<path>.lock', so several
+    processes (batch mode) can share it. atexit only covers the main process;
+    pool workers flush explicitly after each image.
+    """
+    
+    FLUSH_EVERY = 20
+    
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: JSON stats file (None keeps stats in memory only)
+        """
+        self.path = path
+        self._counts: Dict[str, Dict[str, Dict[str, int]]] = self._read() if path else {}
+        self._pending: Dict[str, Dict[str, Dict[str, int]]] = {}
+        self._pending_updates = 0
+        self._lock = threading.Lock()
+        if path:
+            atexit.register(self.flush)
+    
+    def _read(self) -> Dict:
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+    
+    def order(self, key: str, decoders: List[str]) -> List[str]:
+        """Decoders sorted by hits/attempts (best first), the route order breaking ties."""
+        counts = self._counts.get(key, {})
         
-        return None
+        def hit_rate(name: str) -> float:
+            entry = counts.get(name, {})
+            return entry.get('hits', 0) / entry['attempts'] if entry.get('attempts') else 0.0
         
-    except (FileNotFoundError, subprocess.TimeoutExpired, Exception):
-        # ZXing not available or failed
-        return None
+        # sorted() is stable, so equal rates keep the configured route order
+        return sorted(decoders, key=lambda name: -hit_rate(name))
+    
+    def record(self, key: str, decoder: str, hit: bool) -> None:
+        """Count one attempt (and hit) for a decoder."""
+        with self._lock:
+            for counts in (self._counts, self._pending):
+                entry = counts.setdefault(key, {}).setdefault(decoder, {'attempts': 0, 'hits': 0})
+                entry['attempts'] += 1
+                entry['hits'] += int(hit)
+            self._pending_updates += 1
+            should_flush = self.path and self._pending_updates >= self.FLUSH_EVERY
+        if should_flush:
+            self.flush()
+    
+    @contextmanager
+    def _file_lock(self):
+        """Hold an exclusive lock on the stats file across its read-merge-write."""
+        with open(self.path + '.lock', 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    
+    def flush(self) -> None:
+        """Merge buffered counts into the stats file."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._pending:
+                return
+            try:
+                with self._file_lock():
+                    merged = self._read()
+                    for key, decoders in self._pending.items():
+                        for decoder, entry in decoders.items():
+                            target = merged.setdefault(key, {}).setdefault(decoder, {'attempts': 0, 'hits': 0})
+                            target['attempts'] += entry['attempts']
+                            target['hits'] += entry['hits']
+                    write_json_atomic(self.path, merged)
+            except OSError as e:
+                print(f"Warning: Could not save barcode stats: {e}", file=sys.stderr)
+                return
+            self._counts = merged
+            self._pending = {}
+            self._pending_updates = 0
+
+
+_route_stats: Optional[BarcodeRouteStats] = None
+
+
+def get_route_stats() -> BarcodeRouteStats:
+    """Get the process-wide decoder stats (OMR_BARCODE_STATS=0 keeps them in memory)."""
+    global _route_stats
+    if _route_stats is None:
+        path = None
+        if os.environ.get('OMR_BARCODE_STATS', '1') != '0':
+            try:
+                path = os.path.join(get_cache_dir(), 'barcode_stats.json')
+            except OSError:
+                path = None
+        _route_stats = BarcodeRouteStats(path)
+    return _route_stats
 
 
 def decode_barcode(
-    image: np.ndarray,
+    image: Union[np.ndarray, ImageContext],
     barcode_coords: Dict,
     mm_to_px_ratio: float = 11.811,
-    metadata_fallback: Optional[str] = None
+    metadata_fallback: Optional[str] = None,
+    template_id: Optional[str] = None
 ) -> Dict:
     """
     Main barcode decoding function with multi-decoder fallback strategy.
     
     Strategy:
-    1. Try pyzbar on preprocessed ROI
-    2. If fails, try pyzxing (PDF417 support)
-    3. If fails, try ZXing CLI
-    4. If fails, fall back to metadata from coordinates.json
+    1. Look up the route for barcode_coords['type'] in BARCODE_ROUTES
+       (decoders that can read the symbology, and ROI preprocessing variants)
+    2. Skip decoders that are not installed
+    3. Try the rest, the decoder with the most past hits for this template first
+    4. If all fail, fall back to metadata from coordinates.json
     
     Args:
-        image: Input ballot image (BGR format)
+        image: Input ballot image (BGR format) or ImageContext
         barcode_coords: Barcode coordinates from coordinates.json
         mm_to_px_ratio: Pixel to mm conversion ratio (default for 300 DPI)
         metadata_fallback: Fallback document ID from coordinates.json
+        template_id: Template ID for per-template decoder hit statistics
         
     Returns:
         Dictionary with:
         {
             'document_id': str or None,
-            'decoder': 'pyzbar', 'pyzxing', 'zxing_cli', 'metadata', or 'none',
+            'decoder': 'pyzbar', 'zxingcpp', 'pyzxing', 'zxing_cli', 'metadata', or 'none',
             'confidence': float (0.0 to 1.0),
             'rect': dict or None,
             'decoded': bool,
@@ -349,47 +661,37 @@ def decode_barcode(
         result['decode_time_ms'] = (time.time() - start_time) * 1000
         return result
     
-    # Preprocess ROI
-    roi_processed = preprocess_roi(roi)
-    
-    # Try pyzbar first (supports Code128, QR, Code39, etc.)
-    result['attempts'].append('pyzbar')
-    decode_result = decode_pdf417_pyzbar(roi_processed)
-    if decode_result:
-        result['document_id'] = decode_result['data']
-        result['decoder'] = 'pyzbar'
-        result['confidence'] = decode_result['confidence']
-        result['decoded'] = True
-        result['source'] = 'visual'
-        result['barcode_type'] = decode_result['type']
-        result['decode_time_ms'] = (time.time() - start_time) * 1000
-        return result
-    
-    # Try pyzxing fallback (supports PDF417, requires Java)
-    result['attempts'].append('pyzxing')
-    decode_result = decode_pdf417_pyzxing(roi_processed)
-    if decode_result:
-        result['document_id'] = decode_result['data']
-        result['decoder'] = 'pyzxing'
-        result['confidence'] = decode_result['confidence']
-        result['decoded'] = True
-        result['source'] = 'visual'
-        result['barcode_type'] = decode_result['type']
-        result['decode_time_ms'] = (time.time() - start_time) * 1000
-        return result
-    
-    # Try ZXing CLI fallback (if installed)
-    result['attempts'].append('zxing_cli')
-    decode_result = decode_pdf417_zxing(roi_processed)
-    if decode_result:
-        result['document_id'] = decode_result['data']
-        result['decoder'] = 'zxing_cli'
-        result['confidence'] = decode_result['confidence']
-        result['decoded'] = True
-        result['source'] = 'visual'
-        result['barcode_type'] = decode_result['type']
-        result['decode_time_ms'] = (time.time() - start_time) * 1000
-        return result
+    # Route by symbology, most successful decoder for this template first
+    symbology = normalize_symbology(barcode_coords.get('type'))
+    route = BARCODE_ROUTES[symbology]
+    stats = get_route_stats()
+    stats_key = f"{template_id or '*'}:{symbology}"
+    service = get_barcode_service()
+    
+    variants: Dict[str, np.ndarray] = {}
+    for decoder_name in stats.order(stats_key, route['decoders']):
+        if not service.is_available(decoder_name):
+            continue
+        
+        result['attempts'].append(decoder_name)
+        decode_result = None
+        for variant in route['variants']:
+            if variant not in variants:
+                variants[variant] = ROI_VARIANTS[variant](roi)
+            decode_result = DECODERS[decoder_name](variants[variant])
+            if decode_result:
+                break
+        
+        stats.record(stats_key, decoder_name, decode_result is not None)
+        if decode_result:
+            result['document_id'] = decode_result['data']
+            result['decoder'] = decoder_name
+            result['confidence'] = decode_result['confidence']
+            result['decoded'] = True
+            result['source'] = 'visual'
+            result['barcode_type'] = decode_result['type']
+            result['decode_time_ms'] = (time.time() - start_time) * 1000
+            return result
     
     # Fall back to metadata if visual decode failed
     result['attempts'].append('metadata_fallback')
@@ -404,6 +706,155 @@ def decode_barcode(
     return result
 
 
+def barcode_signature(
+    image: Union[np.ndarray, ImageContext],
+    barcode_coords: Dict,
+    mm_to_px_ratio: float = 11.811,
+    inv_matrix: Optional[np.ndarray] = None,
+    size: Tuple[int, int] = (64, 16)
+) -> Optional[np.ndarray]:
+    """
+    Small normalized thumbnail of the barcode region, for "same ballot?" checks.
+    
+    Args:
+        image: Input image (BGR or grayscale) or ImageContext
+        barcode_coords: Barcode coordinates from coordinates.json
+        mm_to_px_ratio: Pixel to mm conversion ratio
+        inv_matrix: Optional template->image homography; the region is then
+                    sampled where the page actually is, so camera motion
+                    does not change the signature. The unclipped template
+                    rect is warped, and only the warped region is clipped
+                    to the frame (frames are usually smaller than the page)
+        size: Thumbnail (width, height)
+        
+    Returns:
+        Zero-mean, unit-norm float32 vector, or None if the region is empty/flat
+    """
+    gray = image.gray if isinstance(image, ImageContext) else image
+    if gray.ndim == 3:
+        gray = cv2.cvtColor(gray, cv2.COLOR_BGR2GRAY)
+    
+    if inv_matrix is not None:
+        # Warp the template rect straight into the thumbnail
+        x, y, w, h = barcode_template_rect(barcode_coords, mm_to_px_ratio)
+        corners = np.float32([[x, y], [x + w, y], [x + w, y + h], [x, y + h]]).reshape(-1, 1, 2)
+        target = cv2.perspectiveTransform(corners, inv_matrix.astype(np.float64)).reshape(-1, 2)
+        frame_h, frame_w = gray.shape[:2]
+        if target[:, 0].max() <= 0 or target[:, 1].max() <= 0 \
+                or target[:, 0].min() >= frame_w or target[:, 1].min() >= frame_h:
+            # Barcode region entirely outside the frame
+            return None
+        # Parts of the region past the frame edge sample the replicated border
+        thumb_corners = np.float32([[0, 0], [size[0], 0], [size[0], size[1]], [0, size[1]]])
+        matrix = cv2.getPerspectiveTransform(thumb_corners, target.astype(np.float32))
+        thumb = cv2.warpPerspective(gray, matrix, size, flags=cv2.INTER_AREA | cv2.WARP_INVERSE_MAP,
+                                    borderMode=cv2.BORDER_REPLICATE)
+    else:
+        roi, _ = extract_barcode_roi(gray, barcode_coords, mm_to_px_ratio)
+        if roi.size == 0:
+            return None
+        thumb = cv2.resize(roi, size, interpolation=cv2.INTER_AREA)
+    
+    vector = thumb.astype(np.float32).ravel()
+    vector -= vector.mean()
+    norm = float(np.linalg.norm(vector))
+    if norm < 1e-6:
+        return None
+    return vector / norm
+
+
+class BarcodeSession:
+    """
+    Session-aware barcode stage for live capture.
+    
+    Runs the full decode_barcode() until a confident visual read, then only
+    compares a barcode_signature() of each frame against the one taken at
+    that read. The cached result is returned while the region still looks
+    the same; a full decode runs again when it changes or after reset()
+    (call it when the page is lost). Failed visual reads are retried every
+    retry_interval frames, returning the last (metadata) result in between.
+    """
+    
+    def __init__(
+        self,
+        barcode_coords: Dict,
+        mm_to_px_ratio: float = 11.811,
+        metadata_fallback: Optional[str] = None,
+        template_id: Optional[str] = None,
+        min_confidence: float = 0.9,
+        min_similarity: float = 0.8,
+        retry_interval: int = 5
+    ):
+        """
+        Args:
+            barcode_coords: Barcode coordinates from coordinates.json
+            mm_to_px_ratio: Pixel to mm conversion ratio
+            metadata_fallback: Fallback document ID from coordinates.json
+            template_id: Template ID for per-template decoder hit statistics
+            min_confidence: Decoder confidence needed to lock onto a read
+            min_similarity: Signature correlation that still counts as the same ballot
+            retry_interval: Frames between full decodes while no visual read is locked
+        """
+        self.barcode_coords = barcode_coords
+        self.mm_to_px_ratio = mm_to_px_ratio
+        self.metadata_fallback = metadata_fallback
+        self.template_id = template_id
+        self.min_confidence = min_confidence
+        self.min_similarity = min_similarity
+        self.retry_interval = max(1, retry_interval)
+        self.full_decodes = 0
+        self.cached_reads = 0
+        self.reset()
+    
+    def reset(self) -> None:
+        """Forget the locked read; the next frame runs a full decode."""
+        self._locked: Optional[Dict] = None
+        self._signature: Optional[np.ndarray] = None
+        self._last: Optional[Dict] = None
+        self._frames_since_decode = 0
+    
+    @property
+    def locked(self) -> bool:
+        return self._locked is not None
+    
+    def decode(self, image: Union[np.ndarray, ImageContext], inv_matrix: Optional[np.ndarray] = None) -> Dict:
+        """
+        Barcode result for one frame (same dictionary as decode_barcode()).
+        
+        Cached results have 'cached': True and 'similarity' set.
+        """
+        import time
+        start_time = time.time()
+        
+        if self._locked is not None:
+            signature = barcode_signature(image, self.barcode_coords, self.mm_to_px_ratio, inv_matrix)
+            similarity = float(np.dot(signature, self._signature)) if signature is not None else 0.0
+            if similarity >= self.min_similarity:
+                self.cached_reads += 1
+                result = dict(self._locked, cached=True, similarity=similarity, attempts=['cached'])
+                result['decode_time_ms'] = (time.time() - start_time) * 1000
+                return result
+            # Looks like a different ballot
+            self.reset()
+        
+        if self._last is not None and self._frames_since_decode < self.retry_interval:
+            self._frames_since_decode += 1
+            return self._last
+        
+        result = decode_barcode(image, self.barcode_coords, self.mm_to_px_ratio,
+                                metadata_fallback=self.metadata_fallback, template_id=self.template_id)
+        self.full_decodes += 1
+        self._last = result
+        self._frames_since_decode = 1
+        
+        if result['source'] == 'visual' and result['confidence'] >= self.min_confidence:
+            signature = barcode_signature(image, self.barcode_coords, self.mm_to_px_ratio, inv_matrix)
+            if signature is not None:
+                self._locked = result
+                self._signature = signature
+        return result
+
+
 # Convenience function for CLI usage
 if __name__ == "__main__":
     import sys
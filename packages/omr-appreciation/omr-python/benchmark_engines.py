@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Benchmark mark detection engines for speed and agreement.
+
+Aligns the ballot once, then times detect_marks() with every engine on the
+same image and compares each engine against the per-zone Otsu reference.
+
+Usage:
+    python benchmark_engines.py <image> <template> [--config-path DIR] [--no-align] [--repeat N]
+"""
+
+import sys
+import time
+import argparse
+
+import numpy as np
+
+from utils import load_template
+from image_aligner import detect_fiducials, align_image
+from image_context import ImageContext
+from mark_detector import detect_marks
+from template_compiler import load_zone_table
+
+ENGINES = ['per_zone', 'vectorized', 'rectified', 'integral:otsu', 'integral:adaptive']
+
+
+def run_engine(ctx: ImageContext, zones, inv_matrix, spec: str, threshold: float):
+    engine, _, binarize = spec.partition(':')
+    return detect_marks(ctx, zones, threshold=threshold, inv_matrix=inv_matrix, engine=engine,
+                        binarize=binarize or None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark mark detection engines')
+    parser.add_argument('image', help='Path to scanned ballot image')
+    parser.add_argument('template', help='Path to template JSON file')
+    parser.add_argument('--config-path', type=str, default=None,
+                       help='Path to election config directory (for bubble metadata lookup)')
+    parser.add_argument('--no-align', action='store_true', help='Skip fiducial alignment')
+    parser.add_argument('--threshold', '-t', type=float, default=0.3, help='Fill threshold')
+    parser.add_argument('--repeat', '-n', type=int, default=20, help='Timed runs per engine')
+    args = parser.parse_args()
+
+    template = load_template(args.template)
+    zones = load_zone_table(args.template, args.config_path, template=template).zones()
+    ctx = ImageContext.load(args.image)
+    if ctx is None:
+        print(f"Error: Could not load image: {args.image}", file=sys.stderr)
+        sys.exit(1)
+
+    inv_matrix = None
+    if not args.no_align:
+        fiducials = detect_fiducials(ctx, template)
+        if fiducials is None:
+            print("Error: Could not detect 4 fiducial markers", file=sys.stderr)
+            sys.exit(1)
+        _, _, inv_matrix = align_image(ctx, fiducials, template)
+
+    reference = run_engine(ctx, zones, inv_matrix, 'per_zone', args.threshold)
+    ref_fill = np.array([r['fill_ratio'] for r in reference])
+    ref_filled = np.array([r['filled'] for r in reference])
+
+    print(f"{len(zones)} zones, {args.repeat} runs per engine (fresh image context per run)\n")
+    print(f"{'engine':<20} {'ms/ballot':>10} {'speedup':>8} {'agree':>8} {'max |dfill|':>12}")
+
+    baseline_ms = None
+    for spec in ENGINES:
+        times = []
+        for _ in range(args.repeat):
+            # New context so per-page buffers (binaries, integrals) are rebuilt each run
+            run_ctx = ImageContext(ctx.gray)
+            start = time.perf_counter()
+            results = run_engine(run_ctx, zones, inv_matrix, spec, args.threshold)
+            times.append((time.perf_counter() - start) * 1000)
+
+        ms = float(np.median(times))
+        baseline_ms = baseline_ms or ms
+        fill = np.array([r['fill_ratio'] for r in results])
+        filled = np.array([r['filled'] for r in results])
+        agree = (filled == ref_filled).mean() * 100
+        print(f"{spec:<20} {ms:>10.2f} {baseline_ms / ms:>7.1f}x {agree:>7.1f}% "
+              f"{np.abs(fill - ref_fill).max():>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
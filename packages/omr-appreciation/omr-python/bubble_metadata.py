@@ -6,16 +6,27 @@ Supports loading metadata from election configs (mapping.yaml + election.json)
 or falling back to parsing for backward compatibility.
 """
 
+import hashlib
 import json
+import os
+import pickle
+import sys
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
+
+from utils import get_cache_dir
 
 try:
     import yaml
     YAML_AVAILABLE = True
+    # libyaml-backed loader is much faster on large mapping files
+    _YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
 except ImportError:
     YAML_AVAILABLE = False
 
+# Bump when the cached metadata layout changes
+METADATA_CACHE_VERSION = 1
+
 
 class BubbleMetadata:
     """
@@ -47,39 +58,25 @@ class BubbleMetadata:
         try:
             config_dir = Path(config_path)
             
-            # Load election.json
             election_file = config_dir / 'election.json'
-            if not election_file.exists():
-                return
-            
-            with open(election_file) as f:
-                election = json.load(f)
-            
-            # Load mapping.yaml
             mapping_file = config_dir / 'mapping.yaml'
-            if not mapping_file.exists():
+            if not election_file.exists() or not mapping_file.exists():
                 return
             
-            with open(mapping_file) as f:
-                mapping = yaml.safe_load(f)
+            election_bytes = election_file.read_bytes()
+            mapping_bytes = mapping_file.read_bytes()
             
-            # Build metadata
-            for mark in mapping.get('marks', []):
-                bubble_id = mark['key']
-                candidate_code = mark['value']
-                
-                # Find position and candidate details
-                position_code = self._find_position(candidate_code, election)
-                candidate = self._find_candidate(candidate_code, position_code, election)
-                
-                if position_code and candidate:
-                    self.metadata[bubble_id] = {
-                        'bubble_id': bubble_id,
-                        'candidate_code': candidate_code,
-                        'position_code': position_code,
-                        'candidate_name': candidate['name'],
-                        'candidate_alias': candidate.get('alias', ''),
-                    }
+            # Reuse metadata built from identical config files
+            cache_path = self._cache_path(election_bytes, mapping_bytes)
+            cached = self._read_cache(cache_path) if cache_path else None
+            if cached is not None:
+                self.metadata = cached
+            else:
+                election = json.loads(election_bytes)
+                mapping = yaml.load(mapping_bytes, Loader=_YamlLoader)
+                self.metadata = self._build_metadata(election, mapping)
+                if cache_path:
+                    self._write_cache(cache_path)
             
             self.available = len(self.metadata) > 0
             
@@ -87,6 +84,66 @@ class BubbleMetadata:
             print(f"Warning: Could not load bubble metadata: {e}")
             self.available = False
     
+    @staticmethod
+    def _build_metadata(election: dict, mapping: dict) -> Dict[str, Dict]:
+        """Resolve every mark against a candidate-code index built in one pass."""
+        # First position listing a code wins, as with _find_position/_find_candidate
+        index: Dict[str, Tuple[str, dict]] = {}
+        for position_code, candidates in election.get('candidates', {}).items():
+            for candidate in candidates:
+                index.setdefault(candidate.get('code'), (position_code, candidate))
+        
+        metadata = {}
+        for mark in (mapping or {}).get('marks', []):
+            bubble_id = mark['key']
+            candidate_code = mark['value']
+            
+            entry = index.get(candidate_code)
+            if entry:
+                position_code, candidate = entry
+                metadata[bubble_id] = {
+                    'bubble_id': bubble_id,
+                    'candidate_code': candidate_code,
+                    'position_code': position_code,
+                    'candidate_name': candidate['name'],
+                    'candidate_alias': candidate.get('alias', ''),
+                }
+        return metadata
+    
+    @staticmethod
+    def _cache_path(election_bytes: bytes, mapping_bytes: bytes) -> Optional[str]:
+        """Cache file keyed by the content hash of election.json and mapping.yaml."""
+        try:
+            cache_dir = get_cache_dir()
+        except OSError:
+            return None
+        digest = hashlib.sha256(f"v{METADATA_CACHE_VERSION}".encode())
+        digest.update(election_bytes)
+        digest.update(b'\0')
+        digest.update(mapping_bytes)
+        return os.path.join(cache_dir, 'metadata', f"{digest.hexdigest()}.pickle")
+    
+    @staticmethod
+    def _read_cache(cache_path: str) -> Optional[Dict[str, Dict]]:
+        """Cached metadata, or None to rebuild it (missing, truncated or otherwise unreadable cache)."""
+        try:
+            with open(cache_path, 'rb') as f:
+                cached = pickle.load(f)
+        except Exception:
+            # A bad cache file can raise almost anything from unpickling; rebuilding is always safe
+            return None
+        return cached if isinstance(cached, dict) else None
+    
+    def _write_cache(self, cache_path: str):
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(self.metadata, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"Warning: Could not write bubble metadata cache: {e}", file=sys.stderr)
+    
     def _find_position(self, candidate_code: str, election: dict) -> Optional[str]:
         """Find position code for a candidate."""
         for position_code, candidates in election.get('candidates', {}).items():
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Durable cast spool for finalized ballots.
+
+Live appreciation appends each finalized ballot string to a local JSON-lines
+spool (fsync'd before returning), and a background thread drains it in bulk:
+one `php artisan election:cast-ballot` invocation casts many ballots, so the
+operator never waits on Laravel and its boot cost is paid once per batch.
+
+Spool directory layout:
+    pending.jsonl   every queued ballot: {"id", "ballot", "queued_at"}
+    cast.jsonl      ids that were cast (or given up on)
+    failed.jsonl    ballots rejected max_attempts times, with the last error
+
+Ballots in pending.jsonl without an entry in cast.jsonl are cast on the next
+drain, including after a crash or restart. Both files are compacted once
+everything queued has been cast.
+
+Usage:
+    python cast_spool.py storage/app/cast-spool     # drain what is left, then exit
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# --jsonl: one {"index", "code", "status": cast|exists|error, ...} line per ballot;
+# --skip-existing: ballots whose code is already stored are not cast again
+DEFAULT_COMMAND = ['php', 'artisan', 'election:cast-ballot', '--skip-existing', '--jsonl']
+
+
+def _append_jsonl(path: Path, entries: List[Dict]) -> None:
+    """Append JSON lines and fsync so they survive a crash or power loss."""
+    with open(path, 'a') as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _read_jsonl(path: Path) -> List[Dict]:
+    entries = []
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Torn last line from a crash mid-append
+                    continue
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def ballot_code(ballot: str) -> str:
+    """Ballot code of a compact ballot string (BAL-001|POS:CODE;...)."""
+    return ballot.split('|', 1)[0].strip()
+
+
+class CastSpool(threading.Thread):
+    """
+    Append-only ballot spool with a bulk background consumer.
+
+    submit() returns once the ballot is on disk. The consumer casts up to
+    batch_size pending ballots per command invocation and records each one in
+    cast.jsonl as soon as the command reports it, so a timeout or crash
+    mid-batch only re-sends unconfirmed ballots (and --skip-existing makes
+    those re-sends harmless). If the command cannot run at all (PHP missing,
+    Laravel down), the batch is retried with exponential backoff. Ballots the
+    command rejects are retried up to max_attempts times and then moved to
+    failed.jsonl.
+    """
+
+    def __init__(self, spool_dir: Path, command: Optional[List[str]] = None, cwd: Optional[str] = None,
+                 batch_size: int = 50, timeout: float = 120.0, retry_delay: float = 2.0,
+                 max_retry_delay: float = 300.0, max_attempts: int = 3):
+        """
+        Args:
+            spool_dir: Directory for the spool files (created if missing)
+            command: Cast command; compact ballot lines are written to its stdin
+            cwd: Working directory for the command (Laravel project root)
+            batch_size: Most ballots per command invocation
+            timeout: Seconds before a command invocation is abandoned
+            retry_delay: First backoff after a failed invocation (doubles up to max_retry_delay)
+            max_retry_delay: Longest backoff between invocations
+            max_attempts: Rejections before a ballot is moved to failed.jsonl
+        """
+        super().__init__(name='omr-cast-spool', daemon=True)
+        self.spool_dir = Path(spool_dir)
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        self.pending_path = self.spool_dir / 'pending.jsonl'
+        self.cast_path = self.spool_dir / 'cast.jsonl'
+        self.failed_path = self.spool_dir / 'failed.jsonl'
+        self.command = command or DEFAULT_COMMAND
+        self.cwd = cwd
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.max_attempts = max_attempts
+
+        self.cast_count = 0
+        self.failed_count = 0
+        self.last_error: Optional[str] = None
+
+        self._cond = threading.Condition()
+        self._attempts: Dict[str, int] = {}
+        self._backoff = 0.0
+        self._next_try = 0.0
+        self._closed = False
+
+        # Pick up whatever a previous run left behind
+        done = {entry['id'] for entry in _read_jsonl(self.cast_path)}
+        self._pending: List[Dict] = [e for e in _read_jsonl(self.pending_path) if e.get('id') not in done]
+
+    def submit(self, ballot: str) -> str:
+        """Durably queue a compact ballot string; returns its spool id."""
+        entry = {'id': uuid.uuid4().hex, 'ballot': ballot, 'queued_at': datetime.now().isoformat()}
+        with self._cond:
+            _append_jsonl(self.pending_path, [entry])
+            self._pending.append(entry)
+            self._cond.notify()
+        return entry['id']
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def close(self) -> int:
+        """
+        Stop the consumer after one last drain, waiting for an in-flight
+        command (bounded by timeout) so no confirmed cast goes unrecorded.
+
+        Returns:
+            Ballots still pending (they stay spooled for the next run)
+        """
+        with self._cond:
+            self._closed = True
+            self._next_try = 0.0
+            self._cond.notify()
+        if self.is_alive():
+            self.join()
+        return self.pending()
+
+    def drain(self) -> bool:
+        """
+        Cast one batch of pending ballots now.
+
+        Returns:
+            True if the command ran (whether or not every ballot was accepted)
+        """
+        with self._cond:
+            batch = self._pending[:self.batch_size]
+        if not batch:
+            return True
+
+        rejected = self._run(batch)
+        if rejected is None:
+            return False
+
+        failed = []
+        for entry, message in rejected:
+            attempts = self._attempts.get(entry['id'], 0) + 1
+            self._attempts[entry['id']] = attempts
+            if attempts >= self.max_attempts:
+                failed.append(dict(entry, error=message, attempts=attempts))
+
+        if failed:
+            _append_jsonl(self.failed_path, failed)
+            self._finish(failed)
+            self.failed_count += len(failed)
+            for entry in failed:
+                print(f"✗ Gave up casting {ballot_code(entry['ballot'])} (see {self.failed_path})", file=sys.stderr)
+        if len(failed) < len(rejected):
+            # Give rejected ballots a moment before the consumer tries them again
+            self._next_try = time.monotonic() + self.retry_delay
+        return True
+
+    def _finish(self, entries: List[Dict]):
+        """Record ballots as done (cast or given up) and drop them from the queue."""
+        ids = {entry['id'] for entry in entries}
+        with self._cond:
+            _append_jsonl(self.cast_path, [{'id': entry_id} for entry_id in ids])
+            self._pending = [entry for entry in self._pending if entry['id'] not in ids]
+            if not self._pending:
+                self._compact()
+        for entry_id in ids:
+            self._attempts.pop(entry_id, None)
+
+    def _run(self, batch: List[Dict]) -> Optional[List]:
+        """
+        Run the cast command on a batch, recording each confirmed ballot as it is reported.
+
+        Returns:
+            (entry, message) for every ballot that was not confirmed, or None if
+            the command did not run or was cut off
+        """
+        stdin = '\n'.join(entry['ballot'] for entry in batch) + '\n'
+        try:
+            proc = subprocess.Popen(self.command, cwd=self.cwd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                    stderr=subprocess.STDOUT, text=True)
+        except OSError as e:
+            self.last_error = str(e)
+            return None
+
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            proc.kill()
+
+        watchdog = threading.Timer(self.timeout, kill)
+        watchdog.start()
+        results: Dict[int, Dict] = {}
+        other: List[str] = []
+        try:
+            try:
+                proc.stdin.write(stdin)
+                proc.stdin.close()
+            except BrokenPipeError:
+                # Exited before reading its input; whatever it printed is read below
+                pass
+            for line in proc.stdout:
+                try:
+                    result = json.loads(line)
+                    index = int(result['index'])
+                    entry = batch[index]
+                except (ValueError, KeyError, TypeError, IndexError):
+                    other.append(line)
+                    continue
+                results[index] = result
+                if result.get('status') in ('cast', 'exists'):
+                    # Recorded before reading on, so a kill mid-batch cannot lose it
+                    self._finish([entry])
+                    self.cast_count += 1
+            proc.wait()
+        finally:
+            watchdog.cancel()
+
+        output = ''.join(other).strip()[-500:]
+        cut_off = timed_out.is_set()
+        confirmed = sum(1 for r in results.values() if r.get('status') in ('cast', 'exists'))
+        if confirmed:
+            print(f'✓ Cast {confirmed} ballot(s) to Laravel', file=sys.stderr)
+
+        if cut_off or (proc.returncode != 0 and not results):
+            # Killed by the watchdog, or failed before reaching any ballot (e.g. Laravel did not boot)
+            self.last_error = f'timed out after {self.timeout:.0f}s' if cut_off else output
+            return None
+
+        rejected = []
+        for index, entry in enumerate(batch):
+            result = results.get(index)
+            if result is None:
+                rejected.append((entry, output or 'no result reported'))
+            elif result.get('status') not in ('cast', 'exists'):
+                rejected.append((entry, result.get('message', 'rejected')))
+        if rejected:
+            self.last_error = rejected[-1][1]
+        return rejected
+
+    def _compact(self):
+        """Empty both logs once nothing is pending (pending first, so a crash in between is harmless)."""
+        for path in (self.pending_path, self.cast_path):
+            tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+            tmp_path.write_text('')
+            os.replace(tmp_path, path)
+
+    def run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._closed or (self._pending and time.monotonic() >= self._next_try),
+                    timeout=max(0.0, self._next_try - time.monotonic()) if self._pending else None
+                )
+                closing = self._closed
+                ready = bool(self._pending) and (closing or time.monotonic() >= self._next_try)
+
+            if not ready:
+                if closing:
+                    return
+                continue
+
+            if self.drain():
+                self._backoff = 0.0
+                # While closing, rejections still end after max_attempts, so this terminates
+                continue
+            if closing:
+                return
+            self._backoff = min(max(self._backoff * 2, self.retry_delay), self.max_retry_delay)
+            self._next_try = time.monotonic() + self._backoff
+            print(f'⚠ Cast command failed, retrying in {self._backoff:.0f}s: {self.last_error}',
+                  file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cast ballots left in a live-session spool')
+    parser.add_argument('spool_dir', help='Spool directory (appreciate_live.py --cast-spool)')
+    parser.add_argument('--cwd', default=None, help='Laravel project root (default: current directory)')
+    parser.add_argument('--batch-size', type=int, default=50, help='Ballots per artisan call')
+    args = parser.parse_args()
+
+    spool = CastSpool(Path(args.spool_dir), cwd=args.cwd, batch_size=args.batch_size)
+    # Rejected ballots stay pending until max_attempts, so this terminates
+    while spool.pending():
+        if not spool.drain():
+            print(f'✗ Cast command failed: {spool.last_error}', file=sys.stderr)
+            sys.exit(1)
+    print(f'✓ Spool drained ({spool.cast_count} cast, {spool.failed_count} failed)')
+
+
+if __name__ == '__main__':
+    main()
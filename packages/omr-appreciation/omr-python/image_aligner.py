@@ -4,7 +4,9 @@ import sys
 import cv2
 import numpy as np
 import os
-from typing import List, Tuple, Optional, Dict
+from typing import List, Tuple, Optional, Dict, Union
+
+from image_context import ImageContext, as_context
 
 try:
     from quality_metrics import (
@@ -17,50 +19,233 @@ except ImportError:
     QUALITY_METRICS_AVAILABLE = False
 
 
-def detect_apriltag_fiducials(image: np.ndarray, template: dict) -> Optional[List[Tuple[int, int]]]:
+# Fiducial detectors built once per (mode, dictionary/family, parameters)
+_detector_registry: Dict[tuple, object] = {}
+
+
+class _LegacyArucoDetector:
+    """ArucoDetector-compatible wrapper for the OpenCV < 4.7 ArUco API."""
+    
+    def __init__(self, aruco_dict, aruco_params):
+        self.aruco_dict = aruco_dict
+        self.aruco_params = aruco_params
+    
+    def detectMarkers(self, gray):
+        return cv2.aruco.detectMarkers(gray, self.aruco_dict, parameters=self.aruco_params)
+
+
+def _build_aruco_detector(dictionary_name: str, params: Dict):
+    """Build an ArUco detector for a predefined dictionary."""
+    aruco_dict = cv2.aruco.getPredefinedDictionary(getattr(cv2.aruco, dictionary_name))
+    
+    # Try new API first (OpenCV 4.7+)
+    try:
+        aruco_params = cv2.aruco.DetectorParameters()
+        for name, value in params.items():
+            setattr(aruco_params, name, value)
+        return cv2.aruco.ArucoDetector(aruco_dict, aruco_params)
+    except AttributeError:
+        # Fall back to old API (OpenCV < 4.7)
+        aruco_params = cv2.aruco.DetectorParameters_create()
+        for name, value in params.items():
+            setattr(aruco_params, name, value)
+        return _LegacyArucoDetector(aruco_dict, aruco_params)
+
+
+def _build_apriltag_detector(family: str, params: Dict):
+    """Build an AprilTag detector, or None if no AprilTag library is installed."""
+    try:
+        import apriltag
+        return apriltag.Detector(apriltag.DetectorOptions(families=family, **params))
+    except ImportError:
+        try:
+            from pupil_apriltags import Detector
+            return Detector(families=family, **params)
+        except ImportError:
+            print("AprilTag library not found. Install: pip3 install apriltag")
+            return None
+
+
+def get_fiducial_detector(mode: str, name: Optional[str] = None, params: Optional[Dict] = None):
+    """Get a cached marker detector, building it on first use.
+    
+    Detectors are reused across frames (appreciate_live.py) and ballots
+    (batch mode, appreciate_worker.py) instead of being rebuilt per call.
+    
+    Args:
+        mode: 'aruco' or 'apriltag'
+        name: ArUco dictionary or AprilTag family
+              (defaults: OMR_ARUCO_DICTIONARY / OMR_APRILTAG_FAMILY)
+        params: Detector parameters (DetectorParameters attributes for ArUco,
+                Detector keyword arguments for AprilTag)
+        
+    Returns:
+        Detector object, or None if it cannot be built
+    """
+    params = params or {}
+    if name is None:
+        if mode == 'aruco':
+            name = os.getenv('OMR_ARUCO_DICTIONARY', 'DICT_6X6_250')
+        else:
+            name = os.getenv('OMR_APRILTAG_FAMILY', 'tag36h11')
+    
+    key = (mode, name, tuple(sorted(params.items())))
+    if key not in _detector_registry:
+        if mode == 'aruco':
+            _detector_registry[key] = _build_aruco_detector(name, params)
+        elif mode == 'apriltag':
+            _detector_registry[key] = _build_apriltag_detector(name, params)
+        else:
+            raise ValueError(f"Unknown fiducial detector mode: {mode}")
+    
+    return _detector_registry[key]
+
+
+def warm_up_fiducial_detectors(mode: Optional[str] = None, frame_size: Tuple[int, int] = (640, 480)) -> None:
+    """Build the configured detector and run it once on a blank frame.
+    
+    Call at startup so the first real frame or ballot doesn't pay for
+    detector construction and OpenCV's lazy initialization.
+    
+    Args:
+        mode: Fiducial mode (defaults to OMR_FIDUCIAL_MODE)
+        frame_size: (width, height) of the warm-up frame
+    """
+    mode = mode or os.getenv('OMR_FIDUCIAL_MODE', 'black_square')
+    width, height = frame_size
+    blank = np.full((height, width), 255, dtype=np.uint8)
+    
+    try:
+        if mode == 'aruco':
+            get_fiducial_detector('aruco').detectMarkers(blank)
+        elif mode == 'apriltag':
+            detector = get_fiducial_detector('apriltag')
+            if detector is not None:
+                detector.detect(blank)
+    except (AttributeError, cv2.error) as e:
+        print(f"Warning: Fiducial detector warm-up failed: {e}", file=sys.stderr)
+    
+    # Black square detection is the fallback for every mode
+    binary = cv2.adaptiveThreshold(blank, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 11, 2)
+    cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+
+def get_pyramid_levels() -> int:
+    """Number of pyrDown levels for coarse-to-fine fiducial detection.
+    
+    Set OMR_FIDUCIAL_PYRAMID_LEVELS=2 to detect at 1/4 scale on full-page
+    scans. Default 0 detects at full resolution (camera frames are already small).
+    """
+    return max(int(os.getenv('OMR_FIDUCIAL_PYRAMID_LEVELS', '0')), 0)
+
+
+def _refine_corners_subpixel(gray: np.ndarray, corners: np.ndarray, win: int) -> np.ndarray:
+    """Refine (N, 2) corner points to sub-pixel accuracy on the full-resolution image."""
+    points = np.ascontiguousarray(corners, dtype=np.float32).reshape(-1, 1, 2)
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.01)
+    cv2.cornerSubPix(gray, points, (win, win), (-1, -1), criteria)
+    return points.reshape(-1, 2)
+
+
+def _detect_markers_coarse_to_fine(ctx: ImageContext, levels: int, detect_corners,
+                                   marker_ids: List[int]) -> Dict[int, Tuple[float, float]]:
+    """Find markers on a downscaled image, then refine each at full resolution.
+    
+    Each marker found on the coarse level is re-detected in a small
+    full-resolution window around it (falling back to the upscaled coarse
+    corners) and its corners are refined with cornerSubPix.
+    
+    Args:
+        ctx: Image context (full-resolution gray and cached pyramid levels)
+        levels: Number of pyrDown levels
+        detect_corners: Callable(gray) -> {marker_id: (4, 2) corner array}
+        marker_ids: Marker IDs to keep
+        
+    Returns:
+        {marker_id: (cx, cy)} float centers in full-resolution coordinates
+    """
+    scale = 2 ** levels
+    gray = ctx.gray
+    h, w = gray.shape[:2]
+    coarse_markers = detect_corners(ctx.pyramid(levels))
+    
+    centers = {}
+    for marker_id, coarse_corners in coarse_markers.items():
+        if marker_id not in marker_ids:
+            continue
+        corners = np.asarray(coarse_corners, dtype=np.float32) * scale
+        
+        # Full-resolution window around the marker, padded by half its size
+        (x_min, y_min), (x_max, y_max) = corners.min(axis=0), corners.max(axis=0)
+        pad = max((x_max - x_min) / 2, 4 * scale)
+        x0, y0 = int(max(x_min - pad, 0)), int(max(y_min - pad, 0))
+        x1, y1 = int(min(x_max + pad, w)), int(min(y_max + pad, h))
+        
+        window_markers = detect_corners(np.ascontiguousarray(gray[y0:y1, x0:x1]))
+        if marker_id in window_markers:
+            corners = np.asarray(window_markers[marker_id], dtype=np.float32) + (x0, y0)
+        
+        corners = _refine_corners_subpixel(gray, corners, win=max(2, scale))
+        cx, cy = corners.mean(axis=0)
+        centers[marker_id] = (float(cx), float(cy))
+    
+    return centers
+
+
+def _apriltag_corners(detector, gray: np.ndarray) -> Dict[int, np.ndarray]:
+    """Run an AprilTag detector and return {tag_id: (4, 2) corners}."""
+    return {detection.tag_id: np.asarray(detection.corners) for detection in detector.detect(gray)}
+
+
+def _aruco_corners(detector, gray: np.ndarray) -> Dict[int, np.ndarray]:
+    """Run an ArUco detector and return {marker_id: (4, 2) corners}."""
+    corners, ids, _ = detector.detectMarkers(gray)
+    if ids is None:
+        return {}
+    return {int(marker_id): corners[i][0] for i, marker_id in enumerate(ids.flatten())}
+
+
+def detect_apriltag_fiducials(image: Union[np.ndarray, ImageContext], template: dict) -> Optional[List[Tuple[float, float]]]:
     """Detect AprilTag fiducial markers in the image.
     
     Args:
-        image: Input image (BGR)
+        image: Input image (BGR) or ImageContext
         template: Template dictionary containing AprilTag config
         
     Returns:
         List of 4 (x, y) coordinates for fiducials [TL, TR, BL, BR], or None if detection fails
     """
-    # Get AprilTag configuration
-    tag_family = os.getenv('OMR_APRILTAG_FAMILY', 'tag36h11')
     corner_ids = [0, 1, 2, 3]  # TL, TR, BR, BL
     
     try:
-        # Try importing apriltag library
-        try:
-            import apriltag
-            detector = apriltag.Detector(apriltag.DetectorOptions(families=tag_family))
-        except ImportError:
-            try:
-                from pupil_apriltags import Detector
-                detector = Detector(families=tag_family)
-            except ImportError:
-                print("AprilTag library not found. Install: pip3 install apriltag")
-                return None
-        
-        # Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        
-        # Detect tags
-        detections = detector.detect(gray)
-        
-        if len(detections) < 4:
+        detector = get_fiducial_detector('apriltag')
+        if detector is None:
             return None
         
-        # Map detected IDs to positions
-        detected = {}
-        for detection in detections:
-            tag_id = detection.tag_id
-            if tag_id in corner_ids:
-                # Get center of tag
-                cx, cy = detection.center
-                detected[tag_id] = (int(cx), int(cy))
+        ctx = as_context(image)
+        gray = ctx.gray
+        
+        levels = get_pyramid_levels()
+        if levels > 0:
+            # Coarse-to-fine: sub-pixel float centers
+            detected = _detect_markers_coarse_to_fine(
+                ctx, levels, lambda g: _apriltag_corners(detector, g), corner_ids
+            )
+        else:
+            # Detect tags
+            detections = detector.detect(gray)
+            
+            if len(detections) < 4:
+                return None
+            
+            # Map detected IDs to positions
+            detected = {}
+            for detection in detections:
+                tag_id = detection.tag_id
+                if tag_id in corner_ids:
+                    # Get center of tag
+                    cx, cy = detection.center
+                    detected[tag_id] = (float(cx), float(cy))
         
         # Check if we have all 4 corners
         if len(detected) < 4:
@@ -85,50 +270,46 @@ def detect_apriltag_fiducials(image: np.ndarray, template: dict) -> Optional[Lis
         return None
 
 
-def detect_aruco_fiducials(image: np.ndarray, template: dict) -> Optional[List[Tuple[int, int]]]:
+def detect_aruco_fiducials(image: Union[np.ndarray, ImageContext], template: dict) -> Optional[List[Tuple[float, float]]]:
     """Detect ArUco fiducial markers in the image.
     
     Args:
-        image: Input image (BGR)
+        image: Input image (BGR) or ImageContext
         template: Template dictionary containing ArUco config
         
     Returns:
         List of 4 (x, y) coordinates for fiducials [TL, TR, BL, BR], or None if detection fails
     """
-    # Get ArUco configuration
-    aruco_dict_name = os.getenv('OMR_ARUCO_DICTIONARY', 'DICT_6X6_250')
     corner_ids = [101, 102, 103, 104]  # TL, TR, BR, BL
     
     try:
-        # Get ArUco dictionary
-        aruco_dict_id = getattr(cv2.aruco, aruco_dict_name)
-        aruco_dict = cv2.aruco.getPredefinedDictionary(aruco_dict_id)
+        detector = get_fiducial_detector('aruco')
         
-        # Detect markers - use new API for OpenCV 4.7+
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        # Detect markers
+        ctx = as_context(image)
+        gray = ctx.gray
         
-        # Try new API first (OpenCV 4.7+)
-        try:
-            aruco_params = cv2.aruco.DetectorParameters()
-            detector = cv2.aruco.ArucoDetector(aruco_dict, aruco_params)
+        levels = get_pyramid_levels()
+        if levels > 0:
+            # Coarse-to-fine: sub-pixel float centers
+            detected = _detect_markers_coarse_to_fine(
+                ctx, levels, lambda g: _aruco_corners(detector, g), corner_ids
+            )
+        else:
             corners, ids, _ = detector.detectMarkers(gray)
-        except AttributeError:
-            # Fall back to old API (OpenCV < 4.7)
-            aruco_params = cv2.aruco.DetectorParameters_create()
-            corners, ids, _ = cv2.aruco.detectMarkers(gray, aruco_dict, parameters=aruco_params)
-        
-        if ids is None or len(ids) < 4:
-            return None
-        
-        # Map detected IDs to positions
-        detected = {}
-        for i, marker_id in enumerate(ids.flatten()):
-            if marker_id in corner_ids:
-                # Get center of marker
-                corner = corners[i][0]
-                cx = int(np.mean(corner[:, 0]))
-                cy = int(np.mean(corner[:, 1]))
-                detected[marker_id] = (cx, cy)
+            
+            if ids is None or len(ids) < 4:
+                return None
+            
+            # Map detected IDs to positions
+            detected = {}
+            for i, marker_id in enumerate(ids.flatten()):
+                if marker_id in corner_ids:
+                    # Get center of marker
+                    corner = corners[i][0]
+                    cx = float(np.mean(corner[:, 0]))
+                    cy = float(np.mean(corner[:, 1]))
+                    detected[marker_id] = (cx, cy)
         
         # Check if we have all 4 corners
         if len(detected) < 4:
@@ -153,7 +334,7 @@ def detect_aruco_fiducials(image: np.ndarray, template: dict) -> Optional[List[T
         return None
 
 
-def detect_fiducials(image: np.ndarray, template: dict) -> Optional[List[Tuple[int, int]]]:
+def detect_fiducials(image: Union[np.ndarray, ImageContext], template: dict) -> Optional[List[Tuple[float, float]]]:
     """Detect 4 fiducial markers in the image.
     
     Supports multiple fiducial modes:
@@ -162,25 +343,27 @@ def detect_fiducials(image: np.ndarray, template: dict) -> Optional[List[Tuple[i
     - apriltag: AprilTag marker detection with unique IDs
     
     Args:
-        image: Input image (BGR)
+        image: Input image (BGR) or ImageContext
         template: Template dictionary containing fiducial positions
         
     Returns:
         List of 4 (x, y) coordinates for fiducials, or None if detection fails
     """
+    ctx = as_context(image)
+    
     # Check fiducial mode from environment
     fiducial_mode = os.getenv('OMR_FIDUCIAL_MODE', 'black_square')
     
     # Try AprilTag detection if enabled
     if fiducial_mode == 'apriltag':
-        apriltag_result = detect_apriltag_fiducials(image, template)
+        apriltag_result = detect_apriltag_fiducials(ctx, template)
         if apriltag_result is not None:
             return apriltag_result
         print("AprilTag detection failed, falling back to black square detection")
     
     # Try ArUco detection if enabled
     elif fiducial_mode == 'aruco':
-        aruco_result = detect_aruco_fiducials(image, template)
+        aruco_result = detect_aruco_fiducials(ctx, template)
         if aruco_result is not None:
             return aruco_result
         print("ArUco detection failed, falling back to black square detection")
@@ -202,9 +385,43 @@ def detect_fiducials(image: np.ndarray, template: dict) -> Optional[List[Tuple[i
     if len(expected_fiducials) != 4:
         return None
     
-    # Convert to grayscale
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    # Expected fiducial size from template (use average)
+    # Convert from mm to pixels: assume 300 DPI (11.81 pixels per mm)
+    expected_size_mm = expected_fiducials[0].get('width', 14.17325)
+    expected_size = expected_size_mm * (300 / 25.4)  # Convert mm to pixels at 300 DPI
+    min_area = (expected_size * 0.5) ** 2  # 50% smaller
+    max_area = (expected_size * 2.0) ** 2  # 200% larger
+    
+    gray = ctx.gray
+    
+    levels = get_pyramid_levels()
+    if levels > 0:
+        fiducials = _detect_black_squares_coarse_to_fine(
+            ctx, template, expected_fiducials, expected_size, min_area, max_area, levels
+        )
+        if fiducials is not None:
+            return fiducials
     
+    # Search only the page corners unless disabled; fall back to the full page
+    if os.getenv('OMR_FIDUCIAL_SEARCH', 'corners') == 'corners':
+        fiducials = _detect_black_squares_in_corners(gray, template, expected_fiducials, min_area, max_area)
+        if fiducials is not None:
+            return fiducials
+    
+    return _detect_black_squares_full_page(gray, min_area, max_area)
+
+
+def _find_square_candidates(gray: np.ndarray, min_area: float,
+                            max_area: float) -> List[Tuple[float, float, float]]:
+    """Find filled square-like blobs in a grayscale image (or tile).
+    
+    Args:
+        gray: Grayscale image or tile
+        min_area, max_area: Accepted contour area range in pixels
+    
+    Returns:
+        List of (cx, cy, area) in the coordinates of the given image
+    """
     # Use adaptive threshold for better detection
     binary = cv2.adaptiveThreshold(
         gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
@@ -219,13 +436,6 @@ def detect_fiducials(image: np.ndarray, template: dict) -> Optional[List[Tuple[i
     # Find contours
     contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     
-    # Expected fiducial size from template (use average)
-    # Convert from mm to pixels: assume 300 DPI (11.81 pixels per mm)
-    expected_size_mm = expected_fiducials[0].get('width', 14.17325)
-    expected_size = expected_size_mm * (300 / 25.4)  # Convert mm to pixels at 300 DPI
-    min_area = (expected_size * 0.5) ** 2  # 50% smaller
-    max_area = (expected_size * 2.0) ** 2  # 200% larger
-    
     # Filter for square-like contours
     candidates = []
     for contour in contours:
@@ -242,17 +452,161 @@ def detect_fiducials(image: np.ndarray, template: dict) -> Optional[List[Tuple[i
             # Get center point
             M = cv2.moments(contour)
             if M["m00"] != 0:
-                cx = int(M["m10"] / M["m00"])
-                cy = int(M["m01"] / M["m00"])
+                cx = M["m10"] / M["m00"]
+                cy = M["m01"] / M["m00"]
                 candidates.append((cx, cy, area))
     
+    return candidates
+
+
+def _closest_to(candidates: List[Tuple[float, float, float]], point: Tuple[float, float],
+                exclude: Optional[set] = None) -> int:
+    """Index of the candidate closest to point, or -1 if none."""
+    best_dist = float('inf')
+    best_idx = -1
+    
+    for idx, (cx, cy, _) in enumerate(candidates):
+        if exclude and idx in exclude:
+            continue
+        dist = ((cx - point[0]) ** 2 + (cy - point[1]) ** 2) ** 0.5
+        if dist < best_dist:
+            best_dist = dist
+            best_idx = idx
+    
+    return best_idx
+
+
+def get_fiducial_search_tiles(image_shape: Tuple[int, ...], template: dict, expected_fiducials: List[Dict],
+                              pixel_scale: float = 1.0) -> List[Tuple[int, int, int, int]]:
+    """Compute the four corner tiles to search for black square fiducials.
+    
+    Each tile spans from an image corner to the template fiducial nearest
+    that corner, plus OMR_FIDUCIAL_TILE_MARGIN_MM (default 25mm) to absorb
+    scan offset, rotation and scale. Template mm are mapped to pixels with
+    the template's ballot_size when present (so camera frames work), else 300 DPI.
+    
+    Args:
+        image_shape: Shape of the image to search
+        template: Template dictionary
+        expected_fiducials: Template fiducials [TL, TR, BL, BR] in mm
+        pixel_scale: Scale of the image relative to 300 DPI (for pyramid levels)
+        
+    Returns:
+        List of 4 (x0, y0, x1, y1) tiles in corner order TL, TR, BL, BR
+    """
+    h, w = image_shape[:2]
+    
+    ballot_size = template.get('ballot_size', {})
+    if ballot_size.get('width_mm'):
+        px_per_mm = w / float(ballot_size['width_mm'])
+    else:
+        px_per_mm = 300 / 25.4 * pixel_scale
+    margin = float(os.getenv('OMR_FIDUCIAL_TILE_MARGIN_MM', '25')) * px_per_mm
+    
+    # Expected centers in pixels (x, y is top-left when width/height are given)
+    centers = []
+    for fid in expected_fiducials:
+        x_mm = fid.get('x', 0) + fid.get('width', 0) / 2
+        y_mm = fid.get('y', 0) + fid.get('height', 0) / 2
+        centers.append((x_mm * px_per_mm, y_mm * px_per_mm))
+    
+    tiles = []
+    for corner_x, corner_y in [(0, 0), (w, 0), (0, h), (w, h)]:
+        cx, cy = min(centers, key=lambda c: (c[0] - corner_x) ** 2 + (c[1] - corner_y) ** 2)
+        x0 = int(max(min(cx, corner_x) - margin, 0))
+        x1 = int(min(max(cx, corner_x) + margin, w))
+        y0 = int(max(min(cy, corner_y) - margin, 0))
+        y1 = int(min(max(cy, corner_y) + margin, h))
+        tiles.append((x0, y0, x1, y1))
+    
+    return tiles
+
+
+def _detect_black_squares_in_corners(gray: np.ndarray, template: dict, expected_fiducials: List[Dict],
+                                     min_area: float, max_area: float,
+                                     pixel_scale: float = 1.0) -> Optional[List[Tuple[float, float]]]:
+    """Detect one black square per corner tile.
+    
+    Returns:
+        List of 4 (x, y) coordinates [TL, TR, BL, BR], or None if any tile fails
+    """
+    h, w = gray.shape[:2]
+    corners = [(0, 0), (w, 0), (0, h), (w, h)]
+    tiles = get_fiducial_search_tiles(gray.shape, template, expected_fiducials, pixel_scale)
+    
+    fiducials = []
+    for (corner_x, corner_y), (x0, y0, x1, y1) in zip(corners, tiles):
+        if x1 - x0 < 3 or y1 - y0 < 3:
+            return None
+        
+        candidates = _find_square_candidates(gray[y0:y1, x0:x1], min_area, max_area)
+        best_idx = _closest_to(candidates, (corner_x - x0, corner_y - y0))
+        if best_idx < 0:
+            return None
+        
+        fiducials.append((candidates[best_idx][0] + x0, candidates[best_idx][1] + y0))
+    
+    return fiducials
+
+
+def _detect_black_squares_coarse_to_fine(ctx: ImageContext, template: dict, expected_fiducials: List[Dict],
+                                         expected_size: float, min_area: float, max_area: float,
+                                         levels: int) -> Optional[List[Tuple[float, float]]]:
+    """Detect black squares on a pyrDown level, then refine each at full resolution.
+    
+    Returns:
+        List of 4 float (x, y) centroids [TL, TR, BL, BR], or None if detection fails
+    """
+    scale = 2 ** levels
+    gray = ctx.gray
+    coarse = ctx.pyramid(levels)
+    coarse_min, coarse_max = min_area / scale ** 2, max_area / scale ** 2
+    
+    coarse_fiducials = None
+    if os.getenv('OMR_FIDUCIAL_SEARCH', 'corners') == 'corners':
+        coarse_fiducials = _detect_black_squares_in_corners(
+            coarse, template, expected_fiducials, coarse_min, coarse_max, pixel_scale=1.0 / scale
+        )
+    if coarse_fiducials is None:
+        coarse_fiducials = _detect_black_squares_full_page(coarse, coarse_min, coarse_max)
+    if coarse_fiducials is None:
+        return None
+    
+    # Re-measure each square's centroid in a full-resolution window
+    h, w = gray.shape[:2]
+    half = int(expected_size)
+    fiducials = []
+    for cx, cy in coarse_fiducials:
+        cx, cy = cx * scale, cy * scale
+        x0, y0 = max(int(cx) - half, 0), max(int(cy) - half, 0)
+        x1, y1 = min(int(cx) + half, w), min(int(cy) + half, h)
+        
+        candidates = _find_square_candidates(gray[y0:y1, x0:x1], min_area, max_area)
+        best_idx = _closest_to(candidates, (cx - x0, cy - y0))
+        if best_idx < 0:
+            return None
+        
+        fiducials.append((candidates[best_idx][0] + x0, candidates[best_idx][1] + y0))
+    
+    return fiducials
+
+
+def _detect_black_squares_full_page(gray: np.ndarray, min_area: float,
+                                    max_area: float) -> Optional[List[Tuple[float, float]]]:
+    """Detect black square fiducials by scanning the whole page.
+    
+    Returns:
+        List of 4 (x, y) coordinates [TL, TR, BL, BR], or None if detection fails
+    """
+    candidates = _find_square_candidates(gray, min_area, max_area)
+    
     # We need at least 4 candidates
     if len(candidates) < 4:
         return None
     
     # If more than 4, pick the 4 corner-most candidates
     # Strategy: find candidates closest to the 4 corners
-    h, w = image.shape[:2]
+    h, w = gray.shape[:2]
     corners = [
         (0, 0),        # top-left
         (w, 0),        # top-right
@@ -263,17 +617,8 @@ def detect_fiducials(image: np.ndarray, template: dict) -> Optional[List[Tuple[i
     fiducials = []
     used_indices = set()
     
-    for corner_x, corner_y in corners:
-        best_dist = float('inf')
-        best_idx = -1
-        
-        for idx, (cx, cy, _) in enumerate(candidates):
-            if idx in used_indices:
-                continue
-            dist = ((cx - corner_x) ** 2 + (cy - corner_y) ** 2) ** 0.5
-            if dist < best_dist:
-                best_dist = dist
-                best_idx = idx
+    for corner in corners:
+        best_idx = _closest_to(candidates, corner, used_indices)
         
         if best_idx >= 0:
             fiducials.append((candidates[best_idx][0], candidates[best_idx][1]))
@@ -286,7 +631,180 @@ def detect_fiducials(image: np.ndarray, template: dict) -> Optional[List[Tuple[i
     return fiducials
 
 
-def align_image(image: np.ndarray, fiducials: List[Tuple[int, int]], template: dict, 
+class FiducialTracker:
+    """
+    Follow the four fiducials across video frames with sparse optical flow.
+    
+    Full detect_fiducials() runs on the first frame, whenever tracking is lost
+    and every reanchor_interval frames. In between, corner features around
+    each fiducial (square corners, marker cells) are tracked with pyramidal
+    Lucas-Kanade, the frame-to-frame homography is fitted to them and the
+    previous fiducial positions are carried through it. Per-frame fiducial
+    cost therefore stays small and roughly constant. A track is accepted only
+    if enough features pass a forward-backward check and the quad keeps its shape.
+    """
+    
+    def __init__(self, template: dict, reanchor_interval: int = 30, win_size: int = 21,
+                 max_level: int = 3, max_fb_error: float = 1.0, max_area_change: float = 0.2,
+                 features_per_fiducial: int = 12, min_features: int = 8):
+        """
+        Args:
+            template: Template dictionary (for full detection)
+            reanchor_interval: Frames between forced full detections (0: never)
+            win_size: Lucas-Kanade window side in pixels
+            max_level: Lucas-Kanade pyramid levels
+            max_fb_error: Max forward-backward tracking error in pixels
+            max_area_change: Max relative change of the fiducial quad area per frame
+            features_per_fiducial: Corner features seeded around each fiducial
+            min_features: Fewest surviving features to accept a track
+        """
+        self.template = template
+        self.reanchor_interval = reanchor_interval
+        self.max_fb_error = max_fb_error
+        self.max_area_change = max_area_change
+        self.features_per_fiducial = features_per_fiducial
+        self.min_features = min_features
+        self._lk_params = dict(
+            winSize=(win_size, win_size), maxLevel=max_level,
+            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03)
+        )
+        self._prev_gray: Optional[np.ndarray] = None
+        self._fiducials: Optional[np.ndarray] = None
+        self._features: Optional[np.ndarray] = None
+        self._owners: Optional[np.ndarray] = None
+        self._radius = 16
+        self._seeded_count = 0
+        self._frames_since_anchor = 0
+        self.last_mode: Optional[str] = None
+        self.detections = 0
+        self.tracked = 0
+    
+    def reset(self) -> None:
+        """Forget the track; the next frame runs full detection."""
+        self._prev_gray = None
+        self._fiducials = None
+        self._features = None
+    
+    def update(self, image: Union[np.ndarray, ImageContext]) -> Optional[List[Tuple[float, float]]]:
+        """
+        Fiducials for the next frame.
+        
+        Returns:
+            List of 4 (x, y) coordinates [tl, tr, bl, br], or None if not found
+        """
+        ctx = as_context(image)
+        gray = ctx.gray
+        
+        fiducials = None
+        due = self.reanchor_interval and self._frames_since_anchor >= self.reanchor_interval
+        if self._features is not None and not due and self._prev_gray.shape == gray.shape:
+            fiducials = self._track(gray)
+            if fiducials is not None:
+                self.last_mode = 'track'
+                self.tracked += 1
+                self._frames_since_anchor += 1
+        
+        if fiducials is None:
+            detected = detect_fiducials(ctx, self.template)
+            self.last_mode = 'detect'
+            self.detections += 1
+            self._frames_since_anchor = 0
+            if detected is None:
+                self.reset()
+                return None
+            fiducials = np.array(detected, dtype=np.float32).reshape(-1, 2)
+            self._features = None
+        
+        self._prev_gray = gray
+        self._fiducials = fiducials
+        # Top up features once tracking has worn them down
+        if self._features is None or len(self._features) < self._seeded_count // 2:
+            self._seed_features(gray, fiducials)
+        return [(float(x), float(y)) for x, y in fiducials]
+    
+    def _seed_features(self, gray: np.ndarray, fiducials: np.ndarray) -> None:
+        """Pick trackable corners in a window around each fiducial."""
+        # Window scales with the fiducial quad so it covers the marker at any distance
+        span = np.linalg.norm(fiducials[3] - fiducials[0])
+        self._radius = int(max(16, span * 0.05))
+        features, owners = [], []
+        for i, (fx, fy) in enumerate(fiducials):
+            x0, y0, x1, y1 = self._window(gray, fx, fy, self._radius)
+            if x1 - x0 < 3 or y1 - y0 < 3:
+                continue
+            corners = cv2.goodFeaturesToTrack(gray[y0:y1, x0:x1], self.features_per_fiducial, 0.05, 3)
+            if corners is not None:
+                features.append(corners.reshape(-1, 2) + (x0, y0))
+                owners.append(np.full(len(corners), i))
+        if features:
+            self._features = np.concatenate(features).astype(np.float32).reshape(-1, 1, 2)
+            self._owners = np.concatenate(owners)
+        else:
+            self._features = None
+        self._seeded_count = 0 if self._features is None else len(self._features)
+    
+    @staticmethod
+    def _window(gray: np.ndarray, x: float, y: float, radius: int) -> Tuple[int, int, int, int]:
+        x0, y0 = max(int(x) - radius, 0), max(int(y) - radius, 0)
+        x1, y1 = min(int(x) + radius, gray.shape[1]), min(int(y) + radius, gray.shape[0])
+        return x0, y0, x1, y1
+    
+    def _flow(self, prev_gray: np.ndarray, gray: np.ndarray, prev: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Track points forward and back, one crop per fiducial.
+        
+        Pyramids are built only for a window around each fiducial (the seeding
+        window plus a motion margin) instead of the whole frame.
+        """
+        points = np.zeros_like(prev)
+        good = np.zeros(len(prev), dtype=bool)
+        for i in np.unique(self._owners):
+            idx = np.flatnonzero(self._owners == i)
+            fx, fy = self._fiducials[i]
+            x0, y0, x1, y1 = self._window(gray, fx, fy, self._radius + max(32, self._radius // 2))
+            if x1 - x0 < 3 or y1 - y0 < 3:
+                continue
+            a, b = prev_gray[y0:y1, x0:x1], gray[y0:y1, x0:x1]
+            local = prev[idx] - np.float32((x0, y0))
+            fwd, status, _ = cv2.calcOpticalFlowPyrLK(a, b, local, None, **self._lk_params)
+            if fwd is None:
+                continue
+            # Track back to the previous frame; drifting points do not return home
+            back, back_status, _ = cv2.calcOpticalFlowPyrLK(b, a, fwd, None, **self._lk_params)
+            if back is None:
+                continue
+            fb_error = np.linalg.norm((back - local).reshape(-1, 2), axis=1)
+            good[idx] = status.ravel().astype(bool) & back_status.ravel().astype(bool) & (fb_error <= self.max_fb_error)
+            points[idx] = fwd + np.float32((x0, y0))
+        return points, good
+    
+    def _track(self, gray: np.ndarray) -> Optional[np.ndarray]:
+        prev = self._features
+        points, good = self._flow(self._prev_gray, gray, prev)
+        # Need the four corners of the quad to constrain the homography
+        if good.sum() < self.min_features or len(np.unique(self._owners[good])) < 4:
+            return None
+        
+        # Frame-to-frame homography from the surviving features
+        matrix, inliers = cv2.findHomography(prev[good], points[good], cv2.RANSAC, 2.0)
+        if matrix is None or inliers.sum() < self.min_features:
+            return None
+        fiducials = cv2.perspectiveTransform(self._fiducials.reshape(-1, 1, 2), matrix).reshape(-1, 2)
+        
+        # Reject collapsed or jumping quads (order tl, tr, bl, br -> polygon tl, tr, br, bl)
+        def quad_area(p):
+            return abs(cv2.contourArea(p[[0, 1, 3, 2]].astype(np.float32)))
+        prev_area = quad_area(self._fiducials)
+        if prev_area <= 0 or abs(quad_area(fiducials) - prev_area) / prev_area > self.max_area_change:
+            return None
+        
+        keep = np.flatnonzero(good)[inliers.ravel().astype(bool)]
+        self._features = points[keep].reshape(-1, 1, 2)
+        self._owners = self._owners[keep]
+        return fiducials.astype(np.float32)
+
+
+def align_image(image: Union[np.ndarray, ImageContext], fiducials: List[Tuple[float, float]], template: dict, 
                verbose: bool = False) -> Tuple[np.ndarray, Optional[Dict[str, float]], np.ndarray]:
     """Calculate inverse perspective transform for coordinate alignment.
     
@@ -294,7 +812,7 @@ def align_image(image: np.ndarray, fiducials: List[Tuple[int, int]], template: d
     template coordinates to match the distorted ballot's actual positions.
     
     Args:
-        image: Input image (returned unmodified)
+        image: Input image or ImageContext (returned unmodified)
         fiducials: List of 4 detected fiducial coordinates [TL, TR, BL, BR]
         template: Template dictionary with expected fiducial positions
         verbose: If True, print quality metrics report
@@ -0,0 +1,93 @@
+"""Per-image context shared by the appreciation pipeline stages."""
+
+import cv2
+import numpy as np
+from typing import Callable, Dict, Hashable, Optional, Union
+
+
+class ImageContext:
+    """
+    A decoded ballot image plus lazily derived planes.
+
+    Fiducial detection, mark detection and barcode decoding all work on
+    grayscale. Passing one ImageContext through the pipeline converts the
+    page once and shares derived buffers (pyramid levels, binaries) between
+    stages instead of each stage calling cv2.cvtColor on the full page.
+    """
+
+    def __init__(self, image: np.ndarray):
+        """
+        Args:
+            image: BGR image, or a single-channel grayscale image
+        """
+        if image.ndim == 2:
+            self._bgr = None
+            self._gray = image
+        else:
+            self._bgr = image
+            self._gray = None
+        self._derived: Dict[Hashable, np.ndarray] = {}
+
+    @classmethod
+    def load(cls, path: str, color: bool = False) -> Optional['ImageContext']:
+        """
+        Load an image file.
+
+        Args:
+            path: Image path
+            color: Keep the BGR planes (only needed for overlays/visual output);
+                   grayscale loading uses a third of the memory
+
+        Returns:
+            ImageContext, or None if the image could not be read
+        """
+        image = cv2.imread(path, cv2.IMREAD_COLOR if color else cv2.IMREAD_GRAYSCALE)
+        return cls(image) if image is not None else None
+
+    @property
+    def has_color(self) -> bool:
+        return self._bgr is not None
+
+    @property
+    def shape(self):
+        return self._bgr.shape if self._bgr is not None else self._gray.shape
+
+    @property
+    def bgr(self) -> np.ndarray:
+        """BGR image (expanded from grayscale if loaded without color)."""
+        if self._bgr is None:
+            self._bgr = cv2.cvtColor(self._gray, cv2.COLOR_GRAY2BGR)
+        return self._bgr
+
+    @property
+    def gray(self) -> np.ndarray:
+        """Grayscale plane, converted on first use."""
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self._bgr, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    def pyramid(self, levels: int) -> np.ndarray:
+        """Grayscale downscaled by 2**levels with cv2.pyrDown (each level cached)."""
+        if levels <= 0:
+            return self.gray
+        return self.derive(('pyramid', levels), lambda: cv2.pyrDown(self.pyramid(levels - 1)))
+
+    def derive(self, key: Hashable, build: Callable[[], np.ndarray]) -> np.ndarray:
+        """Get a derived buffer, building it once per image."""
+        if key not in self._derived:
+            self._derived[key] = build()
+        return self._derived[key]
+
+
+def as_context(image: Union[np.ndarray, ImageContext]) -> ImageContext:
+    """Wrap an array in an ImageContext (contexts are returned unchanged)."""
+    return image if isinstance(image, ImageContext) else ImageContext(image)
+
+
+def to_gray(image: Union[np.ndarray, ImageContext]) -> np.ndarray:
+    """Grayscale plane of an ImageContext, BGR array or grayscale array."""
+    if isinstance(image, ImageContext):
+        return image.gray
+    if image.ndim == 2:
+        return image
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
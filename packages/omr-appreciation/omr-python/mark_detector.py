@@ -1,12 +1,56 @@
 """Mark detection for OMR zones."""
 
+import os
+from functools import lru_cache
+
 import cv2
 import numpy as np
-from typing import List, Dict, Optional
-from threshold_config import get_confidence_thresholds, get_quality_thresholds, get_classification_thresholds
+from typing import List, Dict, Optional, Union
+from image_context import ImageContext, as_context
+from threshold_config import MarkThresholds, get_mark_thresholds
 from utils import get_roi_coordinates
 
 
+def transform_zone_coords(coords: np.ndarray, inv_matrix: np.ndarray,
+                          transformed_extents: bool = False) -> np.ndarray:
+    """Transform zone ROIs with the inverse perspective matrix in one batched call.
+    
+    Args:
+        coords: (N, 4) array of x, y, width, height in template space
+        inv_matrix: 3x3 inverse perspective transform matrix
+        transformed_extents: Also transform the four ROI corners and size each
+                            ROI to their bounding box, so bubbles near a
+                            stretched edge get correctly sized ROIs. By default
+                            only the center moves and width/height are kept.
+        
+    Returns:
+        (N, 4) int64 array of transformed x, y, width, height
+    """
+    coords = np.asarray(coords, dtype=np.int64).reshape(-1, 4)
+    if len(coords) == 0:
+        return coords
+    
+    x, y, width, height = coords.T
+    centers = np.stack([x + width / 2, y + height / 2], axis=1).astype(np.float32)
+    centers = cv2.perspectiveTransform(centers.reshape(-1, 1, 2), inv_matrix).reshape(-1, 2)
+    
+    if transformed_extents:
+        corners = np.stack([
+            np.stack([x, y], axis=1), np.stack([x + width, y], axis=1),
+            np.stack([x, y + height], axis=1), np.stack([x + width, y + height], axis=1),
+        ], axis=1).astype(np.float32)
+        corners = cv2.perspectiveTransform(corners.reshape(-1, 1, 2), inv_matrix).reshape(-1, 4, 2)
+        extent = corners.max(axis=1) - corners.min(axis=1)
+        half = extent / 2
+        width, height = np.trunc(extent[:, 0]), np.trunc(extent[:, 1])
+    else:
+        half = np.stack([width / 2, height / 2], axis=1).astype(np.float32)
+    
+    # Center back to top-left (int() semantics: truncate toward zero)
+    top_left = np.trunc(centers - half)
+    return np.stack([top_left[:, 0], top_left[:, 1], width, height], axis=1).astype(np.int64)
+
+
 def transform_zone_coordinates(zones: List[Dict], inv_matrix: np.ndarray) -> List[Dict]:
     """Transform zone coordinates using inverse perspective matrix.
     
@@ -17,48 +61,96 @@ def transform_zone_coordinates(zones: List[Dict], inv_matrix: np.ndarray) -> Lis
     Returns:
         List of zones with transformed coordinates
     """
-    transformed_zones = []
+    coords = np.array([get_roi_coordinates(zone) for zone in zones], dtype=np.int64)
+    transformed = transform_zone_coords(coords, inv_matrix)
     
-    for zone in zones:
-        # Get original zone coordinates
-        x, y, width, height = get_roi_coordinates(zone)
-        
-        # Transform center point
-        center_x = x + width / 2
-        center_y = y + height / 2
-        
-        # Create point array for transformation
-        point = np.array([[center_x, center_y]], dtype=np.float32).reshape(-1, 1, 2)
-        transformed_point = cv2.perspectiveTransform(point, inv_matrix)
-        
-        # Extract transformed coordinates
-        new_center_x = transformed_point[0][0][0]
-        new_center_y = transformed_point[0][0][1]
-        
-        # Calculate new top-left coordinates
-        new_x = int(new_center_x - width / 2)
-        new_y = int(new_center_y - height / 2)
-        
+    transformed_zones = []
+    for zone, (new_x, new_y, _, _) in zip(zones, transformed.tolist()):
         # Create transformed zone (preserve all original fields)
         transformed_zone = zone.copy()
         transformed_zone['x'] = new_x
         transformed_zone['y'] = new_y
-        
         transformed_zones.append(transformed_zone)
     
     return transformed_zones
 
 
-def calculate_mark_metrics(image: np.ndarray, x: int, y: int, width: int, height: int) -> dict:
+@lru_cache(maxsize=64)
+def _build_bubble_mask(height: int, width: int, shape: str, scale: float) -> Optional[np.ndarray]:
+    """Build the read-only mask behind get_bubble_mask() (cached per size, shape and scale).
+    
+    Args:
+        height, width: Full zone size
+        shape: 'circle', or 'none'/'square' for no mask
+        scale: Ellipse radius as a fraction of the half zone size
+        
+    Returns:
+        (height, width) bool array, or None when there is nothing to mask (or
+        the ellipse covers no pixel centre, e.g. on a 2x2 ROI with a small scale)
+        
+    Raises:
+        ValueError: If shape is unknown
+    """
+    if shape in ('none', 'square') or height <= 0 or width <= 0:
+        return None
+    if shape != 'circle':
+        raise ValueError(f"Unknown bubble mask shape: {shape}")
+    
+    # Ellipse inscribed in the ROI, shrunk by scale to leave out the printed outline
+    yy, xx = np.mgrid[0:height, 0:width]
+    nx = (xx + 0.5 - width / 2) / (width / 2 * scale)
+    ny = (yy + 0.5 - height / 2) / (height / 2 * scale)
+    mask = (nx * nx + ny * ny) <= 1.0
+    if not mask.any():
+        return None
+    mask.setflags(write=False)
+    return mask
+
+
+def get_bubble_mask(height: int, width: int, shape: Optional[str] = None,
+                    roi_size: Optional[tuple] = None) -> Optional[np.ndarray]:
+    """Boolean mask of the ROI pixels that count towards fill metrics (cached per size).
+    
+    Args:
+        height, width: Zone size the mask is centred on
+        shape: 'circle' (ellipse inscribed in the zone, scaled by
+               OMR_BUBBLE_MASK_SCALE, default 0.8) or 'none' for the full
+               square. Defaults to OMR_BUBBLE_MASK (none).
+        roi_size: (height, width) of the ROI actually read when the image
+                  border clipped the zone; the mask is cropped to it so the
+                  circle stays where the bubble is
+        
+    Returns:
+        bool array of the ROI size, or None for an unmasked ROI (including a
+        mask with no pixel left after cropping)
+    """
+    if shape is None:
+        shape = os.environ.get('OMR_BUBBLE_MASK', 'none')
+    scale = float(os.environ.get('OMR_BUBBLE_MASK_SCALE', '0.8'))
+    mask = _build_bubble_mask(int(height), int(width), shape, scale)
+    if mask is not None and roi_size is not None and tuple(roi_size) != mask.shape:
+        # Clipping only happens at the bottom/right edges (ROIs are sliced from x, y >= 0)
+        mask = mask[:roi_size[0], :roi_size[1]]
+        if not mask.any():
+            return None
+    return mask
+
+
+def calculate_mark_metrics(image: np.ndarray, x: int, y: int, width: int, height: int,
+                           thresholds: Optional[MarkThresholds] = None,
+                           mask: Optional[str] = None) -> dict:
     """Calculate comprehensive metrics for a mark zone.
     
     Args:
         image: Aligned grayscale image
         x, y: Top-left coordinates of ROI
         width, height: ROI dimensions
+        thresholds: Compiled thresholds (defaults to the loaded config)
+        mask: Bubble mask shape (see get_bubble_mask)
         
     Returns:
         Dictionary with fill_ratio, confidence, uniformity, and other metrics
+        (roi_fill_ratio is the fill of the whole square, used for overfill)
     """
     # Extract ROI
     roi = image[y:y+height, x:x+width]
@@ -66,6 +158,7 @@ def calculate_mark_metrics(image: np.ndarray, x: int, y: int, width: int, height
     if roi.size == 0:
         return {
             'fill_ratio': 0.0,
+            'roi_fill_ratio': 0.0,
             'confidence': 0.0,
             'uniformity': 0.0,
             'mean_darkness': 0.0,
@@ -81,20 +174,25 @@ def calculate_mark_metrics(image: np.ndarray, x: int, y: int, width: int, height
     # Use Otsu's method for automatic threshold calculation
     threshold_value, binary = cv2.threshold(roi, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
     
-    # Calculate fill ratio
-    dark_pixels = np.count_nonzero(binary)
-    total_pixels = roi.size
-    fill_ratio = dark_pixels / total_pixels
+    # Calculate fill ratio, inside the bubble mask if one is set. Otsu still
+    # runs on the whole ROI: a solidly filled interior alone is not bimodal.
+    roi_fill_ratio = np.count_nonzero(binary) / binary.size
+    bubble_mask = get_bubble_mask(height, width, shape=mask, roi_size=roi.shape[:2])
+    if bubble_mask is not None:
+        fill_ratio = np.count_nonzero(binary[bubble_mask]) / np.count_nonzero(bubble_mask)
+        mean_val = np.mean(roi[bubble_mask])
+    else:
+        fill_ratio = roi_fill_ratio
     
     # Calculate confidence based on how clear the mark is
     # High confidence = clear distinction between marked and unmarked
     # Low confidence = ambiguous (e.g., partial marks, smudges)
     
-    # Load thresholds from config
-    confidence_thresholds = get_confidence_thresholds()
-    reference_threshold = confidence_thresholds.get('reference', 0.3)
-    perfect_fill = confidence_thresholds.get('perfect_fill', 0.5)
-    noise_threshold = confidence_thresholds.get('noise_threshold', 0.15)
+    if thresholds is None:
+        thresholds = get_mark_thresholds()
+    reference_threshold = thresholds.reference
+    perfect_fill = thresholds.perfect_fill
+    noise_threshold = thresholds.noise_threshold
     
     # Confidence factors:
     # 1. Distance from decision boundary (threshold)
@@ -119,10 +217,7 @@ def calculate_mark_metrics(image: np.ndarray, x: int, y: int, width: int, height
     # 4. Uniformity adjusted for expected bimodality after transform
     # High std_dev is expected for filled marks after perspective transform
     # Only penalize if std_dev is unusually low (possible scanning artifact)
-    quality_thresholds = get_quality_thresholds()
-    high_std_dev = quality_thresholds.get('high_std_dev', 60)
-    
-    if fill_ratio > reference_threshold and std_dev > high_std_dev:
+    if fill_ratio > reference_threshold and std_dev > thresholds.high_std_dev:
         # This is expected for filled marks after transform
         uniformity = 0.9
     else:
@@ -137,6 +232,7 @@ def calculate_mark_metrics(image: np.ndarray, x: int, y: int, width: int, height
     
     return {
         'fill_ratio': fill_ratio,
+        'roi_fill_ratio': roi_fill_ratio,
         'confidence': confidence,
         'uniformity': uniformity,
         'mean_darkness': mean_darkness / 255.0,  # Normalize to 0-1
@@ -145,50 +241,465 @@ def calculate_mark_metrics(image: np.ndarray, x: int, y: int, width: int, height
     }
 
 
-def detect_marks(image: np.ndarray, zones: List[Dict], threshold: float = 0.3, 
-                inv_matrix: Optional[np.ndarray] = None) -> List[Dict]:
+def _otsu_thresholds(hist: np.ndarray) -> np.ndarray:
+    """Compute Otsu's threshold for every row of an (N, 256) histogram stack.
+    
+    Vectorized equivalent of cv2.threshold(..., cv2.THRESH_OTSU) on each ROI:
+    the first gray level that maximizes between-class variance, 0 if none does.
+    
+    Args:
+        hist: (N, 256) pixel-count histograms
+        
+    Returns:
+        (N,) array of integer thresholds
+    """
+    hist = hist.astype(np.float64)
+    total = hist.sum(axis=1, keepdims=True)
+    total[total == 0] = 1.0
+    p = hist / total
+    
+    levels = np.arange(256, dtype=np.float64)
+    q1 = np.cumsum(p, axis=1)
+    mu_cum = np.cumsum(p * levels, axis=1)
+    mu = mu_cum[:, -1:]
+    q2 = 1.0 - q1
+    
+    eps = np.finfo(np.float32).eps
+    valid = (np.minimum(q1, q2) >= eps) & (np.maximum(q1, q2) <= 1.0 - eps)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mu1 = mu_cum / q1
+        mu2 = (mu - q1 * mu1) / q2
+        sigma = q1 * q2 * (mu1 - mu2) ** 2
+    sigma = np.where(valid, sigma, 0.0)
+    
+    # argmax keeps the first maximum, matching OpenCV's strict '>' scan
+    thresholds = np.argmax(sigma, axis=1)
+    thresholds[sigma.max(axis=1) <= 0] = 0
+    return thresholds
+
+
+def calculate_mark_metrics_batch(rois: np.ndarray,
+                                 thresholds: Optional[MarkThresholds] = None,
+                                 mask: Optional[str] = None,
+                                 zone_size: Optional[tuple] = None) -> Dict[str, np.ndarray]:
+    """Calculate mark metrics for a stack of same-sized ROIs in one pass.
+    
+    Vectorized counterpart of calculate_mark_metrics(): same formulas, but
+    mean/std/min/max, the per-ROI Otsu threshold and the confidence score
+    are computed for all bubbles with array operations.
+    
+    Args:
+        rois: (N, height, width) uint8 stack of grayscale bubble ROIs
+        thresholds: Compiled thresholds (defaults to the loaded config)
+        mask: Bubble mask shape (see get_bubble_mask); fill ratio and mean
+              darkness are measured inside it
+        zone_size: (height, width) the mask is centred on, when the ROIs are
+                   zones clipped by the image border (default: the ROI size)
+        
+    Returns:
+        Dictionary of (N,) arrays: fill_ratio, roi_fill_ratio, confidence,
+        uniformity, mean_darkness, std_dev, otsu_threshold
+    """
+    n = rois.shape[0]
+    flat = rois.reshape(n, -1)
+    total_pixels = flat.shape[1]
+    
+    if n == 0 or total_pixels == 0:
+        zeros = np.zeros(n, dtype=np.float64)
+        return {
+            'fill_ratio': zeros,
+            'roi_fill_ratio': zeros,
+            'confidence': zeros,
+            'uniformity': zeros,
+            'mean_darkness': zeros,
+            'std_dev': zeros,
+            'otsu_threshold': zeros
+        }
+    
+    # Basic statistics
+    mean_val = flat.mean(axis=1)
+    std_dev = flat.std(axis=1)
+    min_val = flat.min(axis=1).astype(np.float64)
+    max_val = flat.max(axis=1).astype(np.float64)
+    
+    # Per-ROI histograms in a single bincount, then Otsu on all rows at once
+    offsets = (np.arange(n, dtype=np.int64) * 256)[:, None]
+    hist = np.bincount((flat + offsets).ravel(), minlength=n * 256).reshape(n, 256)
+    threshold_value = _otsu_thresholds(hist)
+    
+    # THRESH_BINARY_INV marks pixels <= threshold as dark
+    dark_pixels = np.take_along_axis(np.cumsum(hist, axis=1), threshold_value[:, None], axis=1)[:, 0]
+    roi_fill_ratio = dark_pixels / total_pixels
+    fill_ratio = roi_fill_ratio
+    bubble_mask = get_bubble_mask(*(zone_size or rois.shape[1:3]), shape=mask, roi_size=rois.shape[1:3])
+    if bubble_mask is not None:
+        # Count dark pixels inside the mask only, against the whole-ROI Otsu threshold
+        inside = flat[:, bubble_mask.ravel()]
+        fill_ratio = (inside <= threshold_value[:, None]).sum(axis=1) / inside.shape[1]
+        mean_val = inside.mean(axis=1)
+    
+    return _score_metrics(fill_ratio, mean_val, std_dev, (max_val - min_val) / 255.0,
+                          threshold_value.astype(np.float64), thresholds, roi_fill_ratio=roi_fill_ratio)
+
+
+def _score_metrics(fill_ratio: np.ndarray, mean_val: np.ndarray, std_dev: np.ndarray,
+                   separation: np.ndarray, threshold_value: np.ndarray,
+                   thresholds: Optional[MarkThresholds] = None,
+                   roi_fill_ratio: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """Confidence and uniformity from per-ROI statistics (batched calculate_mark_metrics() rules)."""
+    if thresholds is None:
+        thresholds = get_mark_thresholds()
+    reference_threshold = thresholds.reference
+    perfect_fill = thresholds.perfect_fill
+    noise_threshold = thresholds.noise_threshold
+    
+    # Same confidence factors as calculate_mark_metrics()
+    clarity_score = np.minimum(np.abs(fill_ratio - reference_threshold) / reference_threshold, 1.0)
+    separation = np.minimum(separation, 1.0)
+    
+    likely_filled = fill_ratio > reference_threshold
+    quality_score = np.where(
+        likely_filled,
+        np.minimum(fill_ratio / perfect_fill, 1.0),
+        1.0 - np.minimum(fill_ratio / noise_threshold, 1.0)
+    )
+    uniformity = np.where(
+        likely_filled & (std_dev > thresholds.high_std_dev),
+        0.9,
+        1.0 - np.minimum(std_dev / 127.0, 1.0)
+    )
+    
+    confidence = (clarity_score * 0.4 + quality_score * 0.3 + separation * 0.2 + uniformity * 0.1)
+    
+    return {
+        'fill_ratio': fill_ratio,
+        'roi_fill_ratio': fill_ratio if roi_fill_ratio is None else roi_fill_ratio,
+        'confidence': confidence,
+        'uniformity': uniformity,
+        'mean_darkness': (255 - mean_val) / 255.0,
+        'std_dev': std_dev,
+        'otsu_threshold': threshold_value
+    }
+
+
+def _gather_roi_metrics(gray: np.ndarray, coords: np.ndarray,
+                        thresholds: MarkThresholds,
+                        mask: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """Gather every zone ROI into stacked arrays and compute their metrics.
+    
+    The common case (all ROIs the same size and inside the image) is gathered
+    with a single fancy-index into one (N, h, w) array. Otherwise ROIs are
+    sliced exactly like calculate_mark_metrics() does and grouped by shape.
+    
+    Args:
+        gray: Grayscale image
+        coords: (N, 4) int array of x, y, width, height
+        thresholds: Compiled thresholds
+        mask: Bubble mask shape (see get_bubble_mask)
+        
+    Returns:
+        Dictionary of (N,) metric arrays (see calculate_mark_metrics_batch)
+    """
+    n = len(coords)
+    img_h, img_w = gray.shape[:2]
+    x, y, w, h = coords.T
+    
+    uniform = n > 0 and (w == w[0]).all() and (h == h[0]).all()
+    in_bounds = n > 0 and (x >= 0).all() and (y >= 0).all() \
+        and (x + w <= img_w).all() and (y + h <= img_h).all()
+    
+    if uniform and in_bounds and w[0] > 0 and h[0] > 0:
+        rows = y[:, None] + np.arange(h[0])
+        cols = x[:, None] + np.arange(w[0])
+        rois = gray[rows[:, :, None], cols[:, None, :]]
+        return calculate_mark_metrics_batch(rois, thresholds, mask=mask)
+    
+    # Mixed sizes or ROIs clipped by the image border
+    metrics = {key: np.zeros(n, dtype=np.float64) for key in
+               ('fill_ratio', 'roi_fill_ratio', 'confidence', 'uniformity', 'mean_darkness', 'std_dev',
+                'otsu_threshold')}
+    groups: Dict[tuple, List[int]] = {}
+    rois_by_index = {}
+    for i, (zx, zy, zw, zh) in enumerate(coords):
+        roi = gray[zy:zy+zh, zx:zx+zw]
+        if roi.size == 0:
+            continue
+        rois_by_index[i] = roi
+        # Group by zone size too: a clipped ROI keeps the mask of its full zone
+        groups.setdefault((roi.shape, (int(zh), int(zw))), []).append(i)
+    
+    for (_, zone_size), indices in groups.items():
+        group_metrics = calculate_mark_metrics_batch(
+            np.stack([rois_by_index[i] for i in indices]), thresholds, mask=mask, zone_size=zone_size
+        )
+        for key, values in group_metrics.items():
+            metrics[key][indices] = values
+    
+    return metrics
+
+
+def _page_integrals(ctx: ImageContext, coords: np.ndarray, binarize: str):
+    """Binarize the page once and build integral images over the bubble area.
+    
+    Integrals cover only the bounding box of all zones (cached on the context
+    per box and method) to keep the float64 sum/square-sum planes small.
+    
+    Returns:
+        Tuple of (origin (x, y), dark-pixel integral, gray sum integral,
+        gray square-sum integral, page threshold or NaN for adaptive)
+    """
+    gray = ctx.gray
+    img_h, img_w = gray.shape[:2]
+    x0 = int(np.clip(coords[:, 0].min(), 0, img_w))
+    y0 = int(np.clip(coords[:, 1].min(), 0, img_h))
+    x1 = int(np.clip((coords[:, 0] + coords[:, 2]).max(), x0, img_w))
+    y1 = int(np.clip((coords[:, 1] + coords[:, 3]).max(), y0, img_h))
+    
+    def build():
+        if binarize == 'otsu':
+            # Global Otsu over the whole page; pixels <= threshold are dark
+            page_threshold, dark = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        elif binarize == 'adaptive':
+            block = int(os.environ.get('OMR_ADAPTIVE_BLOCK', '51')) | 1
+            dark = cv2.adaptiveThreshold(gray, 1, cv2.ADAPTIVE_THRESH_MEAN_C,
+                                         cv2.THRESH_BINARY_INV, block, 10)
+            page_threshold = float('nan')
+        else:
+            raise ValueError(f"Unknown binarization: {binarize}")
+        
+        region = gray[y0:y1, x0:x1]
+        dark_sum = cv2.integral(dark[y0:y1, x0:x1], sdepth=cv2.CV_32S)
+        gray_sum, gray_sqsum = cv2.integral2(region, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+        return (x0, y0), dark_sum, gray_sum, gray_sqsum, float(page_threshold)
+    
+    return ctx.derive(('integral', binarize, x0, y0, x1, y1), build)
+
+
+def _integral_roi_metrics(ctx: ImageContext, coords: np.ndarray, thresholds: MarkThresholds,
+                          binarize: str = 'otsu') -> Dict[str, np.ndarray]:
+    """Metrics for every zone from four-corner lookups into page integral images.
+    
+    Fill ratio is the share of page-binarized dark pixels in the ROI; mean and
+    standard deviation come from the sum/square-sum integrals. Min/max are not
+    available from integrals, so separation is estimated from a two-level
+    model (std = contrast * sqrt(fill * (1 - fill))).
+    
+    Args:
+        ctx: Image context (integrals are cached on it)
+        coords: (N, 4) int array of x, y, width, height in image space
+        thresholds: Compiled thresholds
+        binarize: 'otsu' (global page threshold) or 'adaptive' (local mean)
+        
+    Returns:
+        Dictionary of (N,) metric arrays (see calculate_mark_metrics_batch)
+    """
+    n = len(coords)
+    if n == 0:
+        return calculate_mark_metrics_batch(np.zeros((0, 0, 0), dtype=np.uint8), thresholds)
+    
+    (ox, oy), dark_sum, gray_sum, gray_sqsum, page_threshold = _page_integrals(ctx, coords, binarize)
+    
+    # Clip ROIs to the integrated region (as slicing would) and shift into it
+    region_h, region_w = dark_sum.shape[0] - 1, dark_sum.shape[1] - 1
+    x0 = np.clip(coords[:, 0] - ox, 0, region_w)
+    y0 = np.clip(coords[:, 1] - oy, 0, region_h)
+    x1 = np.clip(coords[:, 0] + coords[:, 2] - ox, x0, region_w)
+    y1 = np.clip(coords[:, 1] + coords[:, 3] - oy, y0, region_h)
+    area = ((x1 - x0) * (y1 - y0)).astype(np.float64)
+    
+    def box_sum(integral):
+        return (integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]).astype(np.float64)
+    
+    valid = area > 0
+    safe_area = np.where(valid, area, 1.0)
+    fill_ratio = np.where(valid, box_sum(dark_sum) / safe_area, 0.0)
+    mean_val = box_sum(gray_sum) / safe_area
+    variance = np.maximum(box_sum(gray_sqsum) / safe_area - mean_val * mean_val, 0.0)
+    std_dev = np.where(valid, np.sqrt(variance), 0.0)
+    mean_val = np.where(valid, mean_val, 255.0)
+    
+    spread = np.sqrt(fill_ratio * (1.0 - fill_ratio))
+    separation = np.where(spread > 0, std_dev / np.where(spread > 0, spread, 1.0), 0.0) / 255.0
+    
+    metrics = _score_metrics(fill_ratio, mean_val, std_dev, separation,
+                             np.full(n, page_threshold), thresholds)
+    if not valid.all():
+        for key in ('confidence', 'uniformity', 'mean_darkness'):
+            metrics[key] = np.where(valid, metrics[key], 0.0)
+    return metrics
+
+
+# Template-space sample grids for the rectified engine, keyed by zone layout
+_patch_grid_cache: Dict[tuple, np.ndarray] = {}
+_PATCH_GRID_CACHE_SIZE = 8
+
+
+def _patch_grid(coords: np.ndarray, patch_size: int) -> np.ndarray:
+    """Sample points for every zone, tiled into one remap-able layout (cached).
+    
+    Patches are laid out on a near-square grid of tiles (cv2.remap limits
+    each side to SHRT_MAX), row-major by zone index.
+    
+    Returns:
+        (rows * patch_size, cols * patch_size, 2) float32 template-space x/y
+    """
+    key = (coords.tobytes(), patch_size)
+    grid = _patch_grid_cache.get(key)
+    if grid is not None:
+        return grid
+    
+    n = len(coords)
+    cols = max(1, int(np.ceil(np.sqrt(n))))
+    rows = max(1, -(-n // cols))
+    
+    # Sample at output pixel centers (image pixel k is centered on k, hence -0.5)
+    steps = (np.arange(patch_size, dtype=np.float64) + 0.5) / patch_size
+    x, y, w, h = coords.astype(np.float64).T
+    # Padding tiles sample off-page (border value)
+    px = np.full((rows * cols, patch_size), -1.0)
+    py = np.full((rows * cols, patch_size), -1.0)
+    px[:n] = x[:, None] + w[:, None] * steps - 0.5
+    py[:n] = y[:, None] + h[:, None] * steps - 0.5
+    
+    grid = np.empty((rows, patch_size, cols, patch_size, 2), dtype=np.float32)
+    grid[..., 0] = px.reshape(rows, cols, 1, patch_size).transpose(0, 2, 1, 3)
+    grid[..., 1] = py.reshape(rows, cols, patch_size, 1).transpose(0, 2, 1, 3)
+    grid = grid.reshape(rows * patch_size, cols * patch_size, 2)
+    
+    if len(_patch_grid_cache) >= _PATCH_GRID_CACHE_SIZE:
+        _patch_grid_cache.pop(next(iter(_patch_grid_cache)))
+    _patch_grid_cache[key] = grid
+    return grid
+
+
+def extract_rectified_patches(gray: np.ndarray, coords: np.ndarray,
+                              inv_matrix: Optional[np.ndarray] = None,
+                              patch_size: int = 32) -> np.ndarray:
+    """Sample every zone as a fixed-size patch following the homography.
+    
+    Instead of warping the page, the cached template-space grid is projected
+    through inv_matrix and all bubbles are resampled with a single cv2.remap,
+    so each patch covers the zone's true (rotated/skewed) footprint.
+    
+    Args:
+        gray: Grayscale image
+        coords: (N, 4) int array of x, y, width, height in template space
+        inv_matrix: Template -> image perspective matrix (None: identity)
+        patch_size: Side of each square output patch in pixels
+        
+    Returns:
+        (N, patch_size, patch_size) uint8 stack (off-image samples are white)
+    """
+    n = len(coords)
+    if n == 0:
+        return np.zeros((0, patch_size, patch_size), dtype=np.uint8)
+    
+    grid = _patch_grid(coords, patch_size)
+    if inv_matrix is not None:
+        grid = cv2.perspectiveTransform(grid.reshape(-1, 1, 2), inv_matrix).reshape(grid.shape)
+    
+    tiles = cv2.remap(gray, grid, None, cv2.INTER_LINEAR,
+                      borderMode=cv2.BORDER_CONSTANT, borderValue=255)
+    rows, cols = tiles.shape[0] // patch_size, tiles.shape[1] // patch_size
+    patches = tiles.reshape(rows, patch_size, cols, patch_size).transpose(0, 2, 1, 3)
+    return patches.reshape(-1, patch_size, patch_size)[:n]
+
+
+def detect_marks(image: Union[np.ndarray, ImageContext], zones: List[Dict], threshold: float = 0.3, 
+                inv_matrix: Optional[np.ndarray] = None, engine: Optional[str] = None,
+                thresholds: Optional[MarkThresholds] = None,
+                transformed_extents: Optional[bool] = None,
+                mask: Optional[str] = None,
+                binarize: Optional[str] = None) -> List[Dict]:
     """Detect filled marks in all zones with confidence metrics.
     
     Args:
-        image: Image to analyze (BGR)
+        image: Image to analyze (BGR, grayscale or ImageContext)
         zones: List of zone definitions from template (in template coordinate space)
         threshold: Fill ratio threshold to consider a mark as filled
         inv_matrix: Optional inverse perspective transform matrix for coordinate alignment.
                    If provided, zone coordinates will be transformed to match the distorted image.
+        engine: 'vectorized' computes all bubble metrics in batched NumPy (default);
+                'rectified' samples each bubble as a 32x32 patch along the
+                homography (exact geometry on rotated/skewed scans);
+                'integral' binarizes the page once and sums each ROI from
+                integral images in O(1);
+                'per_zone' runs calculate_mark_metrics() zone by zone (reference path).
+                Defaults to OMR_MARK_ENGINE.
+        thresholds: Compiled thresholds to classify with (defaults to the loaded
+                   config). Pass a variant to sweep thresholds over the same image.
+        transformed_extents: Size each ROI to its perspective-transformed corners
+                            instead of keeping the template width/height
+                            (default: OMR_TRANSFORMED_EXTENTS=0)
+        mask: Bubble mask shape: 'circle' counts only pixels inside the bubble,
+              'none' the full square ROI (default: OMR_BUBBLE_MASK, none).
+              The integral engine always uses the full ROI. The overfilled
+              warning always uses the full square, where ink outside the
+              bubble shows up.
+        binarize: Page binarization for the integral engine: 'otsu' or
+                  'adaptive' (default: OMR_BINARIZE, otsu)
         
     Returns:
         List of results with fill status, confidence, and quality metrics
     """
-    # Transform zone coordinates if inverse matrix is provided
-    if inv_matrix is not None:
-        zones = transform_zone_coordinates(zones, inv_matrix)
+    if engine is None:
+        engine = os.environ.get('OMR_MARK_ENGINE', 'vectorized')
     
-    # Convert to grayscale
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    coords = np.array([get_roi_coordinates(zone) for zone in zones], dtype=np.int64).reshape(-1, 4)
+    
+    # Transform zone coordinates if inverse matrix is provided (the rectified
+    # engine samples through the matrix itself)
+    if inv_matrix is not None and engine != 'rectified':
+        if transformed_extents is None:
+            transformed_extents = os.environ.get('OMR_TRANSFORMED_EXTENTS', '0') == '1'
+        coords = transform_zone_coords(coords, inv_matrix, transformed_extents=transformed_extents)
+    
+    if thresholds is None:
+        thresholds = get_mark_thresholds()
+    
+    # Grayscale plane (shared when an ImageContext is passed)
+    ctx = as_context(image)
+    gray = ctx.gray
+    
+    if engine == 'per_zone':
+        zone_metrics = [
+            calculate_mark_metrics(gray, x, y, w, h, thresholds=thresholds, mask=mask)
+            for x, y, w, h in coords.tolist()
+        ]
+    elif engine in ('vectorized', 'rectified', 'integral'):
+        if engine == 'integral':
+            if binarize is None:
+                binarize = os.environ.get('OMR_BINARIZE', 'otsu')
+            batch = _integral_roi_metrics(ctx, coords, thresholds, binarize)
+        elif engine == 'rectified':
+            patches = extract_rectified_patches(gray, coords, inv_matrix)
+            batch = calculate_mark_metrics_batch(patches, thresholds, mask=mask)
+        else:
+            batch = _gather_roi_metrics(gray, coords, thresholds, mask=mask)
+        zone_metrics = [
+            {key: float(values[i]) for key, values in batch.items()}
+            for i in range(len(zones))
+        ]
+    else:
+        raise ValueError(f"Unknown mark detection engine: {engine}")
+    
+    # Add warning flags for quality issues (using configurable thresholds)
+    ambiguous_min = thresholds.ambiguous_min
+    ambiguous_max = thresholds.ambiguous_max
+    overfilled_threshold = thresholds.overfilled
+    low_conf_threshold = thresholds.low_confidence
+    min_uniformity = thresholds.min_uniformity
     
     results = []
     
-    for zone in zones:
-        x, y, width, height = get_roi_coordinates(zone)
-        metrics = calculate_mark_metrics(gray, x, y, width, height)
-        
-        fill_ratio = metrics['fill_ratio']
-        confidence = metrics['confidence']
+    for zone, metrics in zip(zones, zone_metrics):
+        fill_ratio = float(metrics['fill_ratio'])
+        confidence = float(metrics['confidence'])
         
         # Determine fill status
         filled = fill_ratio >= threshold
         
-        # Add warning flags for quality issues (using configurable thresholds)
-        classification = get_classification_thresholds()
-        confidence_config = get_confidence_thresholds()
-        quality = get_quality_thresholds()
-        
-        ambiguous_min = classification.get('ambiguous_min', 0.15)
-        ambiguous_max = classification.get('ambiguous_max', 0.45)
-        overfilled_threshold = classification.get('overfilled', 0.7)
-        low_conf_threshold = confidence_config.get('low_confidence', 0.5)
-        min_uniformity = quality.get('min_uniformity', 0.4)
-        
         warnings = []
         if ambiguous_min < fill_ratio < ambiguous_max:  # Ambiguous range
             warnings.append('ambiguous')
@@ -196,7 +707,7 @@ def detect_marks(image: np.ndarray, zones: List[Dict], threshold: float = 0.3,
             warnings.append('low_confidence')
         if metrics['uniformity'] < min_uniformity:
             warnings.append('non_uniform')
-        if fill_ratio > overfilled_threshold:
+        if float(metrics['roi_fill_ratio']) > overfilled_threshold:
             warnings.append('overfilled')
         
         result = {
@@ -208,9 +719,9 @@ def detect_marks(image: np.ndarray, zones: List[Dict], threshold: float = 0.3,
             'fill_ratio': round(fill_ratio, 3),
             'confidence': round(confidence, 3),
             'quality': {
-                'uniformity': round(metrics['uniformity'], 3),
-                'mean_darkness': round(metrics['mean_darkness'], 3),
-                'std_dev': round(metrics['std_dev'], 2)
+                'uniformity': round(float(metrics['uniformity']), 3),
+                'mean_darkness': round(float(metrics['mean_darkness']), 3),
+                'std_dev': round(float(metrics['std_dev']), 2)
             },
             'warnings': warnings if warnings else None
         }
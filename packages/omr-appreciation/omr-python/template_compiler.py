@@ -0,0 +1,235 @@
+"""
+Template compiler.
+
+Turns a coordinates.json template (plus optional election config for simple
+bubble IDs) into a packed zone table: bubble ids, contest/code/candidate
+indices and pixel bounds in NumPy arrays. Compiled tables are cached on disk
+as .npz, keyed by the content hash of the source files and the DPI, so entry
+points skip the mm-to-px math, ID parsing and YAML loading on every run.
+"""
+
+import hashlib
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from bubble_metadata import BubbleMetadata, load_bubble_metadata
+from utils import get_cache_dir, load_template
+
+# Bump when the table layout or compile rules change to invalidate old caches
+COMPILER_VERSION = 1
+
+# Election config files that affect contest/code lookup
+CONFIG_FILES = ('election.json', 'mapping.yaml')
+
+ZONE_DTYPE = np.dtype([
+    ('contest', np.int32),
+    ('code', np.int32),
+    ('candidate', np.int32),
+    ('x', np.int32),
+    ('y', np.int32),
+    ('width', np.int32),
+    ('height', np.int32),
+])
+
+
+class ZoneTable:
+    """
+    Packed zones for one template.
+
+    ``records`` is a structured array (ZONE_DTYPE) whose contest, code and
+    candidate fields index into the ``contests``, ``codes`` and ``candidates``
+    string arrays; ``ids`` holds the bubble id of each row.
+    """
+
+    def __init__(self, ids: np.ndarray, records: np.ndarray, contests: np.ndarray,
+                 codes: np.ndarray, candidates: np.ndarray):
+        self.ids = ids
+        self.records = records
+        self.contests = contests
+        self.codes = codes
+        self.candidates = candidates
+        self._zones: Optional[List[Dict]] = None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def coords(self) -> np.ndarray:
+        """(N, 4) int array of x, y, width, height."""
+        r = self.records
+        return np.stack([r['x'], r['y'], r['width'], r['height']], axis=1)
+
+    def zones(self) -> List[Dict]:
+        """Zones in the dict format detect_marks() takes (built once per table)."""
+        if self._zones is None:
+            contests = self.contests.tolist()
+            codes = self.codes.tolist()
+            candidates = self.candidates.tolist()
+            self._zones = []
+            for bubble_id, (contest, code, candidate, x, y, w, h) in zip(self.ids.tolist(),
+                                                                       self.records.tolist()):
+                zone = {
+                    'id': bubble_id,
+                    'contest': contests[contest],
+                    'code': codes[code],
+                    'x': x,
+                    'y': y,
+                    'width': w,
+                    'height': h
+                }
+                if candidates[candidate]:
+                    zone['candidate'] = candidates[candidate]
+                self._zones.append(zone)
+        return self._zones
+
+    def save(self, path: str) -> None:
+        """Write the table as .npz (temp file + rename)."""
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, ids=self.ids, records=self.records, contests=self.contests,
+                 codes=self.codes, candidates=self.candidates)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'ZoneTable':
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['ids'], data['records'], data['contests'], data['codes'],
+                       data['candidates'])
+
+
+def _split_bubble_id(bubble_id: str):
+    """Legacy verbose IDs: CONTEST_CODE -> (contest, code)."""
+    parts = bubble_id.rsplit('_', 1)
+    if len(parts) > 1:
+        return parts[0], parts[1]
+    return '', bubble_id
+
+
+def compile_zones(template: Dict, bubble_metadata: Optional[BubbleMetadata] = None,
+                  dpi: float = 300) -> ZoneTable:
+    """
+    Compile a parsed template into a ZoneTable.
+
+    Args:
+        template: Template dictionary ('zones' array in pixels, or 'bubble' dict in mm)
+        bubble_metadata: Optional metadata for simple bubble IDs
+        dpi: Scan resolution for converting mm to pixels
+
+    Returns:
+        ZoneTable
+    """
+    ids = []
+    labels = []
+
+    zones = template.get('zones', [])
+    if zones:
+        # Already in pixel space
+        bounds = np.array([[z['x'], z['y'], z['width'], z['height']] for z in zones],
+                          dtype=np.float64).reshape(-1, 4)
+        for zone in zones:
+            bubble_id = zone.get('id', '')
+            ids.append(bubble_id)
+            labels.append((zone.get('contest', ''), zone.get('code', bubble_id),
+                           zone.get('candidate', '')))
+    else:
+        # Bubble dict in mm; prefer center coordinates, otherwise top-left
+        bubble_dict = template.get('bubble', {})
+        mm = np.array([
+            [b.get('center_x', b.get('x', 0)), b.get('center_y', b.get('y', 0)),
+             b.get('diameter', b.get('width', 5))]
+            for b in bubble_dict.values()
+        ], dtype=np.float64).reshape(-1, 3)
+
+        mm_to_pixels = dpi / 25.4
+        center_x_px = mm[:, 0] * mm_to_pixels
+        center_y_px = mm[:, 1] * mm_to_pixels
+        diameter_px = mm[:, 2] * mm_to_pixels
+
+        # Center coordinates to top-left ROI
+        bounds = np.stack([center_x_px - (diameter_px / 2), center_y_px - (diameter_px / 2),
+                           diameter_px, diameter_px], axis=1)
+
+        use_metadata = bubble_metadata is not None and bubble_metadata.available
+        for bubble_id in bubble_dict:
+            meta = bubble_metadata.get(bubble_id) if use_metadata else None
+            if meta:
+                # Simple ID format
+                contest, code = meta['position_code'], meta['candidate_code']
+            else:
+                # Verbose ID format (or bubble missing from metadata)
+                contest, code = _split_bubble_id(bubble_id)
+            ids.append(bubble_id)
+            labels.append((contest, code, ''))
+
+    def index(values):
+        unique = sorted(set(values))
+        lookup = {value: i for i, value in enumerate(unique)}
+        return np.array(unique, dtype=str), [lookup[value] for value in values]
+
+    contests, contest_idx = index([label[0] for label in labels])
+    codes, code_idx = index([label[1] for label in labels])
+    candidates, candidate_idx = index([label[2] for label in labels])
+
+    records = np.zeros(len(ids), dtype=ZONE_DTYPE)
+    records['contest'] = contest_idx
+    records['code'] = code_idx
+    records['candidate'] = candidate_idx
+    # int() semantics: truncate toward zero
+    pixels = np.trunc(bounds).astype(np.int32)
+    for i, field in enumerate(('x', 'y', 'width', 'height')):
+        records[field] = pixels[:, i]
+
+    return ZoneTable(np.array(ids, dtype=str), records, contests, codes, candidates)
+
+
+def template_cache_key(template_path: str, config_path: Optional[str] = None,
+                       dpi: float = 300) -> str:
+    """Content hash of the template and election config files, plus DPI."""
+    digest = hashlib.sha256(f"v{COMPILER_VERSION}:dpi={dpi}".encode())
+    with open(template_path, 'rb') as f:
+        digest.update(f.read())
+    if config_path:
+        for name in CONFIG_FILES:
+            config_file = Path(config_path) / name
+            digest.update(f"\0{name}\0".encode())
+            if config_file.exists():
+                digest.update(config_file.read_bytes())
+    return digest.hexdigest()
+
+
+def load_zone_table(template_path: str, config_path: Optional[str] = None,
+                    dpi: float = 300, template: Optional[Dict] = None) -> ZoneTable:
+    """
+    Load the compiled zone table for a template, compiling it on a cache miss.
+
+    Args:
+        template_path: Path to coordinates.json
+        config_path: Election config directory (for bubble metadata lookup)
+        dpi: Scan resolution
+        template: Already parsed template (avoids re-reading on a cache miss)
+
+    Returns:
+        ZoneTable
+    """
+    cache_dir = os.path.join(get_cache_dir(), 'templates')
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_path = os.path.join(cache_dir, f"{template_cache_key(template_path, config_path, dpi)}.npz")
+
+    if os.path.exists(cache_path):
+        try:
+            return ZoneTable.load(cache_path)
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable template cache {cache_path}: {e}", file=sys.stderr)
+
+    if template is None:
+        template = load_template(template_path)
+    table = compile_zones(template, load_bubble_metadata(config_path), dpi=dpi)
+
+    try:
+        table.save(cache_path)
+    except OSError as e:
+        print(f"Warning: Could not write template cache {cache_path}: {e}", file=sys.stderr)
+    return table
@@ -4,29 +4,109 @@ Load OMR threshold configuration from Laravel config file.
 
 This module provides a way to access Laravel's configuration from Python scripts,
 ensuring consistent threshold values across PHP and Python components.
+
+The config is read from a JSON snapshot exported by Laravel:
+
+    php artisan omr:export-thresholds     # also runs on `php artisan optimize`
+
+which writes bootstrap/cache/omr-thresholds.json (override with
+OMR_THRESHOLDS_SNAPSHOT). Booting Laravel through `php artisan tinker` is only
+used when explicitly enabled with OMR_THRESHOLDS_TINKER=1.
 """
 
 import os
 import sys
 import json
 import subprocess
+from dataclasses import dataclass, fields
 from typing import Dict, Any, Optional
 
 
+@dataclass(frozen=True, slots=True)
+class MarkThresholds:
+    """
+    Flattened, immutable threshold values for the mark detection hot path.
+    
+    Built once from the nested Laravel config so detect_marks() reads plain
+    float attributes instead of nested dict lookups with defaults per zone.
+    Use dataclasses.replace() to derive variants for threshold sweeps.
+    """
+    
+    detection_threshold: float = 0.3
+    
+    # classification
+    valid_mark: float = 0.95
+    ambiguous_min: float = 0.15
+    ambiguous_max: float = 0.45
+    faint_mark: float = 0.16
+    overfilled: float = 0.7
+    
+    # confidence
+    reference: float = 0.3
+    perfect_fill: float = 0.5
+    noise_threshold: float = 0.15
+    low_confidence: float = 0.5
+    
+    # quality
+    min_uniformity: float = 0.4
+    high_std_dev: float = 60.0
+    
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'MarkThresholds':
+        """
+        Compile a nested omr-thresholds config dictionary.
+        
+        Missing keys keep their defaults.
+        
+        Args:
+            config: Dictionary shaped like config/omr-thresholds.php
+        
+        Returns:
+            MarkThresholds instance.
+        """
+        values = {}
+        if 'detection_threshold' in config:
+            values['detection_threshold'] = config['detection_threshold']
+        for section in ('classification', 'confidence', 'quality'):
+            values.update(config.get(section) or {})
+        
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: float(v) for k, v in values.items() if k in names})
+
+
+SNAPSHOT_RELATIVE_PATH = os.path.join('bootstrap', 'cache', 'omr-thresholds.json')
+
+
 class ThresholdConfig:
     """
     Load and cache OMR threshold configuration from Laravel.
     """
     
-    def __init__(self, laravel_root: Optional[str] = None):
+    def __init__(self, laravel_root: Optional[str] = None, snapshot_path: Optional[str] = None,
+                 allow_tinker: Optional[bool] = None):
         """
         Initialize threshold config loader.
         
         Args:
             laravel_root: Path to Laravel project root. If None, attempts to detect it.
+            snapshot_path: JSON snapshot written by `php artisan omr:export-thresholds`.
+                If None, uses OMR_THRESHOLDS_SNAPSHOT or bootstrap/cache/omr-thresholds.json.
+            allow_tinker: Fall back to `php artisan tinker` when there is no snapshot.
+                If None, enabled only when OMR_THRESHOLDS_TINKER=1.
         """
         self.laravel_root = laravel_root or self._find_laravel_root()
+        self.snapshot_path = (
+            snapshot_path
+            or os.environ.get('OMR_THRESHOLDS_SNAPSHOT')
+            or os.path.join(self.laravel_root, SNAPSHOT_RELATIVE_PATH)
+        )
+        if allow_tinker is None:
+            allow_tinker = os.environ.get('OMR_THRESHOLDS_TINKER', '') in ('1', 'true', 'yes')
+        self.allow_tinker = allow_tinker
         self._config_cache = None
+        self._snapshot_mtime = None
+        self._compiled = None
+        self._compiled_from = None
     
     def _find_laravel_root(self) -> str:
         """Find Laravel project root by walking up from this file."""
@@ -44,18 +124,64 @@ class ThresholdConfig:
         """
         Load threshold configuration from Laravel.
         
+        Reads the exported snapshot (re-read only when its mtime changes),
+        then the opt-in tinker fallback, then built-in defaults. The result
+        is cached either way, so a missing snapshot costs nothing per call.
+        
         Returns:
             Dictionary of threshold configuration values.
         """
-        if self._config_cache is not None:
+        try:
+            snapshot_mtime = os.stat(self.snapshot_path).st_mtime
+        except OSError:
+            snapshot_mtime = None
+        
+        if self._config_cache is not None and snapshot_mtime == self._snapshot_mtime:
             return self._config_cache
         
+        config = None
+        if snapshot_mtime is not None:
+            config = self._load_snapshot(snapshot_mtime)
+        elif self.allow_tinker:
+            config = self._load_from_tinker()
+        else:
+            print(f"Warning: OMR threshold snapshot not found at {self.snapshot_path}; "
+                  "using defaults (run `php artisan omr:export-thresholds`)", file=sys.stderr)
+        
+        self._config_cache = config if config is not None else self._get_defaults()
+        self._snapshot_mtime = snapshot_mtime
+        return self._config_cache
+    
+    def _load_snapshot(self, snapshot_mtime: float) -> Optional[Dict[str, Any]]:
+        """Read the JSON snapshot, warning if the Laravel config is newer."""
+        try:
+            with open(self.snapshot_path, 'r') as f:
+                config = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: Could not read threshold snapshot {self.snapshot_path}: {e}", file=sys.stderr)
+            return None
+        
+        if not isinstance(config, dict):
+            print(f"Warning: Threshold snapshot {self.snapshot_path} is not a JSON object", file=sys.stderr)
+            return None
+        
+        for source in ('config/omr-thresholds.php', '.env'):
+            source_path = os.path.join(self.laravel_root, source)
+            if os.path.exists(source_path) and os.path.getmtime(source_path) > snapshot_mtime:
+                print(f"Warning: {source} is newer than the threshold snapshot; "
+                      "run `php artisan omr:export-thresholds`", file=sys.stderr)
+                break
+        
+        return config
+    
+    def _load_from_tinker(self) -> Optional[Dict[str, Any]]:
+        """Read config("omr-thresholds") by booting Laravel (slow, explicit fallback)."""
         # Use Laravel's artisan tinker to read config
         artisan_path = os.path.join(self.laravel_root, 'artisan')
         
         if not os.path.exists(artisan_path):
             print(f"Warning: Laravel artisan not found at {artisan_path}", file=sys.stderr)
-            return self._get_defaults()
+            return None
         
         try:
             # Execute PHP to read config as JSON
@@ -73,9 +199,7 @@ class ThresholdConfig:
                 json_line = output_lines[-1]  # Last line should be the JSON
                 
                 try:
-                    config = json.loads(json_line)
-                    self._config_cache = config
-                    return config
+                    return json.loads(json_line)
                 except json.JSONDecodeError:
                     print(f"Warning: Could not parse config JSON: {json_line}", file=sys.stderr)
             else:
@@ -86,7 +210,7 @@ class ThresholdConfig:
         except Exception as e:
             print(f"Warning: Error reading Laravel config: {e}", file=sys.stderr)
         
-        return self._get_defaults()
+        return None
     
     def _get_defaults(self) -> Dict[str, Any]:
         """Return default threshold values if Laravel config unavailable."""
@@ -130,6 +254,14 @@ class ThresholdConfig:
         """Get quality metric thresholds."""
         config = self.load()
         return config.get('quality', {})
+    
+    def compile(self) -> MarkThresholds:
+        """Get all thresholds as a MarkThresholds, recompiled only when the config reloads."""
+        config = self.load()
+        if self._compiled is None or self._compiled_from is not config:
+            self._compiled = MarkThresholds.from_config(config)
+            self._compiled_from = config
+        return self._compiled
 
 
 # Global singleton instance
@@ -171,3 +303,8 @@ def get_confidence_thresholds() -> Dict[str, float]:
 def get_quality_thresholds() -> Dict[str, float]:
     """Get quality metric thresholds from config."""
     return get_threshold_config().get_quality()
+
+
+def get_mark_thresholds() -> MarkThresholds:
+    """Get compiled thresholds for detect_marks() from config."""
+    return get_threshold_config().compile()
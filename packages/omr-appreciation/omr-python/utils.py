@@ -1,7 +1,9 @@
 """Shared utility functions for OMR appreciation."""
 
 import json
-from typing import Dict, List, Tuple
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
 
 
 def load_template(template_path: str) -> Dict:
@@ -26,3 +28,35 @@ def get_roi_coordinates(zone: Dict) -> Tuple[int, int, int, int]:
 def output_json(data: Dict) -> None:
     """Output data as JSON to stdout."""
     print(json.dumps(data, indent=2))
+
+
+def get_cache_dir() -> str:
+    """Directory for persisted caches (OMR_CACHE_DIR, else $XDG_CACHE_HOME/omr-appreciation).
+    
+    Created on first use.
+    """
+    cache_dir = os.environ.get('OMR_CACHE_DIR') or os.path.join(
+        os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+        'omr-appreciation'
+    )
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def write_json_atomic(path: str, data, indent: Optional[int] = None) -> None:
+    """Write JSON via a temp file + rename so readers never see a partial file.
+    
+    The temp name carries the process and thread id, so concurrent writers of
+    the same path (session writer, batch workers) never share a temp file.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=indent)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
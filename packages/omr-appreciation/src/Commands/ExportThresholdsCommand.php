@@ -0,0 +1,39 @@
+<?php
+
+namespace LBHurtado\OMRAppreciation\Commands;
+
+use Illuminate\Console\Command;
+
+class ExportThresholdsCommand extends Command
+{
+    protected $signature = 'omr:export-thresholds
+                            {--path= : Snapshot file (default: bootstrap/cache/omr-thresholds.json)}';
+
+    protected $description = 'Export config("omr-thresholds") as a JSON snapshot for the Python OMR scripts';
+
+    public function handle(): int
+    {
+        $path = $this->option('path') ?: base_path('bootstrap/cache/omr-thresholds.json');
+
+        $config = config('omr-thresholds');
+
+        if (! is_array($config)) {
+            $this->error('Config "omr-thresholds" is not loaded');
+
+            return self::FAILURE;
+        }
+
+        if (! is_dir(dirname($path))) {
+            mkdir(dirname($path), 0755, true);
+        }
+
+        // Write then rename so Python never reads a half-written snapshot
+        $tmpPath = $path.'.'.getmypid().'.tmp';
+        file_put_contents($tmpPath, json_encode($config, JSON_PRETTY_PRINT | JSON_PRESERVE_ZERO_FRACTION));
+        rename($tmpPath, $path);
+
+        $this->info("OMR thresholds exported to: {$path}");
+
+        return self::SUCCESS;
+    }
+}
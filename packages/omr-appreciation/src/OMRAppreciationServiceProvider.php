@@ -5,6 +5,7 @@
 use Illuminate\Support\ServiceProvider;
 use LBHurtado\OMRAppreciation\Commands\AppreciateCommand;
 use LBHurtado\OMRAppreciation\Commands\AppreciatePythonCommand;
+use LBHurtado\OMRAppreciation\Commands\ExportThresholdsCommand;
 use LBHurtado\OMRAppreciation\Commands\GenerateCalibrationCommand;
 use LBHurtado\OMRAppreciation\Commands\VerifyCalibrationCommand;
 use LBHurtado\OMRAppreciation\Services\AppreciationService;
@@ -31,9 +32,13 @@ public function boot(): void
             $this->commands([
                 AppreciateCommand::class,
                 AppreciatePythonCommand::class,
+                ExportThresholdsCommand::class,
                 GenerateCalibrationCommand::class,
                 VerifyCalibrationCommand::class,
             ]);
         }
+
+        // Refresh the Python threshold snapshot on `php artisan optimize`
+        $this->optimizes(optimize: 'omr:export-thresholds');
     }
 }
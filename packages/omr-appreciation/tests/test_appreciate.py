@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Test Appreciate
+
+Tests the single-ballot pipeline (stage threading) on a synthetic ballot.
+"""
+import sys
+import os
+from pathlib import Path
+
+# Add parent to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'omr-python'))
+
+import json
+import shutil
+import tempfile
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+import appreciate
+import barcode_decoder
+from appreciate import (
+    AppreciationError,
+    appreciate_image,
+    batch_output_names,
+    build_zones,
+    resolve_batch_images,
+    run_batch
+)
+from barcode_decoder import BarcodeRouteStats
+
+
+def make_ballot(document_id='BAL-001', seed=0):
+    """Create a grayscale ballot with six bubbles (every other one filled) and a PDF417 footer."""
+    zxingcpp = pytest.importorskip('zxingcpp')
+    rng = np.random.default_rng(seed)
+    image = rng.integers(200, 256, (1800, 1300)).astype(np.uint8)
+    zones = []
+    for i in range(6):
+        x, y = 100 + i * 150, 200
+        cv2.circle(image, (x + 30, y + 30), 25, 40, 2)
+        if i % 2 == 0:
+            cv2.circle(image, (x + 30, y + 30), 25, 20, -1)
+        zones.append({'id': f'PRESIDENT_{i:03d}', 'contest': 'PRESIDENT', 'code': f'{i:03d}',
+                      'x': x, 'y': y, 'width': 60, 'height': 60})
+    
+    barcode = zxingcpp.create_barcode(document_id, zxingcpp.BarcodeFormat.PDF417)
+    symbol = np.array(zxingcpp.write_barcode_to_image(barcode, scale=3))
+    # Footer barcode at (10mm, 100mm), the template position below
+    top, left = int(100 * 300 / 25.4), int(10 * 300 / 25.4)
+    image[top:top + symbol.shape[0], left:left + symbol.shape[1]] = symbol
+    
+    template = {
+        'template_id': 'test-ballot',
+        'document_id': 'FALLBACK',
+        'zones': zones,
+        'barcode': {'document_barcode': {'x': 10, 'y': 100, 'type': 'PDF417', 'data': 'FALLBACK'}}
+    }
+    return image, template
+
+
+class TestStageThreads:
+    """Test the barcode stage overlapping alignment and mark detection."""
+    
+    def setup_method(self):
+        self._stage_threads = os.environ.get('OMR_STAGE_THREADS')
+        self._route_stats = barcode_decoder._route_stats
+        barcode_decoder._route_stats = BarcodeRouteStats()
+    
+    def teardown_method(self):
+        if self._stage_threads is None:
+            os.environ.pop('OMR_STAGE_THREADS', None)
+        else:
+            os.environ['OMR_STAGE_THREADS'] = self._stage_threads
+        barcode_decoder._route_stats = self._route_stats
+    
+    def appreciate(self, stage_threads, **kwargs):
+        os.environ['OMR_STAGE_THREADS'] = stage_threads
+        image, template = make_ballot()
+        output = appreciate_image(image, template, no_align=True, **kwargs)
+        output['barcode'].pop('decode_time_ms')
+        return output
+    
+    def test_inline_and_threaded_stages_agree(self):
+        """Test OMR_STAGE_THREADS=0 gives the same document as the threaded pipeline."""
+        inline = self.appreciate('0')
+        threaded = self.appreciate('2')
+        
+        assert threaded == inline
+        assert inline['document_id'] == 'BAL-001'
+        assert inline['barcode']['source'] == 'visual'
+        assert inline['ballot_cast_format'] == 'BAL-001|PRESIDENT:000,002,004'
+    
+    def test_failed_stage_does_not_orphan_barcode(self, monkeypatch):
+        """Test a mark detection error waits for (or cancels) the barcode stage before raising."""
+        events = []
+        
+        def slow_barcode(image, template):
+            events.append('start')
+            time.sleep(0.2)
+            events.append('done')
+        
+        monkeypatch.setattr(appreciate, '_decode_document_barcode', slow_barcode)
+        os.environ['OMR_STAGE_THREADS'] = '2'
+        image, template = make_ballot()
+        
+        with pytest.raises(AppreciationError):
+            appreciate_image(image, template, no_align=True, engine='bogus')
+        
+        assert events in ([], ['start', 'done'])
+
+
+class TestBatch:
+    """Test batch source resolution and the batch runner."""
+    
+    def setup_method(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self._stage_threads = os.environ.get('OMR_STAGE_THREADS')
+        os.environ['OMR_STAGE_THREADS'] = '0'
+        self._route_stats = barcode_decoder._route_stats
+        barcode_decoder._route_stats = BarcodeRouteStats()
+    
+    def teardown_method(self):
+        if self._stage_threads is None:
+            os.environ.pop('OMR_STAGE_THREADS', None)
+        else:
+            os.environ['OMR_STAGE_THREADS'] = self._stage_threads
+        barcode_decoder._route_stats = self._route_stats
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def write_scan(self, relative, document_id='BAL-001'):
+        path = os.path.join(self.tmpdir, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        image, template = make_ballot(document_id)
+        cv2.imwrite(path, image)
+        return path, template
+    
+    def test_resolve_directory_and_glob(self):
+        """Test directories list their images sorted and globs expand."""
+        for name in ('b.png', 'a.JPG', 'notes.txt'):
+            Path(self.tmpdir, name).write_bytes(b'')
+        
+        assert resolve_batch_images(self.tmpdir) == [
+            os.path.join(self.tmpdir, 'a.JPG'), os.path.join(self.tmpdir, 'b.png')
+        ]
+        assert resolve_batch_images(os.path.join(self.tmpdir, '*.png')) == [os.path.join(self.tmpdir, 'b.png')]
+    
+    def test_resolve_manifest(self):
+        """Test manifest lines resolve against the manifest folder, skipping blanks and comments."""
+        manifest = Path(self.tmpdir, 'manifest.txt')
+        manifest.write_text('# precinct 1\nscans/001.png\n\n  /abs/002.png  \n')
+        
+        assert resolve_batch_images(str(manifest)) == [
+            os.path.join(self.tmpdir, 'scans', '001.png'), '/abs/002.png'
+        ]
+    
+    def test_output_names_do_not_collide(self):
+        """Test same-named scans from different folders get different result files."""
+        names = batch_output_names(['scans/p1/001.png', 'scans/p2/001.png', 'scans/p2/001.jpg',
+                                    'scans/p2/002.png'])
+        
+        assert names == {
+            'scans/p1/001.png': os.path.join('p1', '001.json'),
+            'scans/p2/001.png': os.path.join('p2', '001.png.json'),
+            'scans/p2/001.jpg': os.path.join('p2', '001.jpg.json'),
+            'scans/p2/002.png': os.path.join('p2', '002.json'),
+        }
+        assert batch_output_names(['scans/001.png']) == {'scans/001.png': '001.json'}
+    
+    def test_run_batch_writes_one_file_per_image(self):
+        """Test same-named scans are all kept and a bad image is reported without stopping the batch."""
+        first, template = self.write_scan('p1/001.png', 'BAL-001')
+        second, _ = self.write_scan('p2/001.png', 'BAL-002')
+        broken = os.path.join(self.tmpdir, 'p2', '002.png')
+        Path(broken).write_bytes(b'not an image')
+        output_dir = os.path.join(self.tmpdir, 'results')
+        
+        failed = run_batch([first, second, broken], template, build_zones(template), no_align=True,
+                           workers=1, output_dir=output_dir)
+        
+        assert failed == 1
+        with open(os.path.join(output_dir, 'p1', '001.json')) as f:
+            assert json.load(f)['document_id'] == 'BAL-001'
+        with open(os.path.join(output_dir, 'p2', '001.json')) as f:
+            assert json.load(f)['document_id'] == 'BAL-002'
+        assert not os.path.exists(os.path.join(output_dir, 'p2', '002.json'))
+    
+    def test_run_batch_streams_json_lines(self, capsys):
+        """Test without an output directory every image, failed or not, yields one JSON line."""
+        scan, template = self.write_scan('001.png')
+        missing = os.path.join(self.tmpdir, 'missing.png')
+        
+        failed = run_batch([scan, missing], template, build_zones(template), no_align=True, workers=2)
+        
+        records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert failed == 1
+        assert [r['image'] for r in records] == [scan, missing]
+        assert records[0]['ballot_cast_format'] == 'BAL-001|PRESIDENT:000,002,004'
+        assert 'Could not load image' in records[1]['error']
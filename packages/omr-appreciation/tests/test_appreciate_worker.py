@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test Appreciation Worker
+
+Tests the worker's template, metadata and zone caches.
+"""
+import sys
+import os
+from pathlib import Path
+
+# Add parent to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'omr-python'))
+
+import json
+import shutil
+import tempfile
+
+import appreciate_worker
+from appreciate_worker import AppreciationWorker
+
+
+class FakeZoneTable:
+    def zones(self):
+        return []
+
+
+class TestWorkerCaches:
+    """Test cached entries follow file mtimes and stay bounded."""
+    
+    def setup_method(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.builds = []
+    
+    def teardown_method(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def write(self, name, data, mtime):
+        path = os.path.join(self.tmpdir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(data, f)
+        os.utime(path, (mtime, mtime))
+        return path
+    
+    def patch_loaders(self, monkeypatch):
+        monkeypatch.setattr(appreciate_worker, 'load_bubble_metadata',
+                            lambda config_path: self.builds.append(('metadata', config_path)) or object())
+        monkeypatch.setattr(appreciate_worker, 'load_zone_table',
+                            lambda template_path, config_path, template=None:
+                            self.builds.append(('zones', template_path)) or FakeZoneTable())
+    
+    def test_config_change_rebuilds_metadata_and_zones(self, monkeypatch):
+        """Test touching an election config file invalidates metadata and zones, not just the template."""
+        self.patch_loaders(monkeypatch)
+        template = self.write('coordinates.json', {'zones': []}, 1000)
+        config = os.path.join(self.tmpdir, 'config')
+        election = self.write('config/election.json', {}, 1000)
+        worker = AppreciationWorker()
+        
+        first = worker.get_bubble_metadata(config)
+        worker.get_zones(template, config)
+        assert worker.get_bubble_metadata(config) is first
+        worker.get_zones(template, config)
+        assert self.builds == [('metadata', config), ('zones', template)]
+        
+        os.utime(election, (2000, 2000))
+        assert worker.get_bubble_metadata(config) is not first
+        worker.get_zones(template, config)
+        assert self.builds[2:] == [('metadata', config), ('zones', template)]
+        
+        # mapping.yaml appearing counts as a change too
+        self.write('config/mapping.yaml', {}, 2000)
+        worker.get_bubble_metadata(config)
+        assert len(self.builds) == 5
+    
+    def test_caches_are_bounded(self, monkeypatch):
+        """Test the least recently used entry is evicted once cache_size is reached."""
+        self.patch_loaders(monkeypatch)
+        worker = AppreciationWorker(cache_size=2)
+        configs = [os.path.join(self.tmpdir, f'config{i}') for i in range(3)]
+        templates = [self.write(f't{i}.json', {'zones': []}, 1000) for i in range(3)]
+        
+        worker.get_bubble_metadata(configs[0])
+        worker.get_bubble_metadata(configs[1])
+        worker.get_bubble_metadata(configs[0])
+        worker.get_bubble_metadata(configs[2])
+        for template in templates:
+            worker.get_zones(template, None)
+        
+        assert list(worker._metadata) == [configs[0], configs[2]]
+        assert len(worker._templates) == 2
+        assert list(worker._zones) == [(templates[1], None), (templates[2], None)]
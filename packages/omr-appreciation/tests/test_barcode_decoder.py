@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Test Barcode Decoder
+
+Tests symbology routing, persisted decoder hit statistics and the live
+barcode session.
+"""
+import sys
+import os
+from pathlib import Path
+
+# Add parent to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'omr-python'))
+
+import json
+import multiprocessing
+import tempfile
+import shutil
+
+import cv2
+import numpy as np
+import pytest
+
+import barcode_decoder
+from barcode_decoder import (
+    BarcodeRouteStats,
+    BarcodeSession,
+    barcode_signature,
+    decode_barcode,
+    normalize_symbology
+)
+
+
+class TestRouting:
+    """Test routing table lookups."""
+    
+    def test_normalize_symbology(self):
+        """Test template barcode types map onto route keys."""
+        assert normalize_symbology('qr') == 'QRCODE'
+        assert normalize_symbology('QR_CODE') == 'QRCODE'
+        assert normalize_symbology('pdf-417') == 'PDF417'
+        assert normalize_symbology('Code128') == 'CODE128'
+        assert normalize_symbology(None) == 'DEFAULT'
+        assert normalize_symbology('aztec') == 'DEFAULT'
+    
+    def test_pdf417_route_skips_pyzbar(self):
+        """Test PDF417 ballots never try pyzbar, which cannot read them."""
+        assert 'pyzbar' not in barcode_decoder.BARCODE_ROUTES['PDF417']['decoders']
+    
+    def test_pdf417_decoded_in_memory(self, monkeypatch):
+        """Test the default PDF417 backend decodes without a JVM, subprocess or temp file."""
+        zxingcpp = pytest.importorskip('zxingcpp')
+        barcode = zxingcpp.create_barcode('BAL-001', zxingcpp.BarcodeFormat.PDF417)
+        roi = np.array(zxingcpp.write_barcode_to_image(barcode, scale=3))
+        
+        def no_process(*args, **kwargs):
+            raise AssertionError('started a process')
+        
+        monkeypatch.setattr(barcode_decoder.subprocess, 'Popen', no_process)
+        service = barcode_decoder.BarcodeDecoderService()
+        
+        assert barcode_decoder.BARCODE_ROUTES['PDF417']['decoders'][0] == 'zxingcpp'
+        assert service.decode_zxingcpp(roi)['data'] == 'BAL-001'
+        assert service._scratch_dir is None
+
+
+def _record_and_flush(path, count):
+    """Pool-worker stand-in: flush after every decode, as batch items do."""
+    stats = BarcodeRouteStats(path)
+    for _ in range(count):
+        stats.record('t:PDF417', 'zxingcpp', True)
+        stats.flush()
+
+
+class TestRouteStats:
+    """Test per-template decoder hit statistics."""
+    
+    def setup_method(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'barcode_stats.json')
+    
+    def teardown_method(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def test_winning_decoder_ordered_first(self):
+        """Test the decoder with most hits moves to the front."""
+        stats = BarcodeRouteStats()
+        decoders = ['zxingcpp', 'pyzxing', 'zxing_cli']
+        assert stats.order('t:PDF417', decoders) == decoders
+        
+        stats.record('t:PDF417', 'zxingcpp', False)
+        stats.record('t:PDF417', 'pyzxing', True)
+        
+        assert stats.order('t:PDF417', decoders) == ['pyzxing', 'zxingcpp', 'zxing_cli']
+        assert stats.order('other:PDF417', decoders) == decoders
+    
+    def test_order_by_hit_rate(self):
+        """Test a reliable decoder beats one with more hits but more misses."""
+        stats = BarcodeRouteStats()
+        decoders = ['zxingcpp', 'pyzxing', 'zxing_cli']
+        for hit in (True, True, False, False, False, False):
+            stats.record('t:PDF417', 'zxingcpp', hit)
+        stats.record('t:PDF417', 'pyzxing', True)
+        stats.record('t:PDF417', 'zxing_cli', True)
+        
+        # pyzxing and zxing_cli tie at 1/1, so the route order decides between them
+        assert stats.order('t:PDF417', decoders) == ['pyzxing', 'zxing_cli', 'zxingcpp']
+    
+    def test_flush_merges_with_other_processes(self):
+        """Test flushed counts add to what other writers already saved."""
+        first = BarcodeRouteStats(self.path)
+        second = BarcodeRouteStats(self.path)
+        first.record('t:QRCODE', 'pyzbar', True)
+        second.record('t:QRCODE', 'pyzbar', True)
+        first.flush()
+        second.flush()
+        
+        with open(self.path) as f:
+            saved = json.load(f)
+        assert saved['t:QRCODE']['pyzbar'] == {'attempts': 2, 'hits': 2}
+        assert BarcodeRouteStats(self.path).order('t:QRCODE', ['zxingcpp', 'pyzbar'])[0] == 'pyzbar'
+    
+    def test_concurrent_flushes_keep_every_count(self):
+        """Test processes flushing at the same time do not lose each other's counts."""
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=_record_and_flush, args=(self.path, 25)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        
+        with open(self.path) as f:
+            saved = json.load(f)
+        assert saved['t:PDF417']['zxingcpp'] == {'attempts': 100, 'hits': 100}
+
+
+class TestDecodeBarcodeRouting:
+    """Test decode_barcode follows the route and stats order."""
+    
+    def setup_method(self):
+        self.calls = []
+        self._saved = (dict(barcode_decoder.DECODERS), dict(barcode_decoder.BARCODE_ROUTES),
+                       barcode_decoder._route_stats)
+        barcode_decoder._route_stats = BarcodeRouteStats()
+        barcode_decoder.DECODERS['miss'] = lambda roi: self.calls.append('miss')
+        barcode_decoder.DECODERS['hit'] = lambda roi: self.calls.append('hit') or {
+            'data': 'BAL-001', 'type': 'TEST', 'rect': None, 'confidence': 1.0
+        }
+        barcode_decoder.BARCODE_ROUTES['TEST'] = {'decoders': ['miss', 'hit'], 'variants': ['enhanced']}
+    
+    def teardown_method(self):
+        decoders, routes, stats = self._saved
+        barcode_decoder.DECODERS.clear()
+        barcode_decoder.DECODERS.update(decoders)
+        barcode_decoder.BARCODE_ROUTES.clear()
+        barcode_decoder.BARCODE_ROUTES.update(routes)
+        barcode_decoder._route_stats = stats
+    
+    def test_second_ballot_tries_winner_first(self):
+        """Test the decoder that won last time is tried first next time."""
+        image = np.full((600, 600, 3), 255, dtype=np.uint8)
+        coords = {'x': 5, 'y': 5, 'type': 'test'}
+        
+        first = decode_barcode(image, coords, template_id='t')
+        second = decode_barcode(image, coords, template_id='t')
+        
+        assert first['attempts'] == ['miss', 'hit']
+        assert second['attempts'] == ['hit']
+        assert second['document_id'] == 'BAL-001'
+        assert self.calls == ['miss', 'hit', 'hit']
+
+
+def make_barcode_frame(seed=0):
+    """White page with random bars where the test barcode sits."""
+    image = np.full((600, 600), 255, dtype=np.uint8)
+    bars = np.random.default_rng(seed).integers(0, 2, 40) * 255
+    image[20:200, 20:580] = np.repeat(bars, 14)[None, :560].astype(np.uint8)
+    return image
+
+
+class TestBarcodeSession:
+    """Test the live barcode stage decodes once per ballot."""
+    
+    def setup_method(self):
+        self.calls = []
+        self.reads = ['BAL-001']
+        self._saved = (dict(barcode_decoder.DECODERS), dict(barcode_decoder.BARCODE_ROUTES),
+                       barcode_decoder._route_stats)
+        barcode_decoder._route_stats = BarcodeRouteStats()
+        barcode_decoder.DECODERS['stub'] = lambda roi: self.calls.append('stub') or (self.reads[-1] and {
+            'data': self.reads[-1], 'type': 'TEST', 'rect': None, 'confidence': 1.0
+        })
+        barcode_decoder.BARCODE_ROUTES['TEST'] = {'decoders': ['stub'], 'variants': ['raw']}
+        self.coords = {'x': 2, 'y': 2, 'type': 'test'}
+    
+    def teardown_method(self):
+        decoders, routes, stats = self._saved
+        barcode_decoder.DECODERS.clear()
+        barcode_decoder.DECODERS.update(decoders)
+        barcode_decoder.BARCODE_ROUTES.clear()
+        barcode_decoder.BARCODE_ROUTES.update(routes)
+        barcode_decoder._route_stats = stats
+    
+    def test_same_ballot_decoded_once(self):
+        """Test frames after a visual read reuse it without calling decoders."""
+        session = BarcodeSession(self.coords)
+        frame = make_barcode_frame()
+        
+        results = [session.decode(frame) for _ in range(10)]
+        
+        assert self.calls == ['stub']
+        assert session.full_decodes == 1
+        assert session.cached_reads == 9
+        assert all(r['document_id'] == 'BAL-001' for r in results)
+        assert results[-1]['cached'] and results[-1]['similarity'] > 0.99
+    
+    def test_changed_region_decodes_again(self):
+        """Test a different barcode in the region triggers a full decode."""
+        session = BarcodeSession(self.coords)
+        session.decode(make_barcode_frame(0))
+        self.reads.append('BAL-002')
+        
+        result = session.decode(make_barcode_frame(1))
+        
+        assert result['document_id'] == 'BAL-002'
+        assert session.full_decodes == 2
+    
+    def test_reset_forces_full_decode(self):
+        """Test losing the page drops the locked read."""
+        session = BarcodeSession(self.coords)
+        frame = make_barcode_frame()
+        session.decode(frame)
+        session.reset()
+        session.decode(frame)
+        
+        assert session.full_decodes == 2
+    
+    def test_failed_reads_retried_at_interval(self):
+        """Test misses fall back to metadata and are retried every few frames."""
+        self.reads.append(None)
+        session = BarcodeSession(self.coords, metadata_fallback='META-001', retry_interval=3)
+        frame = make_barcode_frame()
+        
+        results = [session.decode(frame) for _ in range(7)]
+        
+        assert session.full_decodes == 3
+        assert not session.locked
+        assert all(r['source'] == 'metadata' for r in results)
+    
+    def test_signature_follows_homography(self):
+        """Test the warped signature matches across a shifted frame."""
+        frame = make_barcode_frame()
+        shifted = np.full_like(frame, 255)
+        shifted[10:, 15:] = frame[:-10, :-15]
+        inv_matrix = np.array([[1, 0, 15], [0, 1, 10], [0, 0, 1]], dtype=np.float64)
+        
+        reference = barcode_signature(frame, self.coords, inv_matrix=np.eye(3))
+        moved = barcode_signature(shifted, self.coords, inv_matrix=inv_matrix)
+        
+        assert float(np.dot(reference, moved)) > 0.95
+    
+    def test_signature_on_frame_smaller_than_page(self):
+        """Test a camera frame smaller than the 300 DPI page samples the real barcode region."""
+        ratio = 300 / 25.4
+        coords = {'x': 75, 'y': 254, 'type': 'PDF417'}
+        page = np.full((int(297 * ratio), int(210 * ratio)), 255, dtype=np.uint8)
+        bars = np.random.default_rng(3).integers(0, 2, 60) * 255
+        x0, y0 = int(75 * ratio), int(254 * ratio)
+        page[y0:y0 + int(30 * ratio), x0:x0 + int(100 * ratio)] = \
+            np.repeat(bars, 20)[None, :int(100 * ratio)].astype(np.uint8)
+        
+        # 720x1280 portrait camera frame showing the page scaled down
+        scale = 720 / page.shape[1]
+        frame = np.full((1280, 720), 255, dtype=np.uint8)
+        small = cv2.resize(page, (720, int(page.shape[0] * scale)), interpolation=cv2.INTER_AREA)
+        frame[:small.shape[0]] = small
+        inv_matrix = np.diag([scale, scale, 1.0])
+        
+        reference = barcode_signature(page, coords, mm_to_px_ratio=ratio, inv_matrix=np.eye(3))
+        seen = barcode_signature(frame, coords, mm_to_px_ratio=ratio, inv_matrix=inv_matrix)
+        
+        assert float(np.dot(reference, seen)) > 0.95
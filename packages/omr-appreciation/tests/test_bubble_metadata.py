@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test Bubble Metadata
+
+Tests indexed metadata loading and the serialized metadata cache.
+"""
+import sys
+import os
+from pathlib import Path
+
+# Add parent to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'omr-python'))
+
+import json
+import tempfile
+import shutil
+
+from bubble_metadata import BubbleMetadata
+
+
+ELECTION = {
+    'candidates': {
+        'PRESIDENT': [{'code': 'LD', 'name': 'Leonardo DiCaprio', 'alias': 'Leo'}],
+        'SENATOR': [{'code': 'ES', 'name': 'Emma Stone'}, {'code': 'LD', 'name': 'Duplicate'}],
+    }
+}
+
+MAPPING = """marks:
+  - key: A1
+    value: LD
+  - key: B1
+    value: ES
+  - key: B2
+    value: UNKNOWN
+"""
+
+
+class TestBubbleMetadata:
+    """Test metadata built from election.json + mapping.yaml."""
+    
+    def setup_method(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.config_dir = os.path.join(self.tmpdir, 'config')
+        os.makedirs(self.config_dir)
+        with open(os.path.join(self.config_dir, 'election.json'), 'w') as f:
+            json.dump(ELECTION, f)
+        with open(os.path.join(self.config_dir, 'mapping.yaml'), 'w') as f:
+            f.write(MAPPING)
+        self._cache_dir = os.environ.get('OMR_CACHE_DIR')
+        os.environ['OMR_CACHE_DIR'] = os.path.join(self.tmpdir, 'cache')
+    
+    def teardown_method(self):
+        if self._cache_dir is None:
+            os.environ.pop('OMR_CACHE_DIR', None)
+        else:
+            os.environ['OMR_CACHE_DIR'] = self._cache_dir
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def test_marks_resolve_to_first_position(self):
+        """Test codes resolve to the first position listing them; unknown codes are dropped."""
+        metadata = BubbleMetadata(self.config_dir)
+        
+        assert metadata.available
+        assert metadata.get('A1')['position_code'] == 'PRESIDENT'
+        assert metadata.get('A1')['candidate_alias'] == 'Leo'
+        assert metadata.get('B1') == {
+            'bubble_id': 'B1', 'candidate_code': 'ES', 'position_code': 'SENATOR',
+            'candidate_name': 'Emma Stone', 'candidate_alias': ''
+        }
+        assert metadata.get('B2') is None
+    
+    def test_cache_reused_until_configs_change(self):
+        """Test a second load comes from the cache and edits invalidate it."""
+        first = BubbleMetadata(self.config_dir)
+        cache_files = os.listdir(os.path.join(self.tmpdir, 'cache', 'metadata'))
+        assert len(cache_files) == 1
+        assert BubbleMetadata(self.config_dir).metadata == first.metadata
+        
+        with open(os.path.join(self.config_dir, 'mapping.yaml'), 'w') as f:
+            f.write("marks:\n  - key: Z9\n    value: ES\n")
+        
+        assert list(BubbleMetadata(self.config_dir).metadata) == ['Z9']
+    
+    def test_corrupt_cache_rebuilt(self):
+        """Test an unreadable cache file is ignored and the metadata rebuilt from the configs."""
+        expected = BubbleMetadata(self.config_dir).metadata
+        cache_dir = os.path.join(self.tmpdir, 'cache', 'metadata')
+        for name in os.listdir(cache_dir):
+            # Valid pickle opcode stream that fails while loading (not an UnpicklingError)
+            with open(os.path.join(cache_dir, name), 'wb') as f:
+                f.write(b'cnonexistent_module\nthing\n.')
+        
+        metadata = BubbleMetadata(self.config_dir)
+        
+        assert metadata.available
+        assert metadata.metadata == expected
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Test Cast Spool
+
+Tests durable spooling of finalized ballots and bulk casting with retries.
+"""
+import sys
+import os
+from pathlib import Path
+
+# Add parent to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'omr-python'))
+
+import json
+import tempfile
+import shutil
+
+from cast_spool import CastSpool
+
+
+# Stand-in for election:cast-ballot --skip-existing --jsonl: casts every stdin line except
+# codes starting with BAD, skips codes it cast before, hangs on codes starting with HANG,
+# and logs each invocation so tests can count them
+FAKE_CAST = '''
+import json, sys, time
+log_path = sys.argv[1]
+with open(log_path, 'a') as log:
+    log.write('call\\n')
+with open(log_path + '.cast', 'a+') as f:
+    f.seek(0)
+    stored = set(f.read().split())
+lines = [line for line in sys.stdin if line.strip()]
+for index, line in enumerate(lines):
+    code = line.split('|')[0].strip()
+    if code.startswith('HANG'):
+        time.sleep(30)
+    if code.startswith('BAD'):
+        result = {'index': index, 'code': code, 'status': 'error', 'message': 'rejected'}
+    elif code in stored:
+        result = {'index': index, 'code': code, 'status': 'exists'}
+    else:
+        with open(log_path + '.cast', 'a') as f:
+            f.write(code + '\\n')
+        result = {'index': index, 'code': code, 'status': 'cast'}
+    print(json.dumps(result), flush=True)
+sys.exit(1 if any(line.startswith('BAD') for line in lines) else 0)
+'''
+
+
+class TestCastSpool:
+    """Test spool persistence and the bulk consumer."""
+
+    def setup_method(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.spool_dir = Path(self.tmpdir) / 'spool'
+        self.log = Path(self.tmpdir) / 'calls.log'
+        self.command = [sys.executable, '-c', FAKE_CAST, str(self.log)]
+
+    def teardown_method(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def calls(self):
+        return len(self.log.read_text().splitlines()) if self.log.exists() else 0
+
+    def test_submit_is_durable(self):
+        """Test queued ballots are on disk and survive a restart."""
+        spool = CastSpool(self.spool_dir, command=self.command)
+        spool.submit('BAL-001|PRESIDENT:LD_001')
+
+        lines = (self.spool_dir / 'pending.jsonl').read_text().splitlines()
+        assert json.loads(lines[0])['ballot'] == 'BAL-001|PRESIDENT:LD_001'
+        assert CastSpool(self.spool_dir, command=self.command).pending() == 1
+
+    def test_drain_casts_batch_in_one_call(self):
+        """Test many ballots go through a single command invocation."""
+        spool = CastSpool(self.spool_dir, command=self.command)
+        for i in range(5):
+            spool.submit(f'BAL-00{i}|PRESIDENT:LD_001')
+
+        assert spool.drain()
+
+        assert self.calls() == 1
+        assert spool.cast_count == 5
+        assert spool.pending() == 0
+        # Compacted once everything was cast
+        assert (self.spool_dir / 'pending.jsonl').read_text() == ''
+        assert CastSpool(self.spool_dir, command=self.command).pending() == 0
+
+    def test_rejected_ballot_retried_then_failed(self):
+        """Test a rejected ballot does not block others and ends in failed.jsonl."""
+        spool = CastSpool(self.spool_dir, command=self.command, max_attempts=2)
+        spool.submit('BAD-001|PRESIDENT:XX_001')
+        spool.submit('BAL-002|PRESIDENT:LD_001')
+
+        assert spool.drain()
+        assert spool.cast_count == 1
+        assert spool.pending() == 1
+
+        # Cast ids are logged, so a restart only retries the rejected ballot
+        assert CastSpool(self.spool_dir, command=self.command).pending() == 1
+
+        assert spool.drain()
+        assert spool.pending() == 0
+        failed = [json.loads(line) for line in (self.spool_dir / 'failed.jsonl').read_text().splitlines()]
+        assert [entry['ballot'] for entry in failed] == ['BAD-001|PRESIDENT:XX_001']
+        assert 'rejected' in failed[0]['error']
+
+    def test_command_unavailable_keeps_ballots(self):
+        """Test ballots stay pending when the command cannot run."""
+        spool = CastSpool(self.spool_dir, command=[os.path.join(self.tmpdir, 'missing-php')])
+        spool.submit('BAL-001|PRESIDENT:LD_001')
+
+        assert not spool.drain()
+        assert spool.pending() == 1
+        assert not (self.spool_dir / 'failed.jsonl').exists()
+
+    def test_timeout_keeps_confirmed_ballots(self):
+        """Test ballots reported before a timeout are recorded and never re-cast."""
+        spool = CastSpool(self.spool_dir, command=self.command, timeout=2)
+        spool.submit('BAL-001|PRESIDENT:LD_001')
+        spool.submit('HANG-002|PRESIDENT:LD_001')
+
+        assert not spool.drain()
+        assert 'timed out' in spool.last_error
+        assert spool.cast_count == 1
+        assert spool.pending() == 1
+        # A restart only re-sends the unconfirmed ballot
+        assert [e['ballot'] for e in CastSpool(self.spool_dir, command=self.command)._pending] == \
+            ['HANG-002|PRESIDENT:LD_001']
+        assert Path(str(self.log) + '.cast').read_text().split() == ['BAL-001']
+
+    def test_already_stored_ballot_counts_as_cast(self):
+        """Test a re-sent ballot the command reports as existing is not retried."""
+        Path(str(self.log) + '.cast').write_text('BAL-001\n')
+        spool = CastSpool(self.spool_dir, command=self.command)
+        spool.submit('BAL-001|PRESIDENT:LD_001')
+
+        assert spool.drain()
+        assert spool.pending() == 0
+        assert Path(str(self.log) + '.cast').read_text().split() == ['BAL-001']
+
+    def test_background_consumer(self):
+        """Test the thread drains submitted ballots and stops on close."""
+        spool = CastSpool(self.spool_dir, command=self.command)
+        spool.start()
+        spool.submit('BAL-001|PRESIDENT:LD_001')
+        spool.submit('BAL-002|PRESIDENT:LD_001')
+
+        assert spool.close() == 0
+        assert not spool.is_alive()
+        assert spool.cast_count == 2
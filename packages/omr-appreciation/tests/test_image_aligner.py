@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Test Image Aligner
+
+Tests black square fiducial detection in corner tiles and on the full page,
+and fiducial tracking across video frames.
+"""
+import sys
+import os
+from pathlib import Path
+
+# Add parent to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'omr-python'))
+
+import numpy as np
+import cv2
+
+from image_aligner import detect_fiducials, detect_aruco_fiducials, get_fiducial_search_tiles, FiducialTracker
+
+
+TEMPLATE = {
+    'ballot_size': {'width_mm': 210, 'height_mm': 297},
+    'fiducial': {
+        'tl': {'x': 8.5, 'y': 8.5},
+        'tr': {'x': 201.5, 'y': 8.5},
+        'bl': {'x': 8.5, 'y': 288.5},
+        'br': {'x': 201.5, 'y': 288.5},
+    },
+}
+
+
+def make_page(offset=(0, 0), px_per_mm=300 / 25.4):
+    """Render a white 300 DPI page with 10mm black squares at the template fiducials."""
+    w, h = int(210 * px_per_mm), int(297 * px_per_mm)
+    page = np.full((h, w, 3), 255, dtype=np.uint8)
+    half = int(5 * px_per_mm)
+    centers = []
+    for key in ('tl', 'tr', 'bl', 'br'):
+        cx = int(TEMPLATE['fiducial'][key]['x'] * px_per_mm) + offset[0]
+        cy = int(TEMPLATE['fiducial'][key]['y'] * px_per_mm) + offset[1]
+        cv2.rectangle(page, (cx - half, cy - half), (cx + half, cy + half), (0, 0, 0), -1)
+        centers.append((cx, cy))
+    return page, centers
+
+
+class TestCornerTileSearch:
+    """Test the corner-window fiducial search."""
+    
+    def setup_method(self):
+        self._env = {k: os.environ.get(k) for k in ('OMR_FIDUCIAL_MODE', 'OMR_FIDUCIAL_SEARCH',
+                                                      'OMR_FIDUCIAL_TILE_MARGIN_MM',
+                                                      'OMR_FIDUCIAL_PYRAMID_LEVELS')}
+        os.environ['OMR_FIDUCIAL_MODE'] = 'black_square'
+    
+    def teardown_method(self):
+        for key, value in self._env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+    
+    def test_tiles_cover_expected_fiducials(self):
+        """Test each tile contains its template fiducial."""
+        page, centers = make_page()
+        tiles = get_fiducial_search_tiles(page.shape, TEMPLATE, list(TEMPLATE['fiducial'].values()))
+        
+        for (cx, cy), (x0, y0, x1, y1) in zip(centers, tiles):
+            assert x0 <= cx < x1 and y0 <= cy < y1
+        assert sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in tiles) < page.shape[0] * page.shape[1] / 4
+    
+    def test_corner_search_matches_full_page(self):
+        """Test tile search finds the same fiducials as the full-page scan."""
+        page, _ = make_page()
+        
+        os.environ['OMR_FIDUCIAL_SEARCH'] = 'corners'
+        corners = detect_fiducials(page, TEMPLATE)
+        os.environ['OMR_FIDUCIAL_SEARCH'] = 'full'
+        full = detect_fiducials(page, TEMPLATE)
+        
+        assert corners is not None
+        assert corners == full
+    
+    def test_falls_back_to_full_page_when_tile_misses(self):
+        """Test a fiducial outside its tile is still found via the full page."""
+        page, centers = make_page(offset=(30, 20))
+        os.environ['OMR_FIDUCIAL_SEARCH'] = 'corners'
+        os.environ['OMR_FIDUCIAL_TILE_MARGIN_MM'] = '0'
+        
+        fiducials = detect_fiducials(page, TEMPLATE)
+        
+        assert fiducials is not None
+        for (fx, fy), (cx, cy) in zip(fiducials, centers):
+            assert abs(fx - cx) <= 1 and abs(fy - cy) <= 1
+    
+    def test_pyramid_black_squares_subpixel(self):
+        """Test coarse-to-fine detection returns float centers on the squares."""
+        page, centers = make_page()
+        os.environ['OMR_FIDUCIAL_PYRAMID_LEVELS'] = '2'
+        
+        fiducials = detect_fiducials(page, TEMPLATE)
+        
+        assert fiducials is not None
+        for (fx, fy), (cx, cy) in zip(fiducials, centers):
+            assert isinstance(fx, float)
+            assert abs(fx - cx) <= 1 and abs(fy - cy) <= 1
+    
+    def test_pyramid_aruco_matches_true_centers(self):
+        """Test ArUco markers found at 1/4 scale are refined to sub-pixel centers."""
+        aruco_dict = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_6X6_250)
+        page = np.full((1600, 1200), 255, dtype=np.uint8)
+        origins = {101: (60, 60), 102: (980, 60), 104: (60, 1380), 103: (980, 1380)}
+        for marker_id, (x, y) in origins.items():
+            page[y:y + 160, x:x + 160] = cv2.aruco.generateImageMarker(aruco_dict, marker_id, 160)
+        os.environ['OMR_FIDUCIAL_PYRAMID_LEVELS'] = '2'
+        
+        fiducials = detect_aruco_fiducials(cv2.cvtColor(page, cv2.COLOR_GRAY2BGR), {})
+        
+        assert fiducials is not None
+        for (fx, fy), marker_id in zip(fiducials, (101, 102, 104, 103)):
+            x, y = origins[marker_id]
+            assert abs(fx - (x + 79.5)) < 0.5 and abs(fy - (y + 79.5)) < 0.5
+
+
+def shift_frame(gray, dx, dy, angle=0.0, scale=1.0):
+    """Move a page the way a hand-held camera would between frames."""
+    h, w = gray.shape
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, scale)
+    matrix[:, 2] += (dx, dy)
+    return cv2.warpAffine(gray, matrix, (w, h), borderValue=255), matrix
+
+
+class TestFiducialTracker:
+    """Test frame-to-frame fiducial tracking."""
+    
+    def setup_method(self):
+        self._mode = os.environ.get('OMR_FIDUCIAL_MODE')
+        os.environ['OMR_FIDUCIAL_MODE'] = 'black_square'
+        page, self.centers = make_page()
+        self.gray = cv2.cvtColor(page, cv2.COLOR_BGR2GRAY)
+    
+    def teardown_method(self):
+        if self._mode is None:
+            os.environ.pop('OMR_FIDUCIAL_MODE', None)
+        else:
+            os.environ['OMR_FIDUCIAL_MODE'] = self._mode
+    
+    def run_frames(self, tracker, count):
+        modes, errors = [], []
+        for i in range(count):
+            frame, matrix = shift_frame(self.gray, 12 * np.sin(i / 5), 8 * np.cos(i / 7), 0.3 * np.sin(i / 9))
+            fiducials = tracker.update(frame)
+            modes.append(tracker.last_mode)
+            truth = cv2.transform(np.float32(self.centers).reshape(-1, 1, 2), matrix).reshape(-1, 2)
+            errors.append(np.abs(np.array(fiducials) - truth).max())
+        return modes, errors
+    
+    def test_detects_only_on_first_frame_and_reanchor(self):
+        tracker = FiducialTracker(TEMPLATE, reanchor_interval=10)
+        modes, errors = self.run_frames(tracker, 25)
+        
+        detect_frames = [i for i, mode in enumerate(modes) if mode == 'detect']
+        assert detect_frames == [0, 11, 22]
+        assert tracker.tracked == 22
+        assert max(errors) < 2.0
+    
+    def test_reanchor_disabled(self):
+        tracker = FiducialTracker(TEMPLATE, reanchor_interval=0)
+        modes, errors = self.run_frames(tracker, 15)
+        
+        assert modes.count('detect') == 1
+        assert max(errors) < 2.0
+    
+    def test_jump_falls_back_to_detection(self):
+        tracker = FiducialTracker(TEMPLATE)
+        tracker.update(self.gray)
+        
+        # Camera pulled back: fiducials move well past the tracking windows
+        frame, matrix = shift_frame(self.gray, 0, 0, scale=0.8)
+        fiducials = tracker.update(frame)
+        
+        assert tracker.last_mode == 'detect'
+        truth = cv2.transform(np.float32(self.centers).reshape(-1, 1, 2), matrix).reshape(-1, 2)
+        assert np.abs(np.array(fiducials) - truth).max() < 2.0
+    
+    def test_lost_page_resets_track(self):
+        tracker = FiducialTracker(TEMPLATE)
+        tracker.update(self.gray)
+        
+        assert tracker.update(np.full_like(self.gray, 255)) is None
+        tracker.update(self.gray)
+        assert tracker.last_mode == 'detect'
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test Live Pipeline
+
+Tests the capture / process stages of appreciate_live.
+"""
+import sys
+import time
+import queue
+from pathlib import Path
+
+# Add parent to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'omr-python'))
+
+import numpy as np
+
+from appreciate_live import FrameGrabber, FrameProcessor, marks_by_bubble, _put_latest
+
+
+class FakeCapture:
+    """Camera stub producing numbered frames."""
+    
+    def __init__(self, frames=30):
+        self.frames = frames
+        self.count = 0
+    
+    def read(self):
+        self.count += 1
+        time.sleep(0.002)
+        if self.count > self.frames:
+            return False, None
+        return True, np.full((48, 64, 3), self.count % 256, dtype=np.uint8)
+
+
+class TestCaptureStage:
+    """Test newest-frame-wins capture."""
+    
+    def test_put_latest_replaces_stale_item(self):
+        """Test a full slot drops the stale item for the new one."""
+        slot = queue.Queue(maxsize=1)
+        _put_latest(slot, 1)
+        _put_latest(slot, 2)
+        
+        assert slot.get_nowait() == 2
+        assert slot.empty()
+    
+    def test_grabber_keeps_newest_frame(self):
+        """Test unprocessed frames are dropped rather than queued."""
+        grabber = FrameGrabber(FakeCapture(frames=30))
+        grabber.start()
+        grabber.join(timeout=5)
+        
+        frame_id, frame = grabber.latest()
+        assert grabber.failed
+        assert frame_id == 30 and frame[0, 0, 0] == 30
+        assert grabber.next_for_processing(timeout=0)[0] == 30
+        assert grabber.next_for_processing(timeout=0) is None
+        assert grabber.fps.rate is not None
+
+
+class TestProcessStage:
+    """Test the processing worker."""
+    
+    def test_frames_without_fiducials_publish_empty_results(self):
+        """Test blank frames yield empty results and a processing rate."""
+        grabber = FrameGrabber(FakeCapture(frames=20))
+        processor = FrameProcessor(grabber, {'bubble': {}}, [], 0.3, None, 300 / 25.4)
+        grabber.start()
+        processor.start()
+        grabber.join(timeout=5)
+        time.sleep(0.2)
+        grabber.stop()
+        processor.join(timeout=5)
+        
+        result = processor.latest_result()
+        assert result is not None and result.results == {} and result.fiducials == {}
+        assert processor.fps.rate is not None
+    
+    def test_marks_keyed_by_bubble_with_frame_centers(self):
+        """Test mark results gain overlay centers in frame space."""
+        zones = [{'id': 'A1', 'x': 10, 'y': 20, 'width': 30, 'height': 30}]
+        shift = np.array([[1, 0, 5], [0, 1, -4], [0, 0, 1]], dtype=np.float64)
+        
+        by_bubble = marks_by_bubble([{'id': 'A1', 'filled': True}], zones, shift)
+        
+        assert by_bubble['A1']['center_x'] == 30.0 and by_bubble['A1']['center_y'] == 31.0
+        assert by_bubble['A1']['radius'] == 15.0 and by_bubble['A1']['filled']
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Test Mark Detector
+
+Tests that the vectorized metrics engine matches the per-zone reference path.
+"""
+import sys
+import os
+from pathlib import Path
+
+# Add parent to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'omr-python'))
+
+import numpy as np
+import cv2
+
+from dataclasses import replace
+
+from mark_detector import (
+    detect_marks,
+    extract_rectified_patches,
+    get_bubble_mask,
+    transform_zone_coords,
+    _otsu_thresholds
+)
+from threshold_config import MarkThresholds
+from image_context import ImageContext
+
+
+def make_sheet(seed=0, noise=True):
+    """Create a BGR sheet of printed bubbles with every fourth one filled."""
+    rng = np.random.default_rng(seed)
+    if noise:
+        image = rng.integers(150, 256, (600, 500, 3)).astype(np.uint8)
+    else:
+        image = np.full((600, 500, 3), 245, dtype=np.uint8)
+    zones = []
+    for i in range(60):
+        x = 20 + (i % 10) * 45
+        y = 20 + (i // 10) * 90
+        cv2.circle(image, (x + 15, y + 15), 12, (40, 40, 40), 1)
+        if i % 4 == 0:
+            cv2.circle(image, (x + 15, y + 15), 12, (20, 20, 20), -1)
+        zones.append({'id': f'TEST_{i:03d}', 'x': x, 'y': y, 'width': 30, 'height': 30})
+    return image, zones
+
+
+class TestVectorizedEngine:
+    """Test vectorized mark metrics against the per-zone engine."""
+    
+    def test_otsu_matches_opencv(self):
+        """Test batched Otsu thresholds equal cv2.THRESH_OTSU."""
+        rng = np.random.default_rng(1)
+        rois = [
+            rng.integers(0, 256, (30, 30), dtype=np.uint8),
+            np.full((30, 30), 200, dtype=np.uint8),
+            np.where(rng.random((30, 30)) < 0.4, 30, 220).astype(np.uint8),
+        ]
+        hist = np.stack([np.bincount(roi.ravel(), minlength=256) for roi in rois])
+        expected = [cv2.threshold(roi, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[0] for roi in rois]
+        
+        assert list(_otsu_thresholds(hist)) == expected
+    
+    def test_uniform_zones_match_per_zone(self):
+        """Test same-sized in-bounds zones give identical results."""
+        image, zones = make_sheet()
+        
+        assert detect_marks(image, zones) == detect_marks(image, zones, engine='per_zone')
+    
+    def test_mixed_and_clipped_zones_match_per_zone(self):
+        """Test mixed sizes and zones crossing the image border."""
+        image, zones = make_sheet(seed=2)
+        zones[1] = dict(zones[1], width=24, height=26)
+        zones[2] = dict(zones[2], x=485)
+        zones[3] = dict(zones[3], y=-5)
+        
+        assert detect_marks(image, zones) == detect_marks(image, zones, engine='per_zone')
+    
+    def test_image_context_matches_bgr(self):
+        """Test detect_marks on a shared ImageContext matches the BGR path."""
+        image, zones = make_sheet()
+        ctx = ImageContext(image)
+        
+        assert detect_marks(ctx, zones) == detect_marks(image, zones)
+        assert detect_marks(ImageContext(ctx.gray), zones) == detect_marks(image, zones)
+    
+    def test_filled_bubbles_detected(self):
+        """Test filled bubbles are reported as filled."""
+        image, zones = make_sheet(noise=False)
+        results = detect_marks(image, zones)
+        
+        filled = [r['id'] for r in results if r['filled']]
+        assert filled == [z['id'] for i, z in enumerate(zones) if i % 4 == 0]
+
+
+class TestMarkThresholds:
+    """Test compiled thresholds."""
+    
+    def test_from_config_flattens_sections(self):
+        """Test nested config sections compile to float fields."""
+        thresholds = MarkThresholds.from_config({
+            'detection_threshold': 0.25,
+            'classification': {'overfilled': 0.8},
+            'quality': {'high_std_dev': 50, 'unknown_key': 1},
+        })
+        
+        assert thresholds.detection_threshold == 0.25
+        assert thresholds.overfilled == 0.8
+        assert thresholds.high_std_dev == 50.0
+        assert thresholds.reference == 0.3
+    
+    def test_thresholds_swappable_per_call(self):
+        """Test a sweep can reclassify the same image per call."""
+        image, zones = make_sheet(noise=False)
+        strict = replace(MarkThresholds(), low_confidence=1.0)
+        
+        default_results = detect_marks(image, zones, thresholds=MarkThresholds())
+        strict_results = detect_marks(image, zones, thresholds=strict)
+        
+        assert all('low_confidence' in r['warnings'] for r in strict_results)
+        assert [r['fill_ratio'] for r in strict_results] == [r['fill_ratio'] for r in default_results]
+
+
+class TestZoneTransform:
+    """Test the batched zone coordinate transform."""
+    
+    def test_batched_matches_point_by_point(self):
+        """Test one batched call gives the same ROIs as transforming each center alone."""
+        _, zones = make_sheet()
+        src = np.float32([[0, 0], [500, 0], [0, 600], [500, 600]])
+        inv_matrix = cv2.getPerspectiveTransform(src, src + np.float32([[4, -3], [-6, 2], [3, 5], [-2, -4]]))
+        coords = np.array([[z['x'], z['y'], z['width'], z['height']] for z in zones])
+        
+        transformed = transform_zone_coords(coords, inv_matrix)
+        
+        for (x, y, w, h), row in zip(coords.tolist(), transformed.tolist()):
+            center = np.array([[[x + w / 2, y + h / 2]]], dtype=np.float32)
+            cx, cy = cv2.perspectiveTransform(center, inv_matrix)[0][0]
+            assert row == [int(cx - w / 2), int(cy - h / 2), w, h]
+    
+    def test_transformed_extents_follow_scale(self):
+        """Test ROIs stretched by the transform are resized when extents are transformed."""
+        inv_matrix = np.array([[2, 0, 0], [0, 1.5, 0], [0, 0, 1]], dtype=np.float64)
+        coords = np.array([[10, 20, 30, 40]])
+        
+        assert transform_zone_coords(coords, inv_matrix).tolist() == [[35, 40, 30, 40]]
+        assert transform_zone_coords(coords, inv_matrix, transformed_extents=True).tolist() == [[20, 30, 60, 60]]
+
+
+class TestRectifiedEngine:
+    """Test homography-following patch sampling."""
+    
+    def test_patches_follow_rotation(self):
+        """Test patches from a rotated page match patches from the upright page."""
+        image, zones = make_sheet(noise=False)
+        gray = cv2.GaussianBlur(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), (0, 0), 2)
+        coords = np.array([[z['x'], z['y'], z['width'], z['height']] for z in zones])
+        matrix = np.vstack([cv2.getRotationMatrix2D((250, 300), 4, 1.0), [0, 0, 1]])
+        rotated = cv2.warpPerspective(gray, matrix, (500, 600), borderValue=245)
+        
+        upright = extract_rectified_patches(gray, coords, patch_size=16)
+        rectified = extract_rectified_patches(rotated, coords, matrix, patch_size=16)
+        
+        assert rectified.shape == (len(zones), 16, 16)
+        diff = np.abs(rectified.astype(int) - upright.astype(int))
+        assert diff.mean() < 0.5 and diff.max() <= 8
+    
+    def test_filled_bubbles_detected(self):
+        """Test the rectified engine finds the same filled bubbles."""
+        image, zones = make_sheet(noise=False)
+        
+        results = detect_marks(image, zones, engine='rectified')
+        
+        assert [r['filled'] for r in results] == [i % 4 == 0 for i in range(len(zones))]
+
+
+class TestBubbleMask:
+    """Test fill metrics measured inside a circular bubble mask."""
+    
+    def test_mask_cached_per_size(self):
+        """Test masks are reused and cover the inscribed circle only."""
+        mask = get_bubble_mask(30, 30, shape='circle')
+        
+        assert mask is get_bubble_mask(30, 30, shape='circle')
+        assert mask[15, 15] and not mask[0, 0]
+        assert get_bubble_mask(30, 30, shape='none') is None
+    
+    def test_engines_agree_with_mask(self):
+        """Test the per-zone and vectorized engines apply the mask identically."""
+        image, zones = make_sheet()
+        
+        reference = detect_marks(image, zones, engine='per_zone', mask='circle')
+        vectorized = detect_marks(image, zones, engine='vectorized', mask='circle')
+        
+        assert vectorized == reference
+    
+    def test_mask_excludes_outline_and_corners(self):
+        """Test empty bubbles read near zero and filled bubbles near one inside the mask."""
+        image, zones = make_sheet(noise=False)
+        for zone in zones:
+            # ROI tight around the printed outline, as in real templates
+            zone.update(x=zone['x'] + 3, y=zone['y'] + 3, width=24, height=24)
+        
+        results = detect_marks(image, zones, mask='circle')
+        
+        assert max(r['fill_ratio'] for r in results if not r['filled']) < 0.05
+        assert min(r['fill_ratio'] for r in results if r['filled']) > 0.95
+    
+    def test_clipped_zone_keeps_centred_mask(self):
+        """Test a zone cut by the image border is masked with its full-size circle."""
+        full = get_bubble_mask(30, 30, shape='circle')
+        clipped = get_bubble_mask(30, 30, shape='circle', roi_size=(30, 15))
+        
+        assert np.array_equal(clipped, full[:, :15])
+        
+        image, zones = make_sheet(seed=2)
+        zones[2] = dict(zones[2], x=485)
+        zones[12] = dict(zones[12], y=585)
+        reference = detect_marks(image, zones, engine='per_zone', mask='circle')
+        assert detect_marks(image, zones, engine='vectorized', mask='circle') == reference
+    
+    def test_empty_mask_falls_back_to_square(self):
+        """Test a mask covering no pixel measures the whole ROI instead of dividing by zero."""
+        os.environ['OMR_BUBBLE_MASK_SCALE'] = '0.1'
+        try:
+            assert get_bubble_mask(2, 2, shape='circle') is None
+            image = np.full((10, 10, 3), 255, dtype=np.uint8)
+            image[0:2, 0:1] = 0
+            zones = [{'id': 'TINY', 'x': 0, 'y': 0, 'width': 2, 'height': 2}]
+            
+            for engine in ('per_zone', 'vectorized'):
+                result = detect_marks(image, zones, engine=engine, mask='circle')[0]
+                assert result['fill_ratio'] == 0.5
+        finally:
+            del os.environ['OMR_BUBBLE_MASK_SCALE']
+    
+    def test_filled_bubble_not_overfilled(self):
+        """Test overfill is judged on the whole square, not the masked reading."""
+        image, zones = make_sheet(noise=False)
+        
+        for engine in ('per_zone', 'vectorized'):
+            results = detect_marks(image, zones, engine=engine, mask='circle')
+            filled = [r for r in results if r['filled']]
+            assert min(r['fill_ratio'] for r in filled) > 0.9
+            assert not any('overfilled' in (r['warnings'] or []) for r in filled)
+
+
+class TestIntegralEngine:
+    """Test page binarization plus integral-image lookups."""
+    
+    def test_matches_per_zone_decisions(self):
+        """Test fill ratios from integrals track the per-ROI Otsu reference."""
+        image, zones = make_sheet(noise=False)
+        
+        reference = detect_marks(image, zones, engine='per_zone')
+        for binarize in ('otsu', 'adaptive'):
+            results = detect_marks(image, zones, engine='integral', binarize=binarize)
+            assert [r['filled'] for r in results] == [r['filled'] for r in reference]
+        
+        results = detect_marks(image, zones, engine='integral', binarize='otsu')
+        assert max(abs(a['fill_ratio'] - b['fill_ratio']) for a, b in zip(results, reference)) < 0.05
+    
+    def test_integrals_cached_on_context(self):
+        """Test the page is binarized once per context and clipped ROIs read as empty."""
+        image, zones = make_sheet(noise=False)
+        ctx = ImageContext(image)
+        zones = zones + [{'id': 'OFF_PAGE', 'x': 900, 'y': 900, 'width': 30, 'height': 30}]
+        
+        first = detect_marks(ctx, zones, engine='integral')
+        cached = len(ctx._derived)
+        second = detect_marks(ctx, zones, engine='integral')
+        
+        assert second == first and len(ctx._derived) == cached
+        assert first[-1]['fill_ratio'] == 0.0 and not first[-1]['filled']
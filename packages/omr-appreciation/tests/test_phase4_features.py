@@ -14,15 +14,22 @@ sys.path.insert(0, str(Path(__file__).parent.parent / 'omr-python'))
 import json
 import tempfile
 import shutil
+import threading
 from collections import deque
 import traceback
 
+import cv2
+import numpy as np
+
 from appreciate_live import (
     VoteAccumulator,
     BallotSession,
+    BubblePositionIndex,
+    SessionWriter,
     ContestValidator,
     AudioFeedback
 )
+from utils import write_json_atomic
 
 
 class TestVoteAccumulator:
@@ -114,6 +121,46 @@ class TestVoteAccumulator:
         
         assert len(acc.stable_votes) == 0
         assert len(acc.history) == 0
+    
+    def test_window_drops_old_detections(self):
+        """Test a filled vote clears once detections fall out of the window."""
+        acc = VoteAccumulator(window_size=10, threshold=8)
+        
+        for _ in range(10):
+            acc.update({'PRESIDENT_LD_001': {'filled': True, 'fill_ratio': 0.98}})
+        for _ in range(3):
+            stable = acc.update({'PRESIDENT_LD_001': {'filled': False, 'fill_ratio': 0.02}})
+        
+        assert stable['PRESIDENT_LD_001'] == False
+        assert acc.history['PRESIDENT_LD_001'] == [True] * 7 + [False] * 3
+    
+    def test_bubbles_added_after_start(self):
+        """Test bubbles not preallocated get their own columns."""
+        acc = VoteAccumulator(window_size=10, threshold=8, bubble_ids=['A1'])
+        
+        for _ in range(8):
+            stable = acc.update({'A1': {'filled': False}, 'B1': {'filled': True}})
+        
+        assert stable == {'B1': True}
+        assert acc.index == {'A1': 0, 'B1': 1}
+    
+    def test_ema_hysteresis(self):
+        """Test EMA votes switch on above fill_on and stay on until fill_off."""
+        acc = VoteAccumulator(ema_alpha=0.5, fill_on=0.35, fill_off=0.25)
+        
+        stable = acc.update({'A1': {'filled': True, 'fill_ratio': 0.6}})
+        assert stable.get('A1', False) == False  # average 0.30
+        
+        stable = acc.update({'A1': {'filled': True, 'fill_ratio': 0.6}})
+        assert stable['A1'] == True  # average 0.45
+        
+        # Dips between the thresholds keep the vote
+        stable = acc.update({'A1': {'filled': False, 'fill_ratio': 0.1}})
+        assert stable['A1'] == True  # average 0.275
+        assert abs(acc.fill_average('A1') - 0.275) < 1e-6
+        
+        stable = acc.update({'A1': {'filled': False, 'fill_ratio': 0.1}})
+        assert stable['A1'] == False  # average 0.1875
 
 
 class TestBallotSession:
@@ -198,6 +245,10 @@ class TestBallotSession:
             assert session.validation_errors[0]['position'] == 'PRESIDENT'
             assert session.validation_errors[0]['vote_count'] == 2
             assert session.validation_errors[0]['max_selections'] == 1
+            
+            # Saved without a writer too, like every other state change
+            loaded = BallotSession.load(session.session_path)
+            assert loaded.validation_errors == session.validation_errors
     
     def test_session_persistence(self):
         """Test session can be saved and loaded."""
@@ -219,6 +270,117 @@ class TestBallotSession:
             assert loaded.status == 'frozen'
             assert loaded.votes == votes
             assert loaded.frames_processed == 1
+    
+    def test_background_writer_coalesces_metadata(self):
+        """Test debounced saves write only the newest state."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            writer = SessionWriter(debounce=60)
+            writer.start()
+            try:
+                session = BallotSession('BAL-001', Path(tmpdir), writer)
+                votes = {'PRESIDENT_LD_001': True}
+                session.update_votes(votes)
+                session.freeze()
+                session.unfreeze()
+                
+                # Still waiting out the debounce
+                assert not (session.session_path / 'session.json').exists()
+                
+                assert writer.flush(timeout=5)
+                loaded = BallotSession.load(session.session_path)
+                assert loaded.status == 'active'
+                assert loaded.votes == votes
+                assert list(session.session_path.glob('*.tmp')) == []
+            finally:
+                writer.close()
+    
+    def test_background_writer_finalize_and_capture(self):
+        """Test finalize writes at once and captures use the writer's format."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            writer = SessionWriter(debounce=60, image_format='jpg', quality=80)
+            writer.start()
+            try:
+                session = BallotSession('BAL-001', Path(tmpdir), writer)
+                session.update_votes({'PRESIDENT_LD_001': True})
+                frame = np.full((48, 64, 3), 200, dtype=np.uint8)
+                filepath = session.save_frame(frame, 'manual')
+                ballot_string = session.finalize()
+                
+                assert writer.flush(timeout=5)
+                assert filepath.suffix == '.jpg'
+                assert cv2.imread(str(filepath)).shape == frame.shape
+                assert (session.session_path / 'ballot.txt').read_text() == ballot_string
+                assert BallotSession.load(session.session_path).status == 'finalized'
+            finally:
+                writer.close()
+    
+    def test_background_writer_snapshots_payload(self):
+        """Test a queued payload is not affected by later changes to the caller's dicts."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            writer = SessionWriter(debounce=60)
+            writer.start()
+            try:
+                path = Path(tmpdir) / 'session.json'
+                votes = {'PRESIDENT_LD_001': True}
+                writer.save_metadata(path, {'votes': votes})
+                votes['SENATOR_ES_002'] = True
+                
+                assert writer.flush(timeout=5)
+                assert json.loads(path.read_text()) == {'votes': {'PRESIDENT_LD_001': True}}
+            finally:
+                writer.close()
+    
+    def test_background_writer_bounds_pending_frames(self):
+        """Test a backed-up capture queue drops the oldest frames but never text writes."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            writer = SessionWriter(image_format='png', max_pending_frames=2)
+            frame = np.zeros((8, 8, 3), dtype=np.uint8)
+            paths = [Path(tmpdir) / f'capture_{i}.png' for i in range(3)]
+            for path in paths:
+                writer.save_frame(path, frame)
+            writer.save_text(Path(tmpdir) / 'ballot.txt', 'BAL-001|')
+            
+            assert writer.dropped_frames == 1
+            writer.start()
+            try:
+                assert writer.flush(timeout=5)
+                assert [path.exists() for path in paths] == [False, True, True]
+                assert (Path(tmpdir) / 'ballot.txt').read_text() == 'BAL-001|'
+            finally:
+                writer.close()
+    
+    def test_atomic_json_writes_from_threads(self):
+        """Test threads writing the same file never trip over each other's temp files."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'session.json')
+            errors = []
+            
+            def write(n):
+                try:
+                    for i in range(50):
+                        write_json_atomic(path, {'writer': n, 'i': i})
+                except OSError as e:
+                    errors.append(e)
+            
+            threads = [threading.Thread(target=write, args=(n,)) for n in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            
+            assert errors == []
+            assert json.loads(Path(path).read_text())['i'] == 49
+            assert os.listdir(tmpdir) == ['session.json']
+    
+    def test_update_votes_does_not_copy(self):
+        """Test the session follows the accumulator's live vote dict."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            session = BallotSession('BAL-001', Path(tmpdir))
+            votes = {}
+            session.update_votes(votes)
+            votes['PRESIDENT_LD_001'] = True
+            
+            assert session.votes == {'PRESIDENT_LD_001': True}
 
 
 class TestContestValidator:
@@ -310,6 +472,65 @@ class TestContestValidator:
         assert 'PRESIDENT' in overvotes
         assert 'SENATOR' in overvotes
         assert len(overvotes) == 2
+    
+    def test_incremental_counts_follow_vote_changes(self):
+        """Test counts driven by accumulator callbacks match a full validate."""
+        questionnaire = {'positions': [{'code': 'PRESIDENT', 'max_selections': 1}]}
+        validator = ContestValidator(questionnaire)
+        acc = VoteAccumulator(window_size=3, threshold=2)
+        acc.on_vote_change(validator.on_vote_change)
+        
+        for _ in range(2):
+            acc.update({'PRESIDENT_LD_001': {'filled': True}, 'PRESIDENT_SJ_002': {'filled': True}})
+        
+        assert validator.results['PRESIDENT']['count'] == 2
+        assert validator.pop_new_overvotes() == ['PRESIDENT']
+        assert validator.pop_new_overvotes() == []
+        
+        for _ in range(2):
+            acc.update({'PRESIDENT_LD_001': {'filled': True}, 'PRESIDENT_SJ_002': {'filled': False}})
+        
+        assert validator.results == ContestValidator(questionnaire).validate(acc.get_stable_votes())
+        assert validator.results['PRESIDENT']['overvote'] == False
+    
+    def test_repeated_changes_ignored(self):
+        """Test a repeated change event does not double count."""
+        validator = ContestValidator({'positions': [{'code': 'SENATOR', 'max_selections': 2}]})
+        
+        validator.on_vote_change('SENATOR_JD_001', True)
+        validator.on_vote_change('SENATOR_JD_001', True)
+        assert validator.results['SENATOR']['count'] == 1
+        
+        validator.on_vote_change('SENATOR_JD_001', False)
+        validator.on_vote_change('SENATOR_JD_001', False)
+        assert validator.results == {}
+
+
+class TestBubblePositionIndex:
+    """Test bubble -> position resolution."""
+    
+    def test_verbose_ids_split_at_first_underscore(self):
+        """Test verbose IDs keep the rest of the ID as candidate code."""
+        positions = BubblePositionIndex(bubble_ids=['VICE-PRESIDENT_VD_002', 'A1'])
+        
+        assert positions.lookup('VICE-PRESIDENT_VD_002') == ('VICE-PRESIDENT', 'VD_002')
+        assert positions.lookup('A1') == ('A1', None)
+    
+    def test_finalize_uses_shared_index(self):
+        """Test finalize groups votes through a prebuilt index."""
+        class Metadata:
+            available = True
+            
+            def get(self, bubble_id):
+                return {'position_code': 'PRESIDENT', 'candidate_code': 'LD_001'} if bubble_id == 'A1' else None
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            session = BallotSession('BAL-001', Path(tmpdir))
+            session.update_votes({'A1': True, 'SENATOR_ES_002': True})
+            
+            ballot_string = session.finalize(positions=BubblePositionIndex(Metadata()))
+        
+        assert ballot_string == 'BAL-001|PRESIDENT:LD_001;SENATOR:ES_002'
 
 
 class TestAudioFeedback:
@@ -333,6 +554,7 @@ def run_tests():
         TestVoteAccumulator,
         TestBallotSession,
         TestContestValidator,
+        TestBubblePositionIndex,
         TestAudioFeedback
     ]
     
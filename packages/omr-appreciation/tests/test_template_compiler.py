@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test Template Compiler
+
+Tests compiling templates into zone tables and the on-disk cache.
+"""
+import sys
+import os
+from pathlib import Path
+
+# Add parent to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'omr-python'))
+
+import json
+import tempfile
+import shutil
+
+from template_compiler import compile_zones, load_zone_table, template_cache_key
+
+
+TEMPLATE = {
+    'bubble': {
+        'PRESIDENT_LD_001': {'center_x': 30, 'center_y': 80, 'diameter': 5},
+        'A2': {'center_x': 55, 'center_y': 80, 'diameter': 5},
+    }
+}
+
+
+class TestCompileZones:
+    """Test bubble dict to zone table compilation."""
+    
+    def test_bubble_ids_and_pixel_bounds(self):
+        """Test verbose IDs split into contest/code and mm convert to 300 DPI pixels."""
+        zones = compile_zones(TEMPLATE).zones()
+        
+        assert zones[0] == {'id': 'PRESIDENT_LD_001', 'contest': 'PRESIDENT_LD', 'code': '001',
+                            'x': 324, 'y': 915, 'width': 59, 'height': 59}
+        assert zones[1]['contest'] == '' and zones[1]['code'] == 'A2'
+    
+    def test_pixel_zones_pass_through(self):
+        """Test templates with a pixel 'zones' array keep their bounds and labels."""
+        template = {'zones': [{'id': 'Z1', 'contest': 'C', 'x': 10, 'y': 20, 'width': 30,
+                               'height': 40, 'candidate': 'Jane'}]}
+        
+        zone = compile_zones(template).zones()[0]
+        
+        assert zone == {'id': 'Z1', 'contest': 'C', 'code': 'Z1', 'x': 10, 'y': 20,
+                        'width': 30, 'height': 40, 'candidate': 'Jane'}
+
+
+class TestZoneTableCache:
+    """Test the content-hash keyed .npz cache."""
+    
+    def setup_method(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self._cache_dir = os.environ.get('OMR_CACHE_DIR')
+        os.environ['OMR_CACHE_DIR'] = os.path.join(self.tmpdir, 'cache')
+        self.template_path = os.path.join(self.tmpdir, 'coordinates.json')
+        with open(self.template_path, 'w') as f:
+            json.dump(TEMPLATE, f)
+    
+    def teardown_method(self):
+        if self._cache_dir is None:
+            os.environ.pop('OMR_CACHE_DIR', None)
+        else:
+            os.environ['OMR_CACHE_DIR'] = self._cache_dir
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def test_cached_table_matches_compiled(self):
+        """Test the second load comes from disk and yields the same zones."""
+        first = load_zone_table(self.template_path)
+        cached = os.listdir(os.path.join(self.tmpdir, 'cache', 'templates'))
+        second = load_zone_table(self.template_path)
+        
+        assert len(cached) == 1
+        assert second.zones() == first.zones() == compile_zones(TEMPLATE).zones()
+    
+    def test_key_changes_with_content_and_dpi(self):
+        """Test editing the template or changing DPI invalidates the cache."""
+        key = template_cache_key(self.template_path)
+        assert template_cache_key(self.template_path, dpi=200) != key
+        
+        with open(self.template_path, 'w') as f:
+            json.dump({'bubble': {'A1': {'center_x': 10, 'center_y': 10, 'diameter': 5}}}, f)
+        
+        assert template_cache_key(self.template_path) != key
+        assert [z['id'] for z in load_zone_table(self.template_path).zones()] == ['A1']
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test Threshold Config
+
+Tests loading thresholds from the snapshot exported by omr:export-thresholds.
+"""
+import sys
+import os
+from pathlib import Path
+
+# Add parent to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'omr-python'))
+
+import json
+import tempfile
+import shutil
+
+from threshold_config import ThresholdConfig
+
+
+class TestThresholdSnapshot:
+    """Test the JSON snapshot loader."""
+    
+    def setup_method(self):
+        self.laravel_root = tempfile.mkdtemp()
+        self.snapshot = os.path.join(self.laravel_root, 'bootstrap', 'cache', 'omr-thresholds.json')
+        os.makedirs(os.path.dirname(self.snapshot))
+    
+    def teardown_method(self):
+        shutil.rmtree(self.laravel_root, ignore_errors=True)
+    
+    def write_snapshot(self, config, mtime):
+        with open(self.snapshot, 'w') as f:
+            json.dump(config, f)
+        os.utime(self.snapshot, (mtime, mtime))
+    
+    def test_reads_snapshot(self):
+        """Test config comes from bootstrap/cache/omr-thresholds.json."""
+        self.write_snapshot({'detection_threshold': 0.25, 'quality': {'high_std_dev': 50}}, 1000)
+        config = ThresholdConfig(self.laravel_root)
+        
+        assert config.get_detection_threshold() == 0.25
+        assert config.compile().high_std_dev == 50.0
+    
+    def test_reloads_when_snapshot_mtime_changes(self):
+        """Test a re-exported snapshot is picked up without restarting."""
+        self.write_snapshot({'detection_threshold': 0.25}, 1000)
+        config = ThresholdConfig(self.laravel_root)
+        assert config.compile().detection_threshold == 0.25
+        
+        self.write_snapshot({'detection_threshold': 0.4}, 2000)
+        assert config.compile().detection_threshold == 0.4
+    
+    def test_missing_snapshot_uses_defaults_without_tinker(self):
+        """Test no snapshot falls back to defaults and never shells out."""
+        config = ThresholdConfig(self.laravel_root, allow_tinker=False)
+        config._load_from_tinker = lambda: (_ for _ in ()).throw(AssertionError('tinker called'))
+        
+        assert config.load() == config._get_defaults()
+        assert config.load() is config.load()
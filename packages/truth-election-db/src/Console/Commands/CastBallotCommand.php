@@ -4,6 +4,7 @@
 
 use TruthElection\Support\ParseCompactBallotFormat;
 use TruthElectionDb\Actions\CastBallot;
+use TruthElectionDb\Models\Ballot;
 use Illuminate\Support\Facades\File;
 use Illuminate\Console\Command;
 
@@ -12,50 +13,114 @@ class CastBallotCommand extends Command
     protected $signature = 'election:cast-ballot
         {lines?* : One or more ballot lines in CODE|POS1:CANDA,CANDB;POS2:... format. If omitted, read from STDIN.}
         {--input= : Path to the ballot JSON file}
-        {--json= : Raw ballot JSON string}';
+        {--json= : Raw ballot JSON string}
+        {--skip-existing : Do not cast ballots whose code is already stored (safe re-sends)}
+        {--jsonl : Print one JSON result line per ballot instead of human-readable output}';
 
-    protected $description = 'Cast a ballot from JSON or compact format using the CastBallot action.';
+    protected $description = 'Cast ballots from JSON or compact format using the CastBallot action (one per compact line).';
 
     public function handle(): int
     {
-        $data = $this->resolveInput();
+        $ballots = $this->resolveBallots();
 
-        if (is_null($data)) {
+        if (empty($ballots)) {
             $this->error('❌ No valid input. Please use --json, --input, or compact lines.');
             return self::FAILURE;
         }
 
+        // Each ballot is cast on its own so one bad line does not block the rest of a batch
+        $failed = 0;
+        foreach ($ballots as $index => $ballot) {
+            if (! $this->castBallot($ballot, $index)) {
+                $failed++;
+            }
+        }
+
+        return $failed === 0 ? self::SUCCESS : self::FAILURE;
+    }
+
+    /**
+     * @param  array|string  $input  Ballot payload, or a compact ballot line
+     * @param  int  $index  Position of the ballot in the input (echoed in --jsonl results)
+     */
+    protected function castBallot(array|string $input, int $index = 0): bool
+    {
+        $code = is_string($input) ? strtok($input, '|') : ($input['ballot_code'] ?? 'unknown');
+
         try {
+            if ($this->option('skip-existing') && Ballot::query()->where('code', $code)->exists()) {
+                $this->report($index, $code, 'exists');
+                return true;
+            }
+
+            $data = is_string($input) ? $this->parseCompactLine($input) : $input;
+
             $ballot = CastBallot::make()->run(
                 ballotCode: $data['ballot_code'] ?? null,
                 votes: collect($data['votes'] ?? [])
             );
 
-            $this->info('✅ Ballot successfully cast:');
-            $this->line("Ballot Code: {$ballot->code}");
-            $this->line("Precinct: {$ballot->getPrecinctCode()}");
-            $this->line("Votes: " . $ballot->votes->count());
+            $this->report($index, $ballot->code, 'cast', votes: $ballot->votes->count(),
+                precinct: $ballot->getPrecinctCode());
 
-            return self::SUCCESS;
+            return true;
         } catch (\Throwable $e) {
-            $this->error('❌ Error casting ballot: ' . $e->getMessage());
-            return self::FAILURE;
+            $this->report($index, $code, 'error', message: $e->getMessage());
+            return false;
         }
     }
 
-    protected function resolveInput(): ?array
+    /**
+     * Print the outcome of one ballot, human-readable or as a JSON line (--jsonl).
+     */
+    protected function report(int $index, string $code, string $status, ?int $votes = null,
+                              ?string $precinct = null, ?string $message = null): void
     {
-        if ($json = $this->option('json')) {
-            return $this->parseJson($json);
+        if ($this->option('jsonl')) {
+            $this->line(json_encode(array_filter(
+                compact('index', 'code', 'status', 'votes', 'precinct', 'message'),
+                fn ($value) => ! is_null($value)
+            )));
+            return;
         }
 
-        if ($file = $this->option('input')) {
-            return $this->parseFile($file);
+        match ($status) {
+            'cast' => $this->info('✅ Ballot successfully cast:'),
+            'exists' => $this->info('↩️ Ballot already cast, skipped:'),
+            'error' => $this->error("❌ Error casting ballot {$code}: {$message}"),
+        };
+
+        if ($status !== 'error') {
+            $this->line("Ballot Code: {$code}");
+        }
+        if ($status === 'cast') {
+            $this->line("Precinct: {$precinct}");
+            $this->line("Votes: {$votes}");
+        }
+    }
+
+    /**
+     * @return array<int, array|string> One payload for --json/--input, otherwise the compact lines
+     */
+    protected function resolveBallots(): array
+    {
+        if ($this->option('json') || $this->option('input')) {
+            $data = $this->resolveInput();
+            return is_null($data) ? [] : [$data];
         }
 
         return $this->parseCompactInput();
     }
 
+    protected function resolveInput(): ?array
+    {
+        if ($json = $this->option('json')) {
+            return $this->parseJson($json);
+        }
+
+        return $this->parseFile($this->option('input'));
+    }
+
     protected function parseJson(string $json): ?array
     {
         $data = json_decode($json, true);
@@ -79,7 +144,7 @@ protected function parseFile(string $path): ?array
         return $this->parseJson($contents);
     }
 
-    protected function parseCompactInput(): ?array
+    protected function parseCompactInput(): array
     {
         $lines = $this->argument('lines') ?? [];
 
@@ -91,11 +156,17 @@ protected function parseCompactInput(): ?array
             }
         }
 
-        $lines = array_filter($lines); // Remove empty
+        return array_values(array_filter($lines)); // Remove empty
+    }
+
+    protected function parseCompactLine(string $line): array
+    {
+        $data = json_decode(app(ParseCompactBallotFormat::class)->__invoke($line, 'CURRIMAO-001'), true);
 
-        if (empty($lines)) return null;
+        if (! is_array($data)) {
+            throw new \RuntimeException('Could not parse compact ballot line');
+        }
 
-        // 💡 Refactor this to return an array of ballot data (for now, take the first)
-        return json_decode(app(ParseCompactBallotFormat::class)->__invoke($lines[0], 'CURRIMAO-001'), true);
+        return $data;
     }
 }
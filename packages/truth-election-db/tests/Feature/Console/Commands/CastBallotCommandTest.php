@@ -199,3 +199,53 @@
         expect($actualCandidateCodes)->toEqualCanonicalizing($expectedVote['candidates']);
     }
 });
+
+test('election:cast-ballot casts every compact line in one invocation', function () {
+    $exit = Artisan::call('election:cast-ballot', [
+        'lines' => [
+            'BAL-101|PRESIDENT:LD_001',
+            'BAL-102|PRESIDENT:AJ_006;VICE-PRESIDENT:TH_001',
+        ],
+    ]);
+
+    $output = Artisan::output();
+
+    expect($exit)->toBe(0);
+    expect($output)->toContain('Ballot Code: BAL-101');
+    expect($output)->toContain('Ballot Code: BAL-102');
+    expect(Ballot::query()->whereIn('code', ['BAL-101', 'BAL-102'])->count())->toBe(2);
+});
+
+test('election:cast-ballot keeps casting after a bad compact line', function () {
+    $exit = Artisan::call('election:cast-ballot', [
+        'lines' => [
+            'BAL-201|NOT-A-POSITION:LD_001',
+            'BAL-202|PRESIDENT:LD_001',
+        ],
+    ]);
+
+    $output = Artisan::output();
+
+    expect($exit)->toBe(1);
+    expect($output)->toContain('❌ Error casting ballot BAL-201');
+    expect($output)->toContain('Ballot Code: BAL-202');
+    expect(Ballot::query()->firstWhere('code', 'BAL-202'))->toBeInstanceOf(Ballot::class);
+});
+
+test('election:cast-ballot --skip-existing --jsonl reports each ballot once', function () {
+    $lines = ['BAL-301|PRESIDENT:LD_001', 'BAL-302|NOT-A-POSITION:LD_001'];
+
+    Artisan::call('election:cast-ballot', ['lines' => $lines, '--skip-existing' => true, '--jsonl' => true]);
+    $first = collect(explode("\n", trim(Artisan::output())))->map(fn ($line) => json_decode($line, true));
+
+    expect($first->pluck('status')->all())->toBe(['cast', 'error']);
+    expect($first->pluck('index')->all())->toBe([0, 1]);
+    expect($first[0]['code'])->toBe('BAL-301');
+
+    // Re-sending the batch does not cast BAL-301 a second time
+    Artisan::call('election:cast-ballot', ['lines' => $lines, '--skip-existing' => true, '--jsonl' => true]);
+    $second = collect(explode("\n", trim(Artisan::output())))->map(fn ($line) => json_decode($line, true));
+
+    expect($second[0]['status'])->toBe('exists');
+    expect(Ballot::query()->where('code', 'BAL-301')->count())->toBe(1);
+});